@@ -174,6 +174,13 @@ class ImportContextAction(Action):
             from_section=self.option(key='from_section'),
         )
 
+    def context_file(self) -> Optional[Path]:
+        """Return path to the imported context file, if any."""
+        if self.null_object:
+            return None
+
+        return self.option(key='from_path', path=True)
+
 
 class RequiredCompileDict(TypedDict):
     """Required fields of compile action."""
@@ -199,6 +206,9 @@ class CompileAction(Action):
         self._performed_compilations: DefaultDict[Path, Set[Path]] = \
             defaultdict(set)
 
+        # Callbacks invoked with (template, target) for new compilations
+        self.compilation_listeners: List[Callable[[Path, Path], None]] = []
+
     def execute(self) -> Dict[Path, Path]:
         """
         Compile template to target destination.
@@ -222,19 +232,14 @@ class CompileAction(Action):
         if template_source.is_file():
             # Single template file, so straight forward compilation
             self.compile_template(template=template_source, target=target)
-            self._performed_compilations[template_source].add(target)
+            self._add_compilation(template=template_source, target=target)
             compilations = {template_source: target}
 
         elif template_source.is_dir():
             # The template source is a directory, so we will recurse over
             # all the files and compile every single file while preserving
             # the directory hierarchy
-            templates = tuple(
-                path
-                for path
-                in template_source.glob('**/*')
-                if path.is_file()
-            )
+            templates = self.templates()
             targets = tuple(
                 target / relpath(template_file, start=template_source)
                 for template_file
@@ -243,7 +248,7 @@ class CompileAction(Action):
 
             for template, target in zip(templates, targets):
                 self.compile_template(template=template, target=target)
-                self._performed_compilations[template].add(target)
+                self._add_compilation(template=template, target=target)
                 compilations[template] = target
 
         else:
@@ -264,6 +269,65 @@ class CompileAction(Action):
             permissions=self.option(key='permissions'),
         )
 
+    def _add_compilation(self, template: Path, target: Path) -> None:
+        """
+        Record performed compilation, notifying listeners if it is new.
+
+        :param template: Compiled template path.
+        :param target: Compilation target path.
+        """
+        if target in self._performed_compilations[template]:
+            return
+
+        self._performed_compilations[template].add(target)
+        for listener in self.compilation_listeners:
+            listener(template, target)
+
+    def restore_compilations(
+        self,
+        compilations: Dict[Path, Set[Path]],
+    ) -> None:
+        """
+        Record compilations performed by another process.
+
+        Used when a new Astrality instance takes over a module from an old
+        instance, without compiling the templates again.
+
+        :param compilations: Dictionary with template keys and target path
+            set values.
+        """
+        for template, targets in compilations.items():
+            for target in targets:
+                self._add_compilation(template=template, target=target)
+
+    def uses_temporary_target(self) -> bool:
+        """Return True if templates are compiled to a temporary file."""
+        if self.null_object:
+            return False
+
+        return 'target' not in self._options or hasattr(self, 'temp_files')
+
+    def templates(self) -> Tuple[Path, ...]:
+        """
+        Return all template files compiled by this action.
+
+        :return: Tuple of absolute template paths. Templates within a
+            directory source are included recursively.
+        """
+        if self.null_object:
+            return ()
+
+        template_source = self.option(key='source', path=True)
+        if not template_source.is_dir():
+            return (template_source,)
+
+        return tuple(
+            path
+            for path
+            in template_source.glob('**/*')
+            if path.is_file()
+        )
+
     def performed_compilations(self) -> DefaultDict[Path, Set[Path]]:
         """
         Return dictionary containing all performed compilations.
@@ -294,11 +358,36 @@ class CompileAction(Action):
 
         return Path(temp_file.name)
 
+    def recompile(self, template: Path) -> Optional[Path]:
+        """
+        Recompile a single template managed by this action.
+
+        Only the current compilation target of the template is recompiled,
+        also when the template is part of a directory source.
+
+        :param template: Absolute path to template.
+        :return: Compilation target path, or None if the template is not
+            managed by this action.
+        """
+        if template not in self:
+            return None
+
+        template_source = self.option(key='source', path=True)
+        target = self.option(key='target', path=True)
+        if template_source.is_dir():
+            target = target / relpath(template, start=template_source)
+
+        self.compile_template(template=template, target=target)
+        self._add_compilation(template=template, target=target)
+        return target
+
     def __contains__(self, other) -> bool:
-        """Return True if run action is responsible for template."""
+        """Return True if compile action is responsible for template."""
         assert other.is_absolute()
 
-        if not self.option(key='source', path=True) == other:
+        template_source = self.option(key='source', path=True)
+        if template_source != other \
+                and template_source not in other.parents:
             # This is not a managed template, so we will not recompile
             return False
 
@@ -321,12 +410,15 @@ class RunAction(Action):
     def execute(
         self,
         default_timeout: Union[int, float] = 0,
+        max_timeout: Optional[Union[int, float]] = None,
     ) -> Optional[Tuple[str, str]]:
         """
         Execute shell command action.
 
         :param default_timeout: Run timeout in seconds if no specific value is
             specified in `options`.
+        :param max_timeout: Upper limit of the run timeout in seconds, also
+            limiting any timeout specified in `options`.
         :return: 2-tuple containing the executed command and its resulting
             stdout.
         """
@@ -335,12 +427,42 @@ class RunAction(Action):
             return None
 
         command = self.option(key='shell')
-        timeout = self.option(key='timeout')
+        timeout = self.option(key='timeout') or default_timeout
+        if max_timeout is not None:
+            timeout = min(timeout, max_timeout)
 
         logger = logging.getLogger(__name__)
         logger.info(f'Running command "{command}".')
 
         result = utils.run_shell(
+            command=command,
+            timeout=timeout,
+            working_directory=self.directory,
+        )
+        return command, result
+
+    async def execute_async(
+        self,
+        default_timeout: Union[int, float] = 0,
+    ) -> Optional[Tuple[str, str]]:
+        """
+        Execute shell command action without blocking the event loop.
+
+        :param default_timeout: Run timeout in seconds if no specific value is
+            specified in `options`.
+        :return: 2-tuple containing the executed command and its resulting
+            stdout.
+        """
+        if self.null_object:
+            return None
+
+        command = self.option(key='shell')
+        timeout = self.option(key='timeout')
+
+        logger = logging.getLogger(__name__)
+        logger.info(f'Running command "{command}".')
+
+        result = await utils.run_shell_async(
             command=command,
             timeout=timeout or default_timeout,
             working_directory=self.directory,
@@ -438,6 +560,7 @@ class ActionBlockDict(TypedDict, total=False):
     compile: Union[CompileDict, List[CompileDict]]
     run: Union[RunDict, List[RunDict]]
     trigger: Union[TriggerDict, List[TriggerDict]]
+    ignore_unchanged: bool
 
 
 class ActionBlock:
@@ -449,6 +572,8 @@ class ActionBlock:
         must be an absolute path.
     :param replacer: Placeholder substitutor of string user options.
     :param context_store: A reference to the global context store.
+    :param on_compiled: Optional callback invoked with template and target
+        paths every time a new compilation is performed.
     """
 
     _import_context_actions: List[ImportContextAction]
@@ -462,6 +587,7 @@ class ActionBlock:
         directory: Path,
         replacer: Replacer,
         context_store: compiler.Context,
+        on_compiled: Optional[Callable[[Path, Path], None]] = None,
     ) -> None:
         """
         Construct ActionBlock object.
@@ -472,6 +598,10 @@ class ActionBlock:
         assert directory.is_absolute()
         self.action_block = action_block
 
+        # Only relevant for on_modified blocks, which can ignore modifications
+        # which leave the file content unchanged.
+        self.ignore_unchanged = action_block.get('ignore_unchanged', False)
+
         for identifier, action_type in (
             ('import_context', ImportContextAction),
             ('compile', CompileAction),
@@ -494,6 +624,10 @@ class ActionBlock:
                 ],
             )
 
+        if on_compiled:
+            for compile_action in self._compile_actions:
+                compile_action.compilation_listeners.append(on_compiled)
+
     def import_context(self) -> None:
         """Import context into global context store."""
         for import_context_action in self._import_context_actions:
@@ -539,6 +673,37 @@ class ActionBlock:
             if not trigger_action.null_object
         )
 
+    def context_files(self) -> Set[Path]:
+        """
+        Return paths to context files imported by import_context actions.
+
+        :return: Set of absolute paths.
+        """
+        context_files = (
+            import_context_action.context_file()
+            for import_context_action
+            in self._import_context_actions
+        )
+        return {
+            context_file
+            for context_file
+            in context_files
+            if context_file is not None
+        }
+
+    def template_sources(self) -> Set[Path]:
+        """
+        Return template sources of compile actions.
+
+        :return: Set of absolute paths to template files and directories.
+        """
+        return {
+            compile_action.option(key='source', path=True)
+            for compile_action
+            in self._compile_actions
+            if not compile_action.null_object
+        }
+
     def execute(self, default_timeout: Union[int, float]) -> None:
         """
         Execute all actions in action block.
@@ -4,24 +4,38 @@
 
 import logging
 import os
+from pathlib import Path
 import signal
-from typing import Set
-import subprocess
+from typing import Optional
 import sys
 import time
 
-from astrality.config import user_configuration
+from astrality.config import resolve_temp_directory, user_configuration
+from astrality.control import ControlServer, Controller, take_over
+from astrality.metrics import MetricsExporter, metrics
 from astrality.module import ModuleManager
+from astrality.pidfile import PidFile
+from astrality.profiler import profiler
+from astrality.runtime import Runtime
+from astrality.timing import tracer
 
 logger = logging.getLogger('astrality')
 
 
-def main(logging_level: str = 'INFO', test: bool = False):
+def main(
+    logging_level: str = 'INFO',
+    test: bool = False,
+    trace: bool = False,
+    profile: Optional[str] = None,
+):
     """
     Run the main process for Astrality.
 
     If test is set to True, then only one main loop is run as an integration
-    test.
+    test. If trace is set to True, traces of all executed actions are written
+    to the temporary directory. If profile is set to 'startup', the startup
+    of Astrality is profiled, and with 'waves' each event wave is profiled as
+    well. Profiles are written to the temporary directory.
     """
     if 'ASTRALITY_LOGGING_LEVEL' in os.environ:
         # Override logging level if env variable is set
@@ -30,8 +44,12 @@ def main(logging_level: str = 'INFO', test: bool = False):
     # Set the logging level to the configured setting
     logging.basicConfig(level=logging_level)
 
-    # Quit old astrality instances
-    kill_old_astrality_processes()
+    # Locked by the running astrality instance, preventing duplicates. Test
+    # runs leave any running instance alone, and never lock it.
+    pid_file = PidFile(resolve_temp_directory() / 'astrality.pid')
+
+    # Locked by instances while they take over from the running instance
+    startup_lock = PidFile(resolve_temp_directory() / 'astrality.startup.pid')
 
     # How to quit this process
     def exit_handler(signal=None, frame=None) -> None:
@@ -48,6 +66,23 @@ def main(logging_level: str = 'INFO', test: bool = False):
         logger.critical('Astrality was interrupted')
         logger.info('Cleaning up temporary files before exiting...')
 
+        # Write the profile of any unfinished event wave
+        profiler.stop()
+
+        try:
+            # Stop accepting control commands
+            control_server.stop()
+        except NameError:
+            # The control_server instance has not been assigned yet.
+            pass
+
+        try:
+            # Write the final metrics and remove the metrics socket
+            metrics_exporter.stop()
+        except NameError:
+            # The metrics_exporter instance has not been assigned yet.
+            pass
+
         try:
             # Run all the module exit handlers
             module_manager.exit()
@@ -55,6 +90,9 @@ def main(logging_level: str = 'INFO', test: bool = False):
             # The module_manager instance has not been assigned yet.
             pass
 
+        # Let new instances start
+        pid_file.release()
+
         try:
             sys.exit(0)
         except SystemExit:
@@ -70,8 +108,7 @@ def main(logging_level: str = 'INFO', test: bool = False):
     if not test:
         signal.signal(signal.SIGINT, exit_handler)
 
-        # Also catch kill-signkal from OS,
-        # e.g. `kill $(pgrep -f "python astrality.py")`
+        # Also catch kill-signal from OS, e.g. from new Astrality instances
         signal.signal(signal.SIGTERM, exit_handler)
 
     try:
@@ -80,71 +117,72 @@ def main(logging_level: str = 'INFO', test: bool = False):
         # Delay further actions if configuration says so
         time.sleep(config['config/astrality']['startup_delay'])
 
-        module_manager = ModuleManager(config)
-        module_manager.finish_tasks()
+        if trace:
+            tracer.enable(
+                directory=config['_runtime']['temp_directory'] / 'traces',
+            )
+        if profile:
+            profiler.enable(
+                directory=config['_runtime']['temp_directory'] / 'profiles',
+                waves=profile == 'waves',
+            )
 
-        while True:
+        module_manager = ModuleManager(config)
+        astrality_config = config['config/astrality']
+        control_socket = Path(astrality_config.get(
+            'control_socket',
+            config['_runtime']['temp_directory'] / 'control.sock',
+        )).expanduser()
+
+        if test:
+            module_manager.finish_tasks()
             if module_manager.has_unfinished_tasks():
-                # TODO: Log which new event which has been detected
                 logger.info('New event detected.')
                 module_manager.finish_tasks()
                 logger.info(f'Event change routine finished.')
 
-            if test:
-                logger.debug('Main loop interupted since argument test=True.')
-                return
-            else:
-                logger.info(
-                    f'Waiting {module_manager.time_until_next_event()} '
-                    'until next event change and ensuing update.',
-                )
-
-                # Weird bug related to sleeping more than 10e7 seconds
-                # on MacOS, causing OSError: Invalid Argument
-                wait = module_manager.time_until_next_event().total_seconds()
-                if wait >= 10e7:
-                    wait = 10e7
+            logger.debug('Main loop interupted since argument test=True.')
+            return
 
-                time.sleep(wait)
+        # Take over unchanged modules from any old astrality instance, before
+        # quitting it. Adopted modules are neither exited nor started.
+        # Instances started at the same time do this one at a time, such
+        # that they never take over from the same old instance.
+        if not startup_lock.wait(timeout=30):
+            logger.warning('Another Astrality instance is still starting.')
+        try:
+            take_over(module_manager, socket_path=control_socket)
+            pid_file.acquire()
+        finally:
+            startup_lock.release()
+
+        # Metrics are exported in the background while the daemon runs
+        metrics_file = astrality_config.get('metrics_file')
+        metrics_socket = astrality_config.get('metrics_socket')
+        metrics_exporter = MetricsExporter(
+            registry=metrics,
+            metrics_file=Path(metrics_file).expanduser()
+            if metrics_file else None,
+            interval=astrality_config.get('metrics_interval', 15),
+            socket_path=Path(metrics_socket).expanduser()
+            if metrics_socket else None,
+        )
+        metrics_exporter.start()
+
+        # Event transitions, file system modifications, and shell commands
+        # are handled concurrently by an asyncio event loop, which also
+        # executes commands received on the control socket.
+        runtime = Runtime(module_manager)
+        control_server = ControlServer(
+            path=control_socket,
+            controller=Controller(runtime),
+        )
+        control_server.start()
+        runtime.run()
 
     except KeyboardInterrupt:  # pragma: no cover
         exit_handler()
 
 
-def other_astrality_pids() -> Set[int]:
-    """Return the process ids (PIDs) of any other Astrality instances."""
-    # Get all processes instanciated from this file
-    result = subprocess.Popen(
-        ['pgrep', '-f', 'astrality'],
-        stdout=subprocess.PIPE,
-        universal_newlines=True,
-    )
-    pids = set(int(pid.strip()) for pid in result.stdout)
-
-    # Return all the PIDs except for the PID of this process
-    this_process_pid = os.getpid()
-    return pids - set((this_process_pid,))
-
-
-def kill_old_astrality_processes() -> None:
-    """Kill all other instances of this script, to prevent duplicates."""
-    pids = other_astrality_pids()
-    failed_exits = 0
-    for pid in pids:
-        try:
-            logger.info(f'Killing duplicate Astrality process with pid {pid}.')
-            os.kill(pid, signal.SIGTERM)
-        except OSError:
-            logger.error(
-                f'Could not kill old instance of astrality with pid {pid}.',
-            )
-            logger.error('Continuing anyway...')
-            failed_exits += 1
-
-    while len(other_astrality_pids()) > failed_exits:
-        # Wait for all the processes to exit properly
-        time.sleep(0.2)
-
-
 if __name__ == '__main__':
     main()
@@ -5,18 +5,22 @@ import os
 import stat
 from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, Optional, Set, Union
 
 from jinja2 import (
     Environment,
     FileSystemLoader,
+    TemplateError,
     Undefined,
     make_logging_undefined,
+    meta,
 )
 
 from astrality.exceptions import MisconfiguredConfigurationFile
+from astrality.metrics import compiled_bytes_total
 from astrality.utils import generate_expanded_env_dict
 from astrality.resolver import Resolver
+from astrality.timing import tracer
 from astrality.utils import run_shell
 
 Context = Dict[str, Resolver]
@@ -85,7 +89,7 @@ def jinja_environment(
 
     # Add run shell command filter
     run_shell_from_working_directory = partial(
-        run_shell,
+        shell_filter,
         working_directory=shell_command_working_directory,
     )
     env.filters['shell'] = run_shell_from_working_directory
@@ -93,6 +97,12 @@ def jinja_environment(
     return env
 
 
+def shell_filter(command: str, *args, **kwargs) -> str:
+    """Run shell command from template, recording it as a trace span."""
+    with tracer.span('shell filter', 'compiler', command=command):
+        return run_shell(command, *args, **kwargs)
+
+
 def finalize_variable_expression(result: str) -> str:
     """Return empty strings for undefined template variables."""
     if result is None:
@@ -101,6 +111,36 @@ def finalize_variable_expression(result: str) -> str:
         return result
 
 
+def context_sections(template: Path) -> Optional[Set[str]]:
+    """
+    Return the names of all context sections referenced by template.
+
+    Templates that include, import, or extend other templates can not be
+    analyzed in isolation, and neither can unreadable or invalid templates.
+
+    :param template: Path to template file.
+    :return: Set of referenced context section names, or None if the
+        referenced sections could not be determined.
+    """
+    # The template is analyzed by the environment used for compilation, as
+    # the analysis fails for filters unknown to the environment.
+    env = jinja_environment(
+        templates_folder=template.parent,
+        shell_command_working_directory=template.parent,
+    )
+    try:
+        abstract_syntax_tree = env.parse(template.read_text())
+        referenced_templates = meta.find_referenced_templates(
+            abstract_syntax_tree,
+        )
+        if any(True for _ in referenced_templates):
+            return None
+
+        return meta.find_undeclared_variables(abstract_syntax_tree)
+    except (OSError, UnicodeDecodeError, TemplateError):
+        return None
+
+
 def compile_template_to_string(
     template: Path,
     context: Context,
@@ -142,17 +182,19 @@ def compile_template(
     """
     logger.info(f'[Compiling] Template: "{template}" -> Target: "{target}"')
 
-    result = compile_template_to_string(
-        template=template,
-        context=context,
-        shell_command_working_directory=shell_command_working_directory,
-    )
+    with tracer.span('render', 'compiler', template=template, target=target):
+        result = compile_template_to_string(
+            template=template,
+            context=context,
+            shell_command_working_directory=shell_command_working_directory,
+        )
 
     # Create parent directories if they do not exist
     os.makedirs(target.parent, exist_ok=True)
 
     with open(target, 'w') as target_file:
         target_file.write(result)
+    compiled_bytes_total.inc(len(result.encode()))
 
     # Copy template's file permissions to compiled target file
     template_permissions = stat.S_IMODE(template.stat().st_mode)
@@ -29,6 +29,7 @@ from astrality.exceptions import (
     NonExistentEnabledModule,
 )
 from astrality.github import clone_repo, clone_or_pull_repo
+from astrality.metrics import path_cache_lookups_total
 from astrality.resolver import Resolver
 
 Context = Dict[str, Resolver]
@@ -134,13 +135,18 @@ def dict_from_config_file(
     return conf_dict
 
 
+def resolve_temp_directory() -> Path:
+    """Return the directory used for temporary files, $TMPDIR/astrality."""
+    return Path(os.environ.get('TMPDIR', '/tmp')) / 'astrality'
+
+
 def infer_runtime_variables_from_config(
     config_directory: Path,
     config_file: Path,
     config: ApplicationConfig,
 ) -> Dict[str, Dict[str, Path]]:
     """Return infered runtime variables based on config file."""
-    temp_directory = Path(os.environ.get('TMPDIR', '/tmp')) / 'astrality'
+    temp_directory = resolve_temp_directory()
     if not temp_directory.is_dir():
         os.mkdir(temp_directory)
 
@@ -262,16 +268,42 @@ def expand_path(path: Path, config_directory: Path) -> Path:
 
     Relative paths are relative to $ASTRALITY_CONFIG_HOME, and ~ is
     expanded to the home directory of $USER.
+
+    Resolved paths are memoized, keyed by `path`, `config_directory`, and
+    $HOME. Call :func:`clear_expand_path_cache` when symlinks might have
+    changed, which is done whenever configurations are reloaded.
     """
+    key = (path, config_directory, os.environ.get('HOME'))
+    try:
+        expanded_path = _expanded_paths[key]
+        path_cache_lookups_total.inc(result='hit')
+        return expanded_path
+    except KeyError:
+        path_cache_lookups_total.inc(result='miss')
+
     # Expand any tilde expressions for user home directory
-    path = Path.expanduser(path)
+    expanded_path = Path.expanduser(path)
 
     # Use config directory as anchor for relative paths
-    if not path.is_absolute():
-        path = config_directory / path
+    if not expanded_path.is_absolute():
+        expanded_path = config_directory / expanded_path
 
     # Return path where symlinks such as '..' are resolved
-    return path.resolve()
+    expanded_path = expanded_path.resolve()
+
+    if len(_expanded_paths) >= _EXPANDED_PATHS_MAXSIZE:
+        _expanded_paths.clear()
+    _expanded_paths[key] = expanded_path
+    return expanded_path
+
+
+_EXPANDED_PATHS_MAXSIZE = 4096
+_expanded_paths: Dict[Tuple[Path, Path, Optional[str]], Path] = {}
+
+
+def clear_expand_path_cache() -> None:
+    """Invalidate all memoized results of :func:`expand_path`."""
+    _expanded_paths.clear()
 
 
 def expand_globbed_path(path: Path, config_directory: Path) -> Set[Path]:
@@ -321,6 +353,7 @@ class ModuleSource(ABC):
 
     directory: Path
     config_file: Path
+    prefix: str
     _config: Dict[Any, Any]
 
     @abstractmethod
@@ -343,6 +376,10 @@ class ModuleSource(ABC):
         """Return the dictionary containing the module configuration."""
         raise NotImplementedError
 
+    def reload(self, context: Dict[str, Resolver]) -> Dict[Any, Any]:
+        """Return the module configuration, ignoring any cached version."""
+        return self.config(context=context)
+
     @classmethod
     def represented_by(cls, module_name: str) -> bool:
         """Return True if name represents module source type."""
@@ -440,6 +477,9 @@ class GithubModuleSource(ModuleSource):
             / self.github_user / self.github_repo
         self.config_file = self.directory / 'config.yml'
 
+        # Prefix of all module names defined by this source
+        self.prefix = f'github::{self.github_user}/{self.github_repo}'
+
     def config(self, context: Dict[str, Resolver]) -> Dict[Any, Any]:
         """
         Return the contents of config.yml.
@@ -464,13 +504,20 @@ class GithubModuleSource(ModuleSource):
                 modules_directory=self.modules_directory,
             )
 
+        return self.reload(context=context)
+
+    def reload(self, context: Dict[str, Resolver]) -> Dict[Any, Any]:
+        """
+        Return the contents of config.yml, ignoring any cached configuration.
+
+        The repository is neither cloned nor pulled.
+        """
         self._config = filter_config_file(
             config_file=self.config_file,
             context=context,
             enabled_module_name=self.enabled_module_name,
-            prepend=f'github::{self.github_user}/{self.github_repo}::',
+            prepend=self.prefix + '::',
         )
-
         return self._config
 
     def __contains__(self, module_name: str) -> bool:
@@ -518,6 +565,9 @@ class DirectoryModuleSource(ModuleSource):
             enabling_statement['name'].split('::')
         self.relative_directory_path = Path(relative_directory_path)
 
+        # Prefix of all module names defined by this source
+        self.prefix = str(self.relative_directory_path)
+
         assert modules_directory.is_absolute()
         self.directory = modules_directory / self.relative_directory_path
 
@@ -527,15 +577,20 @@ class DirectoryModuleSource(ModuleSource):
     def config(self, context: Dict[str, Resolver]) -> Dict[Any, Any]:
         """Return the module configuration defined in directory."""
         if not hasattr(self, '_config'):
-            self._config = filter_config_file(
-                config_file=self.config_file,
-                context=context,
-                enabled_module_name=self.enabled_module_name,
-                prepend=str(self.relative_directory_path) + '::',
-            )
+            self.reload(context=context)
 
         return self._config
 
+    def reload(self, context: Dict[str, Resolver]) -> Dict[Any, Any]:
+        """Return the module configuration, ignoring any cached version."""
+        self._config = filter_config_file(
+            config_file=self.config_file,
+            context=context,
+            enabled_module_name=self.enabled_module_name,
+            prepend=self.prefix + '::',
+        )
+        return self._config
+
     def __repr__(self):
         """Human-readable representation of a DirectoryModuleSource object."""
         return f'DirectoryModuleSource(' \
@@ -605,6 +660,27 @@ class EnabledModules:
                 modules_directory=source_directory,
             ))
 
+        self.build_index()
+
+    def build_index(self) -> None:
+        """
+        Index enabled module names for constant time membership tests.
+
+        Globally defined modules are indexed by name, while external module
+        sources are indexed by the prefix of the module names they define.
+        """
+        self.global_module_names: Set[str] = set(
+            source.enabled_module  # type: ignore
+            for source
+            in self.source_types[GlobalModuleSource]
+        )
+        self.external_sources: Dict[str, List[ModuleSource]] = {}
+        for source in (
+            *self.source_types[DirectoryModuleSource],
+            *self.source_types[GithubModuleSource],
+        ):
+            self.external_sources.setdefault(source.prefix, []).append(source)
+
     def process_enabling_statements(
         self,
         enabling_statements: List[EnablingStatement],
@@ -669,12 +745,21 @@ class EnabledModules:
         if module_name[:7].lower() == 'module/':
             module_name = module_name[7:]
 
-        source_type = ModuleSource.type(of=module_name)
-        for module_source in self.source_types[source_type]:
-            if module_name in module_source:
+        if '::' not in module_name:
+            # Globally defined module
+            if module_name in self.global_module_names:
                 return True
 
-        return False
+            return self.all_global_modules_enabled \
+                and GlobalModuleSource.represented_by(module_name)
+
+        # Externally defined module, i.e. <prefix>::<module_name>
+        prefix = module_name.rsplit('::', 1)[0]
+        return any(
+            module_name in module_source
+            for module_source
+            in self.external_sources.get(prefix, ())
+        )
 
     def __repr__(self) -> str:
         """Return string representation of all enabled modules."""
@@ -689,8 +774,15 @@ class GlobalModulesConfigDict(TypedDict, total=False):
     """Dictionary defining configuration options for Modules."""
 
     requires_timeout: Union[int, float]
+    requires_cache_ttl: Union[int, float]
     run_timeout: Union[int, float]
+    max_workers: int
+    max_processes: int
+    exit_timeout: Union[int, float]
+    exit_module_timeout: Union[int, float]
+    modified_quiet_window: Union[int, float]
     recompile_modified_templates: bool
+    ignore_unchanged_templates: bool
     modules_directory: str
     enabled_modules: List[EnablingStatement]
 
@@ -714,14 +806,42 @@ class GlobalModulesConfig:
             'recompile_modified_templates',
             False,
         )
+        self.ignore_unchanged_templates = config.get(
+            'ignore_unchanged_templates',
+            False,
+        )
         self.requires_timeout = config.get(
             'requires_timeout',
             1,
         )
+        self.requires_cache_ttl = config.get(
+            'requires_cache_ttl',
+            60,
+        )
         self.run_timeout = config.get(
             'run_timeout',
             0,
         )
+        self.max_workers = config.get(
+            'max_workers',
+            8,
+        )
+        self.max_processes = config.get(
+            'max_processes',
+            16,
+        )
+        self.exit_timeout = config.get(
+            'exit_timeout',
+            5,
+        )
+        self.exit_module_timeout = config.get(
+            'exit_module_timeout',
+            3,
+        )
+        self.modified_quiet_window = config.get(
+            'modified_quiet_window',
+            0.1,
+        )
 
         # Determine the directory which contains external modules
         assert config_directory.is_absolute()
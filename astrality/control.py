@@ -0,0 +1,397 @@
+"""
+Module implementing the control interface of a running Astrality daemon.
+
+The daemon serves a Unix socket accepting newline delimited JSON requests,
+for example {"command": "trigger", "module": "A", "block": "on_event"}. Each
+request is answered by a JSON line, either {"result": ...} or {"error": ...}.
+The `astrality ctl` command line interface is a client of this socket, and so
+is a new Astrality instance taking over modules from an old instance.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+import socket
+import socketserver
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+from astrality.config import resolve_temp_directory
+from astrality.exceptions import (
+    AstralityConfigurationError,
+    ControlCommandError,
+)
+from astrality.handover import (
+    adopt,
+    commit_handover,
+    hand_over,
+    handover_request,
+)
+from astrality.metrics import metrics as metrics_registry
+from astrality.module import Module, ModuleManager
+from astrality.runtime import Runtime
+
+logger = logging.getLogger('astrality')
+
+# Commands accepted by the control socket
+COMMANDS = (
+    'events',
+    'trigger',
+    'recompile',
+    'reload',
+    'metrics',
+    'handover',
+    'handover_commit',
+)
+
+
+def default_socket_path() -> Path:
+    """Return the default path of the control socket."""
+    return resolve_temp_directory() / 'control.sock'
+
+
+class Controller:
+    """
+    Executor of control commands within the event loop of a runtime.
+
+    Commands are received on the threads of the control server, but are
+    executed as coroutines within the event loop of the runtime. Commands
+    which replace modules or compile templates are executed in a worker
+    thread by Runtime.run_exclusively(), such that they never block the event
+    loop, nor run concurrently with the actions of the module manager.
+
+    :param runtime: Runtime driving the controlled module manager.
+    """
+
+    def __init__(self, runtime: Runtime) -> None:
+        """Initialize controller of runtime."""
+        self.runtime = runtime
+        self.module_manager = runtime.module_manager
+
+    def __call__(self, request: Dict[str, Any]) -> Any:
+        """
+        Execute control command, blocking until it is finished.
+
+        :param request: Dictionary with a 'command' key, and additional keys
+            with the arguments of the command.
+        :return: JSON serializable result of the command.
+        """
+        arguments = dict(request)
+        command = arguments.pop('command', None)
+        if command not in COMMANDS:
+            raise ControlCommandError(
+                f'Unknown command "{command}". '
+                f'Available commands: {", ".join(COMMANDS)}.',
+            )
+
+        try:
+            coroutine = getattr(self, command)(**arguments)
+        except TypeError:
+            raise ControlCommandError(
+                f'Invalid arguments for command "{command}": {arguments}.',
+            )
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.runtime.loop)
+        return future.result()
+
+    def module(self, name: str) -> Module:
+        """Return managed module by name."""
+        try:
+            return self.module_manager.modules[name]
+        except KeyError:
+            raise ControlCommandError(f'Module "{name}" is not running.')
+
+    async def events(self) -> Dict[str, str]:
+        """Return the current event of each managed module."""
+        return self.module_manager.module_events()
+
+    async def trigger(
+        self,
+        module: str,
+        block: str,
+        path: Optional[str] = None,
+    ) -> List[List[str]]:
+        """
+        Execute action block of module.
+
+        :param module: Name of module.
+        :param block: Name of action block, such as 'on_event'.
+        :param path: Absolute path of on_modified block.
+        :return: List of [shell command, standard output] pairs.
+        """
+        managed_module = self.module(module)
+        modified = Path(path) if path else None
+        if block == 'on_modified':
+            if modified not in managed_module.action_blocks['on_modified']:
+                raise ControlCommandError(
+                    f'Module "{module}" has no on_modified block for '
+                    f'"{path}".',
+                )
+        elif block not in ('on_startup', 'on_event', 'on_exit') or modified:
+            raise ControlCommandError(f'Invalid action block "{block}".')
+
+        logger.info(f'[module/{module}] {block} triggered by control socket.')
+        results = await self.runtime.spawn(self.runtime.execute(
+            module=managed_module,
+            block_name=block,
+            path=modified,
+        ))
+        return [list(result) for result in results]
+
+    async def recompile(self, template: str) -> List[str]:
+        """
+        Recompile template to its current targets.
+
+        :param template: Absolute path to template.
+        :return: Sorted list of compilation targets.
+        """
+        targets = await self.runtime.run_exclusively(
+            self.module_manager.recompile_template,
+            Path(template),
+        )
+        return sorted(str(target) for target in targets)
+
+    async def reload(self, module: str) -> None:
+        """
+        Restart module with its configuration reloaded from file.
+
+        :param module: Name of module.
+        """
+        await self.runtime.run_exclusively(
+            self.module_manager.reload_module,
+            module,
+        )
+
+        # The reloaded module might have an earlier event transition
+        self.runtime.reschedule()
+
+    async def metrics(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        return metrics_registry.exposition()
+
+    async def handover(self, modules: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Hand over modules to a new Astrality instance.
+
+        :param modules: Modules requested by the new instance.
+        :return: State of the handed over modules.
+        """
+        return await self.runtime.run_exclusively(
+            hand_over,
+            self.module_manager,
+            modules,
+        )
+
+    async def handover_commit(self, modules: List[str]) -> List[str]:
+        """
+        Hand over offered modules adopted by the new Astrality instance.
+
+        :param modules: Names of modules adopted by the new instance.
+        :return: Names of the handed over modules.
+        """
+        return await self.runtime.run_exclusively(
+            commit_handover,
+            self.module_manager,
+            modules,
+        )
+
+
+class ControlRequestHandler(socketserver.StreamRequestHandler):
+    """Handler responding to each JSON request line of a connection."""
+
+    def handle(self) -> None:
+        """Respond to requests until the client closes the connection."""
+        for line in self.rfile:
+            response = self.respond(line)
+            self.wfile.write((json.dumps(response) + '\n').encode())
+
+    def respond(self, line: bytes) -> Dict[str, Any]:
+        """Return response dictionary to JSON request line."""
+        try:
+            request = json.loads(line.decode())
+            if not isinstance(request, dict):
+                raise ControlCommandError('Requests must be JSON objects.')
+
+            return {'result': self.server.controller(request)}  # type: ignore
+        except ValueError as error:
+            return {'error': f'Invalid request: {error}'}
+        except ControlCommandError as error:
+            return {'error': str(error)}
+        except (Exception, AstralityConfigurationError) as error:
+            logger.exception('Could not execute control command!')
+            return {'error': f'{type(error).__name__}: {error}'}
+
+
+class ControlServer(
+    socketserver.ThreadingMixIn,
+    socketserver.UnixStreamServer,
+):
+    """
+    Server of the control socket, only accessible by the current user.
+
+    :param path: Path to Unix socket.
+    :param controller: Callable executing request dictionaries.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, path: Path, controller: Controller) -> None:
+        """Bind server to socket path, replacing any stale socket."""
+        if path.is_socket():
+            path.unlink()
+
+        os.makedirs(path.parent, exist_ok=True)
+        self.path = path
+        self.controller = controller
+        super().__init__(str(path), ControlRequestHandler)
+        os.chmod(path, 0o600)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Serve requests in a background thread."""
+        self._thread = threading.Thread(
+            target=self.serve_forever,
+            name='astrality-control',
+            daemon=True,
+        )
+        self._thread.start()
+        logger.info(f'Serving control socket "{self.path}".')
+
+    def stop(self) -> None:
+        """Stop serving requests and remove the socket."""
+        if self._thread:
+            self.shutdown()
+            self._thread = None
+
+        self.server_close()
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+
+def send_command(
+    command: str,
+    socket_path: Optional[Path] = None,
+    timeout: Optional[float] = None,
+    **arguments: Any,
+) -> Any:
+    """
+    Send command to the control socket of a running Astrality daemon.
+
+    :param command: Name of command, such as 'events'.
+    :param socket_path: Path to control socket. Defaults to
+        $TMPDIR/astrality/control.sock.
+    :param timeout: Seconds to wait for the response. Waits indefinitely by
+        default.
+    :param arguments: Arguments of the command.
+    :return: Result of the command.
+    """
+    socket_path = socket_path or default_socket_path()
+    request = dict(arguments, command=command)
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(str(socket_path))
+        connection.sendall((json.dumps(request) + '\n').encode())
+        with connection.makefile('rb') as response_file:
+            line = response_file.readline()
+
+    if not line:
+        raise ControlCommandError('Connection closed without response.')
+
+    response = json.loads(line.decode())
+    if 'error' in response:
+        raise ControlCommandError(response['error'])
+
+    return response['result']
+
+
+def take_over(
+    module_manager: ModuleManager,
+    socket_path: Optional[Path] = None,
+    timeout: float = 10,
+) -> bool:
+    """
+    Take over modules from the old instance serving the control socket.
+
+    Adopted modules are acknowledged to the old instance, which only then
+    skips their on_exit blocks. If the acknowledgement fails, the adopted
+    modules are started as usual instead.
+
+    :param module_manager: Module manager of the new instance, which has not
+        been started.
+    :param socket_path: Path to control socket of the old instance.
+    :param timeout: Seconds to wait for the old instance to respond.
+    :return: True if any modules were handed over.
+    """
+    try:
+        state = send_command(
+            'handover',
+            socket_path=socket_path,
+            timeout=timeout,
+            modules=handover_request(module_manager),
+        )
+    except OSError:
+        # No old instance is running
+        return False
+    except (ValueError, ControlCommandError) as error:
+        logger.error(f'Old Astrality instance could not hand over: {error}')
+        return False
+
+    adopt(module_manager, state)
+    if not module_manager.adopted_modules:
+        return False
+
+    try:
+        handed_over = send_command(
+            'handover_commit',
+            socket_path=socket_path,
+            timeout=timeout,
+            modules=sorted(module_manager.adopted_modules),
+        )
+    except (OSError, ValueError, ControlCommandError) as error:
+        logger.error(f'Old Astrality instance could not hand over: {error}')
+        handed_over = []
+
+    module_manager.adopted_modules &= set(handed_over)
+    return bool(module_manager.adopted_modules)
+
+
+def ctl(
+    command: str,
+    socket_path: Optional[Path] = None,
+    **arguments: Any,
+) -> int:
+    """
+    Execute `astrality ctl` command, printing the result.
+
+    :param command: Name of command, such as 'events'.
+    :param socket_path: Path to control socket.
+    :param arguments: Arguments of the command.
+    :return: Exit code of the command line interface.
+    """
+    try:
+        result = send_command(command, socket_path=socket_path, **arguments)
+    except OSError as error:
+        print(f'Could not connect to Astrality: {error}', file=sys.stderr)
+        return 1
+    except ControlCommandError as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    if command == 'events':
+        for module, event in sorted(result.items()):
+            print(f'{module}: {event}')
+    elif command == 'trigger':
+        for _, stdout in result:
+            print(stdout)
+    elif command == 'recompile':
+        print('\n'.join(result))
+    elif command == 'metrics':
+        print(result, end='')
+
+    return 0
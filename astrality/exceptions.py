@@ -15,3 +15,7 @@ class MisconfiguredConfigurationFile(AstralityConfigurationError):
 
 class GithubModuleError(AstralityConfigurationError):
     """Exception for when GitHub module could not be sourced."""
+
+
+class ControlCommandError(Exception):
+    """Exception for when a control command can not be performed."""
@@ -1,42 +1,240 @@
 """Module for directory modification watching."""
 
+from fnmatch import fnmatch
+import logging
+import os
 from pathlib import Path
-from typing import Callable
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
 
-from watchdog.events import FileModifiedEvent, FileSystemEventHandler
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
 from watchdog.observers import Observer
+from watchdog.observers.api import ObservedWatch
+
+logger = logging.getLogger('astrality')
+
+# Modifications within these directories are never acted upon
+IGNORED_DIRECTORIES = frozenset(('.git', '.hg', '.svn'))
+
+# Temporary files written by editors, such as vim and emacs
+IGNORED_FILE_PATTERNS = ('*.swp', '*.swx', '*.swo', '*~', '.#*', '4913')
+
+
+def ignored(path: Path) -> bool:
+    """
+    Return True if file system events for path should be ignored.
+
+    :param path: Path to created, modified, moved, or deleted file.
+    """
+    if IGNORED_DIRECTORIES.intersection(path.parts):
+        return True
+
+    return any(
+        fnmatch(path.name, pattern)
+        for pattern
+        in IGNORED_FILE_PATTERNS
+    )
+
+
+def nearest_existing_directory(path: Path) -> Optional[Path]:
+    """Return path or its closest parent which is an existing directory."""
+    for directory in (path,) + tuple(path.parents):
+        if directory.is_dir():
+            return directory
+
+    return None
+
+
+def watch_specification(paths: Iterable[Path]) -> Dict[Path, bool]:
+    """
+    Return directories which must be observed in order to watch paths.
+
+    Files are watched by a non-recursive watch of their parent directory,
+    while directories are watched recursively. Directories which are already
+    covered by a recursive watch of a parent directory are left out. Paths
+    within directories which do not exist yet are watched through their
+    nearest existing ancestor, such that the creation of the directories can
+    be detected.
+
+    :param paths: Absolute paths to files and directories to be watched.
+    :return: Dictionary with directory keys and boolean values indicating if
+        the directory should be watched recursively.
+    """
+    specification: Dict[Path, bool] = {}
+    for path in paths:
+        if path.is_dir():
+            specification[path] = True
+        elif path.parent.is_dir():
+            specification.setdefault(path.parent, False)
+        else:
+            ancestor = nearest_existing_directory(path.parent)
+            if ancestor is None:
+                logger.debug(f'Can not watch "{path}" without any parents.')
+            else:
+                specification.setdefault(ancestor, False)
+
+    recursive = [
+        directory
+        for directory, is_recursive
+        in specification.items()
+        if is_recursive
+    ]
+    return {
+        directory: is_recursive
+        for directory, is_recursive
+        in specification.items()
+        if not any(
+            parent in recursive
+            for parent
+            in directory.parents
+        )
+    }
 
 
 class DirectoryWatcher:
-    """A directory watcher class."""
+    """
+    A directory watcher class.
+
+    By default the entire directory is watched recursively. After invoking
+    DirectoryWatcher.watch(), only the specified paths are watched instead.
+    Watches are rearmed when directories are created, moved, or deleted, in
+    case the watched paths are within directories which did not exist.
+    """
 
     def __init__(
         self,
         directory: Path,
         on_modified: Callable[[Path], None],
+        quiet_window: float = 0,
+        max_queue_size: int = 1024,
     ) -> None:
         """
         Initialize a watcher which observes modifications in `directory`.
 
         on_modified: A callable which is invoked with the path of modified
-                     files within `directory`.
+                     files within `directory`. It is invoked from a single
+                     worker thread, never from the observer thread.
+        quiet_window: Seconds without new events for a path before
+                      on_modified is invoked, coalescing bursts of events
+                      into one invocation. 0 disables coalescing.
+        max_queue_size: Maximum number of paths with pending modifications.
         """
         self.on_modified = on_modified
+        self.quiet_window = quiet_window
+        self.max_queue_size = max_queue_size
         self.watched_directory = str(directory)
         self.observer = Observer()
+        self.queue: Optional[EventQueue] = None
+        self.event_handler: Optional[DirectoryEventHandler] = None
+
+        # Directories to be observed, and if they are observed recursively
+        self.paths: List[Path] = []
+        self.specification: Dict[Path, bool] = {Path(directory): True}
+        self.watches: Dict[Path, ObservedWatch] = {}
+        self.lock = threading.Lock()
 
     def start(self) -> None:
         """Start watching the specified directory for file modifications."""
-        event_handler = DirectoryEventHandler(self.on_modified)
-        self.observer.schedule(
-            event_handler,
-            self.watched_directory,
-            recursive=True,
+        self.queue = EventQueue(
+            callback=self.on_modified,
+            quiet_window=self.quiet_window,
+            max_size=self.max_queue_size,
         )
+        self.event_handler = DirectoryEventHandler(
+            on_modified=self.queue.put,
+            on_directory_changed=self.rearm,
+        )
+        with self.lock:
+            self.schedule()
         self.observer.start()
 
+    def watch(self, paths: Iterable[Path]) -> None:
+        """
+        Watch only the specified files and directories.
+
+        Files are watched through their parent directories, which are not
+        watched recursively, while directories are watched recursively.
+        The watches of a started watcher are replaced immediately.
+
+        :param paths: Absolute paths to files and directories to be watched.
+        """
+        with self.lock:
+            self.paths = list(paths)
+            self.specification = watch_specification(self.paths)
+            if self.event_handler:
+                self.schedule()
+
+    def rearm(self) -> None:
+        """
+        Update watches after directories have been created or removed.
+
+        Watched files which already exist within newly watched directories
+        are considered modified, as they might have been created before the
+        directories were watched.
+
+        Nested directories might be created before the watch of their parent
+        is in place, for instance by `mkdir -p`, so the specification is
+        recomputed until it no longer changes.
+        """
+        with self.lock:
+            new_directories: Set[Path] = set()
+            while True:
+                specification = watch_specification(self.paths)
+                if specification == self.specification:
+                    break
+
+                new_directories |= set(specification) - set(self.specification)
+                self.specification = specification
+                self.schedule()
+
+            if not new_directories:
+                return
+
+        for path in self.paths:
+            watched_by_new_directory = any(
+                directory in path.parents if recursive
+                else directory == path.parent
+                for directory, recursive
+                in specification.items()
+                if directory in new_directories
+            )
+            if watched_by_new_directory and path.is_file():
+                self.event_handler.modified(path)  # type: ignore
+
+    def schedule(self) -> None:
+        """
+        Replace observer watches which do not match the specification.
+
+        Must be invoked with the lock held.
+        """
+        assert self.event_handler is not None
+
+        for directory, watch in tuple(self.watches.items()):
+            if watch.is_recursive != self.specification.get(directory):
+                self.observer.unschedule(watch)
+                del self.watches[directory]
+
+        for directory, recursive in self.specification.items():
+            if directory in self.watches:
+                continue
+
+            try:
+                self.watches[directory] = self.observer.schedule(
+                    self.event_handler,
+                    str(directory),
+                    recursive=recursive,
+                )
+            except OSError as error:
+                logger.error(f'Could not watch "{directory}": {error}')
+
+        logger.debug(f'Watching {len(self.watches)} directories.')
+
     def stop(self) -> None:
         """Stop watching the directory."""
+        if self.queue:
+            self.queue.stop()
+
         if self.observer.is_alive():
             try:
                 self.observer.stop()
@@ -46,17 +244,216 @@ class DirectoryWatcher:
                 # it sometimes throws a RuntimeError
                 pass
 
+    def metrics(self) -> Dict[str, int]:
+        """Return metrics of the file modification queue."""
+        if self.queue is None:
+            return EventQueue.empty_metrics()
+
+        return self.queue.metrics()
+
 
 class DirectoryEventHandler(FileSystemEventHandler):
     """An event handler for filesystem changes within a directory."""
 
-    def __init__(self, on_modified: Callable[[Path], None]) -> None:
+    def __init__(
+        self,
+        on_modified: Callable[[Path], object],
+        on_directory_changed: Optional[Callable[[], None]] = None,
+    ) -> None:
         """Initialize event handler with callback functions."""
         self._on_modified = on_modified
+        self._on_directory_changed = on_directory_changed
 
-    def on_modified(self, event: FileModifiedEvent) -> None:
+    def on_modified(self, event: FileSystemEvent) -> None:
         """Call on_modified callback function on modifed event in dir."""
         if event.is_directory:
             return
 
-        self._on_modified(Path(event.src_path).absolute())
+        self.modified(event_path(event.src_path))
+
+    def on_created(self, event: FileSystemEvent) -> None:
+        """
+        Call on_modified callback function on created files in dir.
+
+        Some editors save files by writing a new file, which should be
+        considered a modification.
+        """
+        if event.is_directory:
+            self.directory_changed(event_path(event.src_path))
+            return
+
+        self.modified(event_path(event.src_path))
+
+    def on_deleted(self, event: FileSystemEvent) -> None:
+        """Call on_directory_changed callback function on deleted dirs."""
+        if event.is_directory:
+            self.directory_changed(event_path(event.src_path))
+
+    def on_moved(self, event: FileSystemEvent) -> None:
+        """Call callback functions on moves in dir."""
+        # Editors often save files by moving a temporary file over the
+        # original file, which should be considered a modification.
+        if not event.is_directory:
+            self.modified(event_path(event.dest_path))
+        else:
+            self.directory_changed(event_path(event.dest_path))
+
+    def modified(self, path: Path) -> None:
+        """Invoke on_modified callback function unless path is ignored."""
+        if not ignored(path):
+            self._on_modified(path)
+
+    def directory_changed(self, path: Path) -> None:
+        """Invoke on_directory_changed callback function if it is provided."""
+        if self._on_directory_changed and not ignored(path):
+            self._on_directory_changed()
+
+
+def event_path(path: Union[bytes, str]) -> Path:
+    """Return absolute path from the source or destination of an event."""
+    return Path(os.fsdecode(path)).absolute()
+
+
+class EventQueue:
+    """
+    Queue of file modifications handled by a single worker thread.
+
+    The observer thread only puts modified paths into the queue, so long
+    running callbacks never stall the delivery of file system events.
+    Modifications of a path which is already queued are coalesced, and the
+    callback is only invoked once no new modifications of the path have been
+    put for `quiet_window` seconds. Editors often emit several file system
+    events when saving a file, for instance by truncating, writing, and
+    changing permissions.
+
+    When `max_size` paths are queued, producers are blocked for up to
+    `put_timeout` seconds before the modification is dropped.
+
+    :param callback: Callable invoked with each modified path.
+    :param quiet_window: Seconds without new modifications before invocation.
+    :param max_size: Maximum number of queued paths.
+    :param put_timeout: Seconds to wait for space in a full queue.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[Path], None],
+        quiet_window: float = 0,
+        max_size: int = 1024,
+        put_timeout: float = 1,
+    ) -> None:
+        """Initialize queue without starting the worker thread."""
+        self.callback = callback
+        self.quiet_window = quiet_window
+        self.max_size = max_size
+        self.put_timeout = put_timeout
+
+        # Queued paths and when they are quiet, ordered by deadline
+        self._deadlines: Dict[Path, float] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._metrics = self.empty_metrics()
+
+    @staticmethod
+    def empty_metrics() -> Dict[str, int]:
+        """Return metrics of a queue which has not received anything."""
+        return {
+            'depth': 0,
+            'max_depth': 0,
+            'coalesced': 0,
+            'delivered': 0,
+            'dropped': 0,
+        }
+
+    def put(self, path: Path) -> bool:
+        """
+        Put modification of path, postponing any pending invocation.
+
+        :param path: Absolute path to modified file.
+        :return: False if the modification was dropped.
+        """
+        with self._condition:
+            if self._stopped:
+                return False
+
+            if path in self._deadlines:
+                # Re-insert the path in order to keep deadlines sorted
+                del self._deadlines[path]
+                self._metrics['coalesced'] += 1
+            elif not self._condition.wait_for(
+                lambda: len(self._deadlines) < self.max_size,
+                timeout=self.put_timeout,
+            ):
+                self._metrics['dropped'] += 1
+                logger.warning(
+                    f'File modification queue is full. Dropping "{path}"!',
+                )
+                return False
+
+            self._deadlines[path] = time.monotonic() + self.quiet_window
+            self._metrics['max_depth'] = max(
+                self._metrics['max_depth'],
+                len(self._deadlines),
+            )
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name='astrality-file-events',
+                    daemon=True,
+                )
+                self._thread.start()
+
+            self._condition.notify_all()
+            return True
+
+    def stop(self) -> None:
+        """Stop the worker thread, discarding queued modifications."""
+        with self._condition:
+            self._stopped = True
+            self._deadlines.clear()
+            self._condition.notify_all()
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Return queue metrics.
+
+        :return: Dictionary containing the current number of queued paths,
+            `depth`, the highest number of queued paths, `max_depth`, and
+            the number of `coalesced`, `delivered`, and `dropped`
+            modifications.
+        """
+        with self._condition:
+            metrics = dict(self._metrics)
+            metrics['depth'] = len(self._deadlines)
+            return metrics
+
+    def _run(self) -> None:
+        """Invoke callback for paths as they become quiet."""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if not self._deadlines:
+                        self._condition.wait()
+                        continue
+
+                    path, deadline = next(iter(self._deadlines.items()))
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        del self._deadlines[path]
+                        self._metrics['delivered'] += 1
+
+                        # Wake up producers waiting for space
+                        self._condition.notify_all()
+                        break
+
+                    self._condition.wait(timeout=timeout)
+
+                if self._stopped:
+                    return
+
+            try:
+                self.callback(path)
+            except Exception:
+                logger.exception(f'Could not handle "{path}" modification!')
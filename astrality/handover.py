@@ -0,0 +1,276 @@
+"""
+Module implementing the handover of modules between Astrality instances.
+
+When a new Astrality instance is started, it asks the old instance to hand
+over modules which are configured identically, before the old instance is
+terminated. The old instance offers these modules, and only hands them over
+when the new instance acknowledges having adopted them, such that modules are
+never left without an instance if the new instance fails before that. Handed
+over modules skip their on_exit blocks in the old instance and their
+on_startup blocks in the new instance. The new instance takes over
+the context store, the performed compilations, and the events of these
+modules, and only recompiles templates using context sections which have
+changed in the meantime.
+
+The handover is performed over the control socket of the old instance, so
+all exchanged state is JSON serialized.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+from astrality import compiler
+from astrality.actions import CompileAction
+from astrality.module import Module, ModuleManager
+from astrality.resolver import Resolver
+
+logger = logging.getLogger('astrality')
+
+
+def normalize(value: Any) -> Any:
+    """Return value as it is after a JSON round trip."""
+    return json.loads(json.dumps(value, default=str))
+
+
+def encode_context(context: compiler.Context) -> List[List[Any]]:
+    """
+    Return JSON serializable representation of context sections.
+
+    Mappings are encoded as lists of key-value pairs, as integer keys would
+    otherwise be converted to strings.
+
+    :param context: Dictionary with section name keys and Resolver values.
+    :return: List of [section name, encoded section] pairs.
+    """
+    def encode(value: Any) -> Any:
+        if isinstance(value, (Resolver, dict)):
+            return {
+                'items': [[key, encode(item)] for key, item in value.items()],
+            }
+        elif isinstance(value, (list, tuple)):
+            return [encode(item) for item in value]
+        return normalize(value)
+
+    return [
+        [name, encode(section)]
+        for name, section
+        in context.items()
+    ]
+
+
+def decode_context(encoded: List[List[Any]]) -> compiler.Context:
+    """
+    Return context sections encoded by encode_context().
+
+    :param encoded: List of [section name, encoded section] pairs.
+    :return: Dictionary with section name keys and Resolver values.
+    """
+    def decode(value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: decode(item) for key, item in value['items']}
+        elif isinstance(value, list):
+            return [decode(item) for item in value]
+        return value
+
+    return {
+        name: Resolver(decode(section))
+        for name, section
+        in encoded
+    }
+
+
+def compile_actions(module: Module) -> List[CompileAction]:
+    """Return compile actions of module, in the order of its configuration."""
+    return [
+        compile_action
+        for action_block in module.all_action_blocks()
+        for compile_action in action_block._compile_actions
+    ]
+
+
+def can_be_handed_over(module: Module) -> bool:
+    """
+    Return True if module can be handed over between instances.
+
+    Templates compiled to temporary files are deleted when the old instance
+    exits, so such modules are always restarted.
+    """
+    return not any(
+        compile_action.uses_temporary_target()
+        for compile_action
+        in compile_actions(module)
+    )
+
+
+def handover_request(module_manager: ModuleManager) -> Dict[str, Any]:
+    """
+    Return description of modules a new instance wants to take over.
+
+    :param module_manager: Module manager of the new instance, which has not
+        been started.
+    :return: Dictionary with module name keys and values containing the
+        `config`, `directory`, and current `event` of the module.
+    """
+    return {
+        name: {
+            'config': normalize(module.module_config),
+            'directory': str(module.directory),
+            'event': module.event(),
+        }
+        for name, module
+        in module_manager.modules.items()
+        if can_be_handed_over(module)
+    }
+
+
+def hand_over(
+    module_manager: ModuleManager,
+    modules: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Offer identically configured modules to a new instance.
+
+    Modules are only offered if their configuration, directory, and event
+    are unchanged. Offered modules are handed over by commit_handover().
+
+    :param module_manager: Module manager of the old, running instance.
+    :param modules: Modules requested by the new instance, as returned by
+        handover_request().
+    :return: Dictionary containing the performed `compilations` of each
+        compile action of the handed over modules, and the `context` and
+        `defined_context` sections of the old instance.
+    """
+    compilations: Dict[str, List[List[List[Any]]]] = {}
+    module_manager.offered_modules = set()
+    for name, request in modules.items():
+        module = module_manager.modules.get(name)
+        if module is None or not can_be_handed_over(module):
+            continue
+
+        event = module_manager.last_module_events.get(name)
+        unchanged = normalize(module.module_config) == request['config'] \
+            and str(module.directory) == request['directory'] \
+            and event == request['event']
+        if not unchanged:
+            continue
+
+        module_manager.offered_modules.add(name)
+        compilations[name] = [
+            [
+                [str(template), sorted(str(target) for target in targets)]
+                for template, targets
+                in compile_action.performed_compilations().items()
+            ]
+            for compile_action
+            in compile_actions(module)
+        ]
+
+    logger.info(
+        'Offered modules to new Astrality instance: '
+        f'{", ".join(compilations) or "none"}.',
+    )
+    return {
+        'compilations': compilations,
+        'context': encode_context(module_manager.application_context),
+        'defined_context': encode_context(module_manager.defined_context),
+    }
+
+
+def commit_handover(
+    module_manager: ModuleManager,
+    modules: List[str],
+) -> List[str]:
+    """
+    Hand over offered modules which have been adopted by the new instance.
+
+    Handed over modules skip their on_exit blocks when the module manager
+    exits.
+
+    :param module_manager: Module manager of the old, running instance.
+    :param modules: Names of modules adopted by the new instance.
+    :return: Sorted names of handed over modules.
+    """
+    handed_over = module_manager.offered_modules & set(modules)
+    module_manager.handed_over_modules |= handed_over
+    module_manager.offered_modules = set()
+
+    logger.info(
+        'Handed over modules to new Astrality instance: '
+        f'{", ".join(sorted(handed_over)) or "none"}.',
+    )
+    return sorted(handed_over)
+
+
+def adopt(module_manager: ModuleManager, state: Dict[str, Any]) -> None:
+    """
+    Take over modules handed over by an old instance.
+
+    Adopted modules skip their on_startup blocks, and recompile templates
+    using context sections which have been changed since the old instance
+    was configured.
+
+    :param module_manager: Module manager of the new instance, which has not
+        been started.
+    :param state: Dictionary returned by hand_over().
+    """
+    adopted: List[Module] = []
+    for name, module_compilations in state['compilations'].items():
+        module = module_manager.modules.get(name)
+        if module is None:
+            continue
+
+        for compile_action, compilations in zip(
+            compile_actions(module),
+            module_compilations,
+        ):
+            compile_action.restore_compilations({
+                Path(template): set(Path(target) for target in targets)
+                for template, targets
+                in compilations
+            })
+        module_manager.adopted_modules.add(name)
+        adopted.append(module)
+
+    # Context sections imported by the old instance are kept, while sections
+    # defined by the configuration are taken from the new configuration.
+    context = decode_context(state['context'])
+    for name, section in context.items():
+        if name not in module_manager.defined_context:
+            module_manager.application_context[name] = section
+
+    changed_sections = changed_context_sections(
+        old=state['defined_context'],
+        new=encode_context(module_manager.defined_context),
+    )
+    if changed_sections:
+        module_manager.recompile_templates_using(
+            sections=changed_sections,
+            modules=adopted,
+        )
+
+    logger.info(
+        'Adopted modules from old Astrality instance: '
+        f'{", ".join(module.name for module in adopted) or "none"}.',
+    )
+
+
+def changed_context_sections(
+    old: List[List[Any]],
+    new: List[List[Any]],
+) -> Set[str]:
+    """
+    Return names of added, removed, and changed context sections.
+
+    :param old: Encoded context sections of the old instance.
+    :param new: Encoded context sections of the new instance.
+    """
+    old_sections = dict((name, section) for name, section in old)
+    new_sections = dict((name, section) for name, section in new)
+    return {
+        name
+        for name
+        in set(old_sections) | set(new_sections)
+        if old_sections.get(name) != new_sections.get(name)
+    }
@@ -0,0 +1,459 @@
+"""
+Module for exporting metrics in the Prometheus text exposition format.
+
+Metrics are recorded in a global registry, and can be exported to a text file
+which is rewritten atomically on a schedule, for instance for the textfile
+collector of the Prometheus node exporter, and/or served over HTTP on a local
+Unix socket.
+"""
+
+from http.server import BaseHTTPRequestHandler
+import logging
+import os
+from pathlib import Path
+import socketserver
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger('astrality')
+
+LabelValues = Tuple[str, ...]
+
+# Upper bounds of histogram buckets, given in seconds
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def format_value(value: float) -> str:
+    """Return sample value formatted according to the exposition format."""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Return label set formatted according to the exposition format."""
+    if not names:
+        return ''
+
+    labels = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n'),
+        )
+        for name, value
+        in zip(names, values)
+    )
+    return '{' + labels + '}'
+
+
+class Metric:
+    """
+    Base class of metrics with an optional set of labels.
+
+    :param name: Name of metric, such as 'astrality_events_total'.
+    :param documentation: Help text of metric.
+    :param label_names: Names of labels which must be given for each sample.
+    """
+
+    type = 'untyped'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+    ) -> None:
+        """Initialize metric without any samples."""
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        """Return label values in the order of the label names."""
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def value(self, **labels: str) -> float:
+        """Return the current value of the sample with labels."""
+        with self.lock:
+            return self._values.get(self._label_values(labels), 0)
+
+    def clear(self) -> None:
+        """Remove all samples."""
+        with self.lock:
+            self._values.clear()
+
+    def exposition(self) -> List[str]:
+        """Return lines of the metric in the text exposition format."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        with self.lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = format_labels(self.label_names, label_values)
+                lines.append(f'{self.name}{labels} {format_value(value)}')
+
+        return lines
+
+
+class Counter(Metric):
+    """Metric which value only increases."""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """
+        Increment the counter.
+
+        :param amount: Non-negative amount to increment the counter by.
+        :param labels: Values of all labels of the metric.
+        """
+        key = self._label_values(labels)
+        with self.lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Metric which value can be set arbitrarily."""
+
+    type = 'gauge'
+
+    def set(self, value: float, **labels: str) -> None:
+        """
+        Set the value of the gauge.
+
+        :param value: New value.
+        :param labels: Values of all labels of the metric.
+        """
+        with self.lock:
+            self._values[self._label_values(labels)] = value
+
+
+class Histogram(Metric):
+    """
+    Metric which counts observations in cumulative buckets.
+
+    :param buckets: Increasing upper bounds of buckets, excluding +Inf.
+    """
+
+    type = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initialize histogram without any observations."""
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._observations: Dict[LabelValues, List[float]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        Observe a value, such as a duration in seconds.
+
+        :param value: Observed value.
+        :param labels: Values of all labels of the metric.
+        """
+        key = self._label_values(labels)
+        with self.lock:
+            if key not in self._observations:
+                self._observations[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+
+            counts = self._observations[key]
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    counts[index] += 1
+            self._sums[key] += value
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations with labels."""
+        with self.lock:
+            counts = self._observations.get(self._label_values(labels))
+            return int(counts[-1]) if counts else 0
+
+    def clear(self) -> None:
+        """Remove all observations."""
+        with self.lock:
+            self._observations.clear()
+            self._sums.clear()
+
+    def exposition(self) -> List[str]:
+        """Return lines of the metric in the text exposition format."""
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.type}',
+        ]
+        names = self.label_names
+        with self.lock:
+            for label_values, counts in sorted(self._observations.items()):
+                for upper_bound, count in zip(self.buckets, counts):
+                    labels = format_labels(
+                        names + ('le',),
+                        label_values + (format_value(upper_bound),),
+                    )
+                    lines.append(f'{self.name}_bucket{labels} {count}')
+
+                labels = format_labels(names, label_values)
+                total = format_value(self._sums[label_values])
+                lines.append(f'{self.name}_sum{labels} {total}')
+                lines.append(f'{self.name}_count{labels} {counts[-1]}')
+
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Registry of all metrics exported by Astrality.
+
+    Collectors are callables which are invoked before each export, in order
+    to update metrics which are cheaper to read on demand, such as queue
+    depths.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty registry."""
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """Add metric to registry, returning it."""
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        """Create and register Counter, see :class:`Metric` for arguments."""
+        return self.register(Counter(*args, **kwargs))  # type: ignore
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        """Create and register Gauge, see :class:`Metric` for arguments."""
+        return self.register(Gauge(*args, **kwargs))  # type: ignore
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        """Create and register Histogram, see :class:`Histogram`."""
+        return self.register(Histogram(*args, **kwargs))  # type: ignore
+
+    def exposition(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        for collector in tuple(self.collectors):
+            try:
+                collector()
+            except Exception:
+                logger.exception('Could not collect metrics!')
+
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.exposition())
+
+        return '\n'.join(lines) + '\n'
+
+    def clear(self) -> None:
+        """Remove all samples of all metrics."""
+        for metric in self.metrics.values():
+            metric.clear()
+
+
+# Registry used throughout Astrality
+metrics = MetricsRegistry()
+
+events_total = metrics.counter(
+    'astrality_events_total',
+    'Number of new events detected by module event listeners.',
+    ('module',),
+)
+file_modifications_total = metrics.counter(
+    'astrality_file_modifications_total',
+    'Number of handled modifications of watched files.',
+)
+unchanged_modifications_total = metrics.counter(
+    'astrality_unchanged_modifications_total',
+    'Number of modifications skipped since the file content was unchanged.',
+)
+skipped_writes_total = metrics.counter(
+    'astrality_skipped_writes_total',
+    'Number of template compilations skipped since the template content '
+    'was unchanged.',
+)
+action_duration_seconds = metrics.histogram(
+    'astrality_action_duration_seconds',
+    'Duration of module actions, such as compile and run actions.',
+    ('module', 'block', 'action'),
+)
+compiled_bytes_total = metrics.counter(
+    'astrality_compiled_bytes_total',
+    'Number of bytes written by template compilations.',
+)
+shell_command_duration_seconds = metrics.histogram(
+    'astrality_shell_command_duration_seconds',
+    'Duration of shell commands, including shell filters and requirements.',
+)
+shell_command_timeouts_total = metrics.counter(
+    'astrality_shell_command_timeouts_total',
+    'Number of shell commands which did not finish within their timeout.',
+)
+shell_processes = metrics.gauge(
+    'astrality_shell_processes',
+    'Number of shell command processes which are queued, waited for, or '
+    'left running in the background after timing out.',
+    ('state',),
+)
+watcher_queue_depth = metrics.gauge(
+    'astrality_watcher_queue_depth',
+    'Number of modified paths waiting to be handled.',
+)
+watcher_events_total = metrics.counter(
+    'astrality_watcher_events_total',
+    'Number of file system events by outcome, since startup.',
+    ('outcome',),
+)
+path_cache_lookups_total = metrics.counter(
+    'astrality_path_cache_lookups_total',
+    'Number of path expansions by cache result, either hit or miss.',
+    ('result',),
+)
+scheduler_lateness_seconds = metrics.histogram(
+    'astrality_scheduler_lateness_seconds',
+    'Delay between scheduled and handled event transitions.',
+)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """HTTP request handler responding with the metrics of the server."""
+
+    def do_GET(self) -> None:
+        """Respond with all metrics in the text exposition format."""
+        body = self.server.registry.exposition().encode()  # type: ignore
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        """Return client address, which is unnamed for Unix sockets."""
+        return 'unix'
+
+    def log_message(self, format: str, *args) -> None:
+        """Log requests at the debug level only."""
+        logger.debug('Metrics request: ' + format % args)
+
+
+class MetricsServer(
+    socketserver.ThreadingMixIn,
+    socketserver.UnixStreamServer,
+):
+    """HTTP server serving metrics on a Unix socket."""
+
+    daemon_threads = True
+
+    def __init__(self, path: Path, registry: MetricsRegistry) -> None:
+        """Bind server to socket path, replacing any stale socket."""
+        if path.is_socket():
+            path.unlink()
+
+        self.registry = registry
+        super().__init__(str(path), MetricsRequestHandler)
+
+
+class MetricsExporter:
+    """
+    Exporter of metrics to a text file and/or a Unix socket.
+
+    :param registry: Registry of exported metrics.
+    :param metrics_file: Path to text file, rewritten every `interval`.
+    :param interval: Seconds between each rewrite of the metrics file.
+    :param socket_path: Path to Unix socket served by an HTTP server.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        metrics_file: Optional[Path] = None,
+        interval: float = 15,
+        socket_path: Optional[Path] = None,
+    ) -> None:
+        """Initialize exporter which has not been started."""
+        self.registry = registry
+        self.metrics_file = metrics_file
+        self.interval = interval
+        self.socket_path = socket_path
+
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._server: Optional[MetricsServer] = None
+
+    def start(self) -> None:
+        """Start exporting metrics in background threads."""
+        if self.metrics_file:
+            self._threads.append(threading.Thread(
+                target=self._write_periodically,
+                name='astrality-metrics-file',
+                daemon=True,
+            ))
+
+        if self.socket_path:
+            try:
+                self._server = MetricsServer(
+                    path=self.socket_path,
+                    registry=self.registry,
+                )
+            except OSError as error:
+                logger.error(
+                    f'Could not serve metrics on "{self.socket_path}": {error}',
+                )
+            else:
+                self._threads.append(threading.Thread(
+                    target=self._server.serve_forever,
+                    name='astrality-metrics-socket',
+                    daemon=True,
+                ))
+
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop exporting metrics, writing the metrics file a final time."""
+        self._stopped.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            try:
+                self.socket_path.unlink()  # type: ignore
+            except OSError:
+                pass
+
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def write(self) -> None:
+        """Atomically replace the metrics file with the current metrics."""
+        metrics_file: Path = self.metrics_file  # type: ignore
+        temporary_file = metrics_file.with_name(f'.{metrics_file.name}.tmp')
+        try:
+            os.makedirs(metrics_file.parent, exist_ok=True)
+            temporary_file.write_text(self.registry.exposition())
+            os.replace(temporary_file, metrics_file)
+        except OSError as error:
+            logger.error(f'Could not write metrics "{metrics_file}": {error}')
+
+    def _write_periodically(self) -> None:
+        """Write the metrics file every interval until stopped."""
+        while True:
+            self.write()
+            if self._stopped.wait(timeout=self.interval):
+                self.write()
+                return
@@ -2,10 +2,15 @@
 
 import logging
 from collections import defaultdict
-from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import datetime, timedelta
 from pathlib import Path
 import re
+import threading
+import time
 from typing import (
+    Any,
     Callable,
     DefaultDict,
     Dict,
@@ -21,11 +26,17 @@ from typing import (
 from mypy_extensions import TypedDict
 
 from astrality import compiler
-from astrality.actions import ActionBlock, ActionBlockDict
+from astrality.actions import (
+    ActionBlock,
+    ActionBlockDict,
+    CompileAction,
+    RunAction,
+)
 from astrality.compiler import context
 from astrality.config import (
     ApplicationConfig,
     GlobalModulesConfig,
+    clear_expand_path_cache,
     expand_path,
     user_configuration,
 )
@@ -34,10 +45,28 @@ from astrality.event_listener import (
     EventListenerConfig,
     event_listener_factory,
 )
+from astrality.exceptions import (
+    AstralityConfigurationError,
+    ControlCommandError,
+    MisconfiguredConfigurationFile,
+)
 from astrality.filewatcher import DirectoryWatcher
+from astrality.metrics import (
+    events_total,
+    file_modifications_total,
+    metrics,
+    skipped_writes_total,
+    unchanged_modifications_total,
+    watcher_events_total,
+    watcher_queue_depth,
+)
 from astrality.resolver import Resolver
 from astrality.requirements import Requirement, RequirementDict
-from astrality.utils import cast_to_list
+from astrality.scheduler import EventScheduler
+from astrality.processes import processes
+from astrality.profiler import profiler
+from astrality.timing import Timings, tracer
+from astrality.utils import cast_to_list, file_digest
 
 
 class ModuleConfigDict(TypedDict, total=False):
@@ -65,6 +94,9 @@ class ModuleActionBlocks(TypedDict):
 ModuleConfig = Dict[str, ModuleConfigDict]
 logger = logging.getLogger('astrality')
 
+# Placeholders in string options, such as {path/to/template}
+PLACEHOLDER_PATTERN = re.compile(r'({.+})')
+
 
 class Module:
     """
@@ -85,6 +117,7 @@ class Module:
         files, such as `config.yml`. All relative paths use this as anchor.
     :param replacer: String options should be processed by this function in
         order to replace relevant placeholders.
+    :param timings: Registry where the durations of actions are recorded.
     """
 
     action_blocks: ModuleActionBlocks
@@ -95,6 +128,7 @@ class Module:
         module_directory: Path,
         replacer: Callable[[str], str] = lambda string: string,
         context_store: compiler.Context = {},
+        timings: Optional[Timings] = None,
     ) -> None:
         """
         Initialize Module object with a section from a config dictionary.
@@ -116,6 +150,9 @@ class Module:
         section: str = next(iter(module_config.keys()))
         self.name: str = section[7:]
 
+        # Keep the configuration in order to detect configuration changes
+        self.module_config = module_config
+
         # The source directory for the module, determining how to interpret
         # relative paths in the module config
         self.directory = module_directory
@@ -136,6 +173,17 @@ class Module:
             )
 
         self.context_store = context_store
+        self.timings = timings or Timings()
+
+        # Index of all performed compilations, updated by the compile actions
+        # of the module, and a version number which is incremented on change.
+        self._compilations: DefaultDict[Path, Set[Path]] = defaultdict(set)
+        self._compilations_version = 0
+
+        # Cache of interpolated strings, valid for the event and compilations
+        # version stored in self._interpolations_key.
+        self._interpolations: Dict[str, str] = {}
+        self._interpolations_key: Optional[Tuple[str, int]] = None
 
         # Create action block object for each available action block type
         action_blocks: ModuleActionBlocks = {'on_modified': {}}  # type: ignore
@@ -148,6 +196,7 @@ class Module:
                 directory=self.directory,
                 replacer=self.interpolate_string,
                 context_store=self.context_store,
+                on_compiled=self.add_compilation,
             )
         for path_string, action_block_dict \
                 in module_config_content.get('on_modified', {}).items():
@@ -161,9 +210,85 @@ class Module:
                     directory=self.directory,
                     replacer=self.interpolate_string,
                     context_store=self.context_store,
+                    on_compiled=self.add_compilation,
             )
         self.action_blocks = action_blocks
 
+        # Flat execution plans of each action block and the blocks it
+        # triggers, keyed by (block_name, path). Computed once, as trigger
+        # paths never change.
+        self._execution_plans: Dict[
+            Tuple[str, Optional[Path]],
+            Tuple[ActionBlock, ...],
+        ] = {}
+        for block_name in ('on_startup', 'on_event', 'on_exit'):
+            self._execution_plan(block_name=block_name)
+        for modified_path in action_blocks['on_modified']:
+            self._execution_plan(block_name='on_modified', path=modified_path)
+
+    def _execution_plan(
+        self,
+        block_name: str,
+        path: Optional[Path] = None,
+        triggered_by: Tuple[Tuple[str, Optional[Path]], ...] = (),
+    ) -> Tuple[ActionBlock, ...]:
+        """
+        Compute execution plan of action block block_name[:path].
+
+        :param block_name: Name of block such as 'on_startup'.
+        :param path: Absolute path in case of block_name == 'on_modified'.
+        :param triggered_by: Chain of (block_name, path) tuples triggering
+            this action block, used for detecting trigger cycles.
+        :return: Tuple of action blocks in order of execution.
+        """
+        key = (block_name, path)
+        if key in self._execution_plans:
+            return self._execution_plans[key]
+
+        if key in triggered_by:
+            cycle = ' -> '.join(
+                name + (f':{trigger_path}' if trigger_path else '')
+                for name, trigger_path
+                in triggered_by[triggered_by.index(key):] + (key,)
+            )
+            raise MisconfiguredConfigurationFile(
+                f'[module/{self.name}] Trigger cycle detected: {cycle}.',
+            )
+
+        try:
+            action_block = self.get_action_block(name=block_name, path=path)
+        except KeyError:
+            raise MisconfiguredConfigurationFile(
+                f'[module/{self.name}] Triggered block '
+                f'"{block_name}:{path}" is not defined.',
+            )
+
+        with self.timings.measure(self.name, block_name, 'trigger'):
+            triggers = action_block.triggers()
+
+        plan: Tuple[ActionBlock, ...] = (action_block,)
+        for trigger in triggers:
+            plan += self._execution_plan(
+                block_name=trigger.block,
+                path=trigger.absolute_path,
+                triggered_by=triggered_by + (key,),
+            )
+
+        self._execution_plans[key] = plan
+        return plan
+
+    def has_same_configuration(self, other: Optional['Module']) -> bool:
+        """
+        Return True if other module is configured identically.
+
+        :param other: Module to compare with.
+        """
+        if other is None:
+            return False
+
+        return self.module_config == other.module_config \
+            and self.directory == other.directory
+
     def get_action_block(
         self,
         name: str,
@@ -194,16 +319,18 @@ class Module:
         :param block_name: Name of block such as 'on_startup'.
         :param path: Absolute path in case of block_name == 'on_modified'.
         """
-        action_block = self.get_action_block(name=block_name, path=path)
-        action_block.import_context()
-
-        # Import context sections from triggered action blocks
-        triggers = action_block.triggers()
-        for trigger in triggers:
-            self.import_context(
-                block_name=trigger.block,
-                path=trigger.absolute_path,
-            )
+        # Import context sections from triggered action blocks as well
+        for action_block in self.triggered_action_blocks(block_name, path):
+            for action in action_block._import_context_actions:
+                if action.null_object:
+                    continue
+                with self.timings.measure(
+                    self.name,
+                    block_name,
+                    'import_context',
+                    from_path=partial(action.option, key='from_path'),
+                ):
+                    action.execute()
 
     def compile(
         self,
@@ -216,22 +343,25 @@ class Module:
         :param block_name: Name of block such as 'on_startup'.
         :param path: Absolute path in case of block_name == 'on_modified'.
         """
-        action_block = self.get_action_block(name=block_name, path=path)
-        action_block.compile()
-
-        # Compile templates from triggered action blocks
-        triggers = action_block.triggers()
-        for trigger in triggers:
-            self.compile(
-                block_name=trigger.block,
-                path=trigger.absolute_path,
-            )
+        # Compile templates from triggered action blocks as well
+        for action_block in self.triggered_action_blocks(block_name, path):
+            for action in action_block._compile_actions:
+                if action.null_object:
+                    continue
+                with self.timings.measure(
+                    self.name,
+                    block_name,
+                    'compile',
+                    source=partial(action.option, key='source'),
+                ):
+                    action.execute()
 
     def run(
         self,
         block_name: str,
         default_timeout: Union[int, float],
         path: Optional[Path] = None,
+        budget: Optional[Union[int, float]] = None,
     ) -> Tuple[Tuple[str, str], ...]:
         """
         Execute all run actions specified in block_name[:path].
@@ -239,23 +369,85 @@ class Module:
         :param block_name: Name of block such as 'on_startup'.
         :param default_timeout: Default timeout for run actions.
         :param path: Absolute path in case of block_name == 'on_modified'.
+        :param budget: Total number of seconds the run actions are allowed to
+            wait for their commands. Commands are not started after the
+            budget is spent.
         """
-        action_block = self.get_action_block(name=block_name, path=path)
-        results = action_block.run(default_timeout=default_timeout)
+        deadline = None if budget is None else time.monotonic() + budget
+        results: Tuple[Tuple[str, str], ...] = tuple()
+        for run_action in self.run_actions(block_name=block_name, path=path):
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(
+                        f'[module/{self.name}] {block_name} exceeded its '
+                        f'budget of {budget} seconds. Skipping command '
+                        f'"{run_action.option(key="shell")}".',
+                    )
+                    continue
 
-        # Run shell commands from triggered action blocks
-        triggers = action_block.triggers()
-        for trigger in triggers:
-            new_results = self.run(
-                block_name=trigger.block,
-                default_timeout=default_timeout,
-                path=trigger.absolute_path,
-            )
-            if new_results:
-                results += new_results
+            with self.timings.measure(
+                self.name,
+                block_name,
+                'run',
+                command=partial(run_action.option, key='shell'),
+            ):
+                result = run_action.execute(
+                    default_timeout=default_timeout,
+                    max_timeout=remaining,
+                )
+            if result:
+                results += (result,)
 
         return results
 
+    def run_actions(
+        self,
+        block_name: str,
+        path: Optional[Path] = None,
+    ) -> Tuple[RunAction, ...]:
+        """
+        Return all run actions specified in block_name[:path].
+
+        Run actions from triggered action blocks are included, in the same
+        order as they would be executed by Module.run().
+
+        :param block_name: Name of block such as 'on_startup'.
+        :param path: Absolute path in case of block_name == 'on_modified'.
+        """
+        return tuple(
+            run_action
+            for action_block
+            in self.triggered_action_blocks(block_name=block_name, path=path)
+            for run_action
+            in action_block._run_actions
+            if not run_action.null_object
+        )
+
+    def triggered_action_blocks(
+        self,
+        block_name: str,
+        path: Optional[Path] = None,
+    ) -> Tuple[ActionBlock, ...]:
+        """
+        Return action block block_name[:path] and all blocks it triggers.
+
+        The execution plan is precomputed when the module is initialized.
+
+        :param block_name: Name of block such as 'on_startup'.
+        :param path: Absolute path in case of block_name == 'on_modified'.
+        :return: Tuple of action blocks in order of execution.
+        """
+        if path:
+            assert block_name == 'on_modified'
+        return self._execution_plans[(block_name, path)]
+
+    def event(self) -> str:
+        """Return the current event of the module event listener."""
+        with self.timings.measure(self.name, 'event_listener', 'event'):
+            return self.event_listener.event()
+
     def all_action_blocks(self) -> Iterable[ActionBlock]:
         """Return flatten tuple of all module action blocks."""
         return (
@@ -273,34 +465,60 @@ class Module:
             compilation target paths for that template.
         """
         performed_compilations: DefaultDict[Path, Set[Path]] = defaultdict(set)
-        for action_block in self.all_action_blocks():
-            for template, targets \
-                    in action_block.performed_compilations().items():
-                performed_compilations[template] |= targets
+        for template, targets in self._compilations.items():
+            performed_compilations[template] = set(targets)
 
         return performed_compilations
 
+    def add_compilation(self, template: Path, target: Path) -> None:
+        """
+        Insert new compilation into the compilation index of the module.
+
+        Invoked by compile actions of the module.
+
+        :param template: Compiled template path.
+        :param target: Compilation target path.
+        """
+        self._compilations[template].add(target)
+        self._compilations_version += 1
+
     def interpolate_string(self, string: str) -> str:
         """
         Replace all module placeholders in string.
 
         The configuration string processor replaces {event} with the current
         module event, and {/path/to/template} with the compilation target.
+        Results are cached until the event or the performed compilations of
+        the module change.
 
         :return: String where '{path/to/template}' has been replaced with
             'path/to/compilation/target', and {event} repleced with last event.
         """
+        event = self.event_listener.event()
+        key = (event, self._compilations_version)
+        if key != self._interpolations_key \
+                or len(self._interpolations) > 1024:
+            self._interpolations = {}
+            self._interpolations_key = key
+
+        # Keep a reference to the cache, as it might be replaced concurrently
+        interpolations = self._interpolations
+        if string not in interpolations:
+            interpolations[string] = self._interpolate(string, event=event)
+
+        return interpolations[string]
+
+    def _interpolate(self, string: str, event: str) -> str:
+        """
+        Replace all module placeholders in string without caching.
+
+        :param string: String to be processed.
+        :param event: Event replacing {event} placeholders.
+        :return: Processed string.
+        """
         # First replace any event placeholders with the last event, this must
         # be done before path replacements as paths could contain {event}.
-        string = self.replace(
-            string.replace(
-                '{event}',
-                self.event_listener.event(),
-            ),
-        )
-
-        placeholder_pattern = re.compile(r'({.+})')
-        performed_compilations = self.performed_compilations()
+        string = self.replace(string.replace('{event}', event))
 
         def replace_placeholders(match: Match) -> str:
             """Regex file path match replacer."""
@@ -312,13 +530,13 @@ class Module:
                 config_directory=self.directory,
             )
 
-            if absolute_path in performed_compilations:
+            if absolute_path in self._compilations:
                 # TODO: Is joining the right thing to do here?
                 return " ".join(
                     [
                         str(path)
                         for path
-                        in performed_compilations[absolute_path]
+                        in self._compilations[absolute_path]
                     ],
                 )
             else:
@@ -330,7 +548,7 @@ class Module:
                 # Return the placeholder left alone
                 return '{' + specified_path + '}'
 
-        return placeholder_pattern.sub(
+        return PLACEHOLDER_PATTERN.sub(
             repl=replace_placeholders,
             string=string,
         )
@@ -340,6 +558,7 @@ class Module:
         section: ModuleConfig,
         requires_timeout: Union[int, float],
         requires_working_directory: Path,
+        requires_cache_ttl: Union[int, float] = 0,
     ) -> bool:
         """Check if the given dict represents a valid enabled module."""
         if not len(section) == 1:
@@ -371,6 +590,7 @@ class Module:
                 requirements=requirements_dict,
                 directory=requires_working_directory,
                 timeout=requires_timeout,
+                cache_ttl=requires_cache_ttl,
             )
             for requirements_dict
             in requires
@@ -402,6 +622,29 @@ class ModuleManager:
         self.startup_done = False
         self.last_module_events: Dict[str, str] = {}
 
+        # Modules taken over from an old Astrality instance skip on_startup,
+        # and modules taken over by a new instance skip on_exit. Modules are
+        # only handed over when the new instance acknowledges having adopted
+        # the offered modules.
+        self.adopted_modules: Set[str] = set()
+        self.offered_modules: Set[str] = set()
+        self.handed_over_modules: Set[str] = set()
+
+        # Modules executed concurrently must not import context or compile
+        # templates at the same time, as they share the context store.
+        self.context_lock = threading.Lock()
+
+        # Held while executing action blocks, such that file modifications
+        # handled by the file watcher thread are not executed at the same
+        # time as event changes.
+        self.lock = threading.RLock()
+
+        # Priority queue of the next event transition time of each module
+        self.scheduler = EventScheduler()
+
+        # Durations of all actions executed by the managed modules
+        self.timings = Timings()
+
         # Get module configurations which are externally defined
         self.global_modules_config = GlobalModulesConfig(  # type: ignore
             config=config.get('config/modules', {}),
@@ -409,6 +652,9 @@ class ModuleManager:
         )
         self.recompile_modified_templates = \
             self.global_modules_config.recompile_modified_templates
+        processes.configure(
+            max_processes=self.global_modules_config.max_processes,
+        )
 
         self.modules: Dict[str, Module] = {}
 
@@ -427,55 +673,110 @@ class ModuleManager:
             # Insert context defined in external configuration
             self.application_context.update(context(module_configs))
 
-            for section, options in module_configs.items():
-                module_config = {section: options}
-
-                if not Module.valid_class_section(
-                    section=module_config,
-                    requires_timeout=self.global_modules_config.requires_timeout,  # noqa
-                    requires_working_directory=module_directory,
-                ) or section not in self.global_modules_config.enabled_modules:
-                    continue
-
-                module = Module(
-                    module_config=module_config,
-                    module_directory=module_directory,
-                    replacer=self.interpolate_string,
-                    context_store=self.application_context,
-                )
-                self.modules[module.name] = module
+            self.modules.update(self.modules_from_config(
+                module_configs=module_configs,
+                directory=module_directory,
+            ))
 
         # Update the context from `astrality.yml`, overwriting any defined
         # contexts in external modules in the case of naming conflicts
         self.application_context.update(application_context)
 
+        # Context sections defined by configuration files, as opposed to
+        # those imported by import_context actions. Used for detecting
+        # context changes when the configuration is reloaded.
+        self.defined_context: compiler.Context = dict(self.application_context)
+
         # Insert modules defined in `astrality.yml`
-        for section, options in config.items():
-            module_config = {section: options}
+        self.modules.update(self.modules_from_config(
+            module_configs=config,
+            directory=self.config_directory,
+        ))
+
+        # Initialize the file system watcher, but don't start it yet
+        self.directory_watcher = DirectoryWatcher(
+            directory=self.config_directory,
+            on_modified=self.file_system_modified,
+            quiet_window=self.global_modules_config.modified_quiet_window,
+        )
+        self._collected_watcher_events: Dict[str, int] = {}
+
+        # Reverse index from compiled templates to their compile actions
+        self.template_compile_actions: DefaultDict[
+            Path,
+            List[CompileAction],
+        ] = defaultdict(list)
+        self.compile_action_modules: Dict[CompileAction, str] = {}
+        self.index_compilations(self.modules.values())
+
+        # Index paths watched by the modules, as file system events are only
+        # relevant for a handful of paths.
+        self.file_digests: Dict[Path, Optional[str]] = {}
+        self.index_watched_paths()
+
+        logger.info('Enabled modules: ' + ', '.join(self.modules.keys()))
+
+    def modules_from_config(
+        self,
+        module_configs: Dict[Any, Any],
+        directory: Path,
+    ) -> Dict[str, Module]:
+        """
+        Return all enabled modules defined in a configuration dictionary.
 
+        Modules are only included if they are enabled and their requirements
+        are satisfied.
+
+        :param module_configs: Configuration dictionary, for instance the
+            contents of `astrality.yml` or a module `config.yml` file.
+        :param directory: Directory used as anchor for relative paths in the
+            module configurations.
+        :return: Dictionary with module name keys and Module values.
+        """
+        module_configs = {
+            section: options
+            for section, options
+            in module_configs.items()
+            if section in self.global_modules_config.enabled_modules
+        }
+
+        # Requirements of all modules are checked concurrently, as shell
+        # requirements can take a while.
+        valid_class_section = partial(
+            Module.valid_class_section,
+            requires_timeout=self.global_modules_config.requires_timeout,
+            requires_working_directory=directory,
+            requires_cache_ttl=self.global_modules_config.requires_cache_ttl,
+        )
+        with ThreadPoolExecutor(
+            max_workers=self.global_modules_config.max_workers,
+        ) as executor:
+            valid_sections = list(executor.map(
+                valid_class_section,
+                ({section: options} for section, options
+                 in module_configs.items()),
+            ))
+
+        modules: Dict[str, Module] = {}
+        for (section, options), valid in zip(
+            module_configs.items(),
+            valid_sections,
+        ):
             # Check if this module should be included
-            if not Module.valid_class_section(
-                section=module_config,
-                requires_timeout=self.global_modules_config.requires_timeout,
-                requires_working_directory=self.config_directory,
-            ) or section not in self.global_modules_config.enabled_modules:
+            if not valid:
                 continue
 
+            module_config = {section: options}
             module = Module(
                 module_config=module_config,
-                module_directory=self.config_directory,
+                module_directory=directory,
                 replacer=self.interpolate_string,
                 context_store=self.application_context,
+                timings=self.timings,
             )
-            self.modules[module.name] = module
-
-        # Initialize the config directory watcher, but don't start it yet
-        self.directory_watcher = DirectoryWatcher(
-            directory=self.config_directory,
-            on_modified=self.file_system_modified,
-        )
+            modules[module.name] = module
 
-        logger.info('Enabled modules: ' + ', '.join(self.modules.keys()))
+        return modules
 
     def __len__(self) -> int:
         """Return the number of managed modules."""
@@ -485,7 +786,7 @@ class ModuleManager:
         """Return dict containing the event of all modules."""
         module_events = {}
         for module_name, module in self.modules.items():
-            module_events[module_name] = module.event_listener.event()
+            module_events[module_name] = module.event()
 
         return module_events
 
@@ -500,49 +801,134 @@ class ModuleManager:
             4) Run on_event commands, if it is not already done for this
                module events combination.
         """
-        if not self.startup_done:
-            # Save the last event configuration, such that on_event
-            # is only run when the event *changes*
-            self.last_module_events = self.module_events()
-
-            # Perform all startup actions
-            self.startup()
-        elif self.last_module_events != self.module_events():
-            # One or more module events have changed, execute the event blocks
-            # of these modules.
-
-            for module_name, event in self.module_events().items():
-                if not self.last_module_events[module_name] == event:
-                    # This module has a new event
-
-                    self.import_context_sections(
-                        trigger='on_event',
-                        module=self.modules[module_name],
-                    )
-                    self.compile_templates(
-                        trigger='on_event',
-                        module=self.modules[module_name],
-                    )
-                    self.run_on_event_commands(
-                        module=self.modules[module_name],
-                    )
+        with self.lock:
+            if not self.startup_done:
+                # Save the last event configuration, such that on_event
+                # is only run when the event *changes*
+                self.last_module_events = self.module_events()
+
+                # Perform all startup actions
+                self.startup()
+            else:
+                # Execute the event blocks of modules with new events
+                profiler.start_wave()
+                self.execute(
+                    block_name='on_event',
+                    modules=(
+                        self.modules[name]
+                        for name
+                        in self.pop_new_events()
+                    ),
+                )
+
+        queue_metrics = self.directory_watcher.metrics()
+        logger.debug(
+            f'File modification queue: {queue_metrics["depth"]} queued '
+            f'(max {queue_metrics["max_depth"]}), '
+            f'{queue_metrics["delivered"]} delivered, '
+            f'{queue_metrics["coalesced"]} coalesced, '
+            f'{queue_metrics["dropped"]} dropped.',
+        )
+        self.finish_wave()
+
+    def collect_metrics(self) -> None:
+        """Update exported metrics of the file modification queue."""
+        queue_metrics = self.directory_watcher.metrics()
+        watcher_queue_depth.set(queue_metrics['depth'])
+        for outcome in ('coalesced', 'delivered', 'dropped'):
+            # The counts of the watcher are cumulative, so the counter is
+            # incremented by the events since the last collection.
+            count = queue_metrics[outcome]
+            collected = self._collected_watcher_events.get(outcome, 0)
+            if count < collected:
+                # The directory watcher has been replaced
+                collected = 0
+            watcher_events_total.inc(count - collected, outcome=outcome)
+            self._collected_watcher_events[outcome] = count
+
+    def finish_wave(self) -> None:
+        """Log timings and write trace of the actions executed since last."""
+        profiler.stop_wave()
+        self.timings.log_wave()
+        tracer.write()
+
+    def pop_new_events(self) -> Dict[str, str]:
+        """
+        Return modules with new events, and reschedule all due modules.
+
+        Only event listeners with due event transitions are checked for
+        event changes, the other modules are left alone. The returned events
+        are saved as the last seen events of the modules, so the caller is
+        responsible for executing the on_event blocks of these modules.
+
+        :return: Dictionary with module name keys and new event values.
+        """
+        new_events: Dict[str, str] = {}
+        for module_name in self.scheduler.pop_due(now=datetime.now()):
+            module = self.modules[module_name]
+            event = module.event()
+
+            if not self.last_module_events[module_name] == event:
+                tracer.instant(
+                    'event detected',
+                    module=module_name,
+                    event=event,
+                )
+                events_total.inc(module=module_name)
+                new_events[module_name] = event
+                self.last_module_events[module_name] = event
 
-                    # Save the event
-                    self.last_module_events[module_name] = event
+            self.schedule(module)
+
+        return new_events
 
     def has_unfinished_tasks(self) -> bool:
         """Return True if there are any module tasks due."""
         if not self.startup_done:
             return True
-        else:
-            return self.last_module_events != self.module_events()
+
+        # Only modules with due event transitions can have new events
+        for module_name in self.scheduler.due(now=datetime.now()):
+            event = self.modules[module_name].event()
+            if event != self.last_module_events[module_name]:
+                return True
+
+        return False
 
     def time_until_next_event(self) -> timedelta:
         """Time left until first event change of any of the modules managed."""
-        return min(
-            module.event_listener.time_until_next_event()
-            for module
-            in self.modules.values()
+        if not self.startup_done:
+            # Modules are not scheduled before startup
+            return min(
+                module.event_listener.time_until_next_event()
+                for module
+                in self.modules.values()
+            )
+
+        next_transition = self.scheduler.next_transition()
+        if next_transition is None:
+            # Same infinite approximation as the static event listener
+            return timedelta(days=36500)
+
+        return max(next_transition - datetime.now(), timedelta(0))
+
+    def schedule(self, module: Module) -> None:
+        """
+        Schedule the next event transition of module.
+
+        Event listeners are only asked for the time until their next event,
+        and the transition is scheduled no earlier than one second from now
+        in order to prevent busy waiting on inaccurate event listeners.
+
+        :param module: Managed module to be scheduled.
+        """
+        time_until_next_event = max(
+            module.event_listener.time_until_next_event(),
+            timedelta(seconds=1),
+        )
+        self.scheduler.schedule(
+            name=module.name,
+            at=datetime.now() + time_until_next_event,
         )
 
     def import_context_sections(
@@ -591,35 +977,141 @@ class ModuleManager:
         for module in modules:
             module.compile(block_name=trigger)
 
+    def prepare(
+        self,
+        block_name: str,
+        modules: Iterable[Module],
+        path: Optional[Path] = None,
+    ) -> None:
+        """
+        Import context and compile templates of action block of modules.
+
+        All modules import context before any templates are compiled, as
+        templates might use context imported by any of the modules. The
+        modules share the context store, and might compile files used by each
+        other, so they are prepared in configuration order while holding the
+        context lock.
+
+        :param block_name: Name of block such as 'on_startup'.
+        :param modules: Modules which action block should be prepared.
+        :param path: Absolute path in case of block_name == 'on_modified'.
+        """
+        modules = tuple(modules)
+        with self.context_lock:
+            for module in modules:
+                module.import_context(block_name=block_name, path=path)
+            for module in modules:
+                module.compile(block_name=block_name, path=path)
+
+    def execute(
+        self,
+        block_name: str,
+        modules: Optional[Iterable[Module]] = None,
+    ) -> None:
+        """
+        Execute action block of modules, running their commands in parallel.
+
+        All modules import context and compile templates before any shell
+        commands are run, as commands might use files compiled by any other
+        module. The shell commands of different modules are then run
+        concurrently, with at most `max_workers` modules at the same time.
+
+        :param block_name: Name of block such as 'on_startup'.
+        :param modules: Modules to be executed. Defaults to all managed
+            modules.
+        """
+        if modules is None:
+            modules = self.modules.values()
+        modules = tuple(modules)
+        self.prepare(block_name=block_name, modules=modules)
+
+        max_workers = self.global_modules_config.max_workers
+        if max_workers <= 1 or len(modules) <= 1:
+            for module in modules:
+                self.run_commands(module=module, block_name=block_name)
+            return
+
+        def run_module(module: Module) -> None:
+            with tracer.span(block_name, 'module', module=module.name):
+                self.run_commands(module=module, block_name=block_name)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = tuple(
+                executor.submit(run_module, module)
+                for module
+                in modules
+            )
+
+        for future in futures:
+            future.result()
+
+    def run_commands(
+        self,
+        module: Module,
+        block_name: str,
+        budget: Optional[Union[int, float]] = None,
+    ) -> None:
+        """
+        Run all shell commands specified in action block of module.
+
+        :param module: Module which shell commands should be run.
+        :param block_name: Name of block such as 'on_startup'.
+        :param budget: Total number of seconds the commands are allowed to
+            take, unlimited by default.
+        """
+        logger.info(
+            f'[module/{module.name}] Running {block_name[3:]} commands.',
+        )
+        module.run(
+            block_name=block_name,
+            default_timeout=self.global_modules_config.run_timeout,
+            budget=budget,
+        )
+
     def startup(self):
         """Run all startup actions specified by the managed modules."""
         assert not self.startup_done
 
-        self.import_context_sections('on_startup')
-        self.compile_templates('on_startup')
-
-        for module in self.modules.values():
-            logger.info(f'[module/{module.name}] Running startup commands.')
-            module.run(
+        with profiler.profile('startup'):
+            self.execute(
                 block_name='on_startup',
-                default_timeout=self.global_modules_config.run_timeout,
+                modules=self.startup_modules(),
             )
+        self.finish_startup()
+
+    def startup_modules(self) -> Tuple[Module, ...]:
+        """Return modules to be started, excluding adopted modules."""
+        return tuple(
+            module
+            for name, module
+            in self.modules.items()
+            if name not in self.adopted_modules
+        )
 
+    def finish_startup(self) -> None:
+        """
+        Mark startup as done, schedule modules, and start watching files.
+
+        Called by ModuleManager.startup() after all startup actions have been
+        executed, but runtimes executing the startup actions by themselves
+        should call this method directly.
+        """
+        assert not self.startup_done
         self.startup_done = True
 
+        for module in self.modules.values():
+            self.schedule(module)
+
         # Start watching config directory for file changes
         self.directory_watcher.start()
+        metrics.collectors.append(self.collect_metrics)
 
     def run_on_event_commands(
         self,
         module: Module,
     ):
         """Run all event change commands specified by a managed module."""
-        logger.info(f'[module/{module.name}] Running event commands.')
-        module.run(
-            block_name='on_event',
-            default_timeout=self.global_modules_config.run_timeout,
-        )
+        self.run_commands(module=module, block_name='on_event')
 
     def exit(self):
         """
@@ -627,16 +1119,17 @@ class ModuleManager:
 
         Also close all temporary file handlers created by the modules.
         """
-        # First import context and compile templates
-        self.import_context_sections('on_exit')
-        self.compile_templates('on_exit')
-
-        # Then run all shell commands
-        for module in self.modules.values():
-            logger.info(f'[module/{module.name}] Running exit commands.')
-            module.run(
-                block_name='on_exit',
-                default_timeout=self.global_modules_config.run_timeout,
+        # Stop watching config directory for file changes
+        self.directory_watcher.stop()
+        if self.collect_metrics in metrics.collectors:
+            metrics.collectors.remove(self.collect_metrics)
+
+        with self.lock:
+            self.exit_modules(
+                module
+                for name, module
+                in self.modules.items()
+                if name not in self.handed_over_modules
             )
 
         if hasattr(self, 'temp_files'):
@@ -646,22 +1139,112 @@ class ModuleManager:
             # Prevent files from being closed again
             del self.temp_files
 
-        # Stop watching config directory for file changes
-        self.directory_watcher.stop()
+    def exit_modules(self, modules: Iterable[Module]) -> Set[str]:
+        """
+        Execute on_exit blocks of modules concurrently, within a deadline.
+
+        The modules are prepared as in ModuleManager.prepare(), and then each
+        module runs its shell commands in its own daemon thread. Modules which
+        fail to import context or compile templates still run their commands.
+        The shell commands of each module are given a budget of
+        `exit_module_timeout` seconds, and modules which have not finished
+        within `exit_timeout` seconds are abandoned, such that exiting never
+        hangs on slow commands.
+
+        :param modules: Modules to be exited.
+        :return: Names of modules which did not finish before the deadline.
+        """
+        modules = tuple(modules)
+        timeout = self.global_modules_config.exit_timeout
+        module_timeout = self.global_modules_config.exit_module_timeout
+        deadline = time.monotonic() + timeout
+
+        prepared = threading.Event()
+        finished: Set[str] = set()
+
+        def prepare_modules() -> None:
+            try:
+                with self.context_lock:
+                    for module in modules:
+                        try:
+                            module.import_context(block_name='on_exit')
+                        except Exception:
+                            logger.exception(
+                                f'[module/{module.name}] Could not import '
+                                'context on exit!',
+                            )
+                    for module in modules:
+                        try:
+                            module.compile(block_name='on_exit')
+                        except Exception:
+                            logger.exception(
+                                f'[module/{module.name}] Could not compile '
+                                'templates on exit!',
+                            )
+            finally:
+                prepared.set()
+
+        def exit_module(module: Module) -> None:
+            # Commands might use files compiled by any other module
+            if not prepared.wait(timeout=max(deadline - time.monotonic(), 0)):
+                return
+
+            module_deadline = min(deadline, time.monotonic() + module_timeout)
+            try:
+                with tracer.span('on_exit', 'module', module=module.name):
+                    self.run_commands(
+                        module=module,
+                        block_name='on_exit',
+                        budget=max(module_deadline - time.monotonic(), 0),
+                    )
+            except Exception:
+                logger.exception(f'[module/{module.name}] Could not exit!')
+            finally:
+                finished.add(module.name)
+
+        threading.Thread(
+            target=prepare_modules,
+            name='astrality-exit',
+            daemon=True,
+        ).start()
+
+        threads = {
+            module.name: threading.Thread(
+                target=exit_module,
+                args=(module,),
+                name=f'astrality-exit-{module.name}',
+                daemon=True,
+            )
+            for module
+            in modules
+        }
+        for thread in threads.values():
+            thread.start()
+        for thread in threads.values():
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+
+        unfinished = set(threads) - finished
+        for name in sorted(unfinished):
+            logger.error(
+                f'[module/{name}] on_exit did not finish within the exit '
+                f'timeout of {timeout} seconds. Abandoning it.',
+            )
+        return unfinished
 
-    def on_modified(self, modified: Path) -> bool:
+    def on_modified(self, modified: Path, content_changed: bool = True) -> bool:
         """
         Perform actions when a watched file is modified.
 
+        :param modified: Absolute path to modified file.
+        :param content_changed: False if the content of the file is known to
+            be unchanged, skipping on_modified blocks which ignore such
+            modifications.
         :return: Returns True if on_modified block was triggered.
         """
         assert modified.is_absolute()
         triggered = False
 
-        for module in self.modules.values():
-            if modified not in module.action_blocks['on_modified']:
-                continue
-
+        for module in self.modules_watching(modified, content_changed):
             triggered = True
             logger.info(
                 f'[module/{module.name}] on_modified:{modified} triggered.',
@@ -683,6 +1266,171 @@ class ModuleManager:
 
         return triggered
 
+    def index_watched_paths(self) -> None:
+        """
+        Index the paths which file modifications should be acted upon.
+
+        Must be invoked every time the managed modules are replaced.
+        """
+        on_modified_blocks: DefaultDict[
+            Path,
+            List[Tuple[Module, ActionBlock]],
+        ] = defaultdict(list)
+        for module in self.modules.values():
+            for path, action_block \
+                    in module.action_blocks['on_modified'].items():
+                on_modified_blocks[path].append((module, action_block))
+
+        self.on_modified_blocks = dict(on_modified_blocks)
+        self.config_files = {
+            self.config_directory / 'astrality.yml',
+            *self.global_modules_config.external_module_config_files,
+        }
+
+        # Keep digests of files whose unchanged modifications are ignored,
+        # and of templates which are still compiled by managed modules.
+        ignored_paths = {
+            path
+            for path, blocks
+            in self.on_modified_blocks.items()
+            if any(action_block.ignore_unchanged for _, action_block in blocks)
+        }
+        for path in tuple(self.file_digests):
+            if path not in ignored_paths \
+                    and not self.template_compile_actions.get(path):
+                del self.file_digests[path]
+        for path in ignored_paths - set(self.file_digests):
+            self.file_digests[path] = file_digest(path)
+
+        # Only watch the indexed paths, not the entire config directory
+        self.directory_watcher.watch(self.watched_paths())
+
+    def watched_paths(self) -> Set[Path]:
+        """
+        Return files and directories which modifications might be relevant.
+
+        These are on_modified paths, configuration files, imported context
+        files, and template sources if recompile_modified_templates is true.
+        """
+        paths = set(self.on_modified_blocks) | self.config_files
+        for module in self.modules.values():
+            for action_block in module.all_action_blocks():
+                paths |= action_block.context_files()
+                if self.recompile_modified_templates:
+                    paths |= action_block.template_sources()
+
+        return paths
+
+    def content_changed(self, path: Path) -> bool:
+        """
+        Return True if file content has changed since the last invocation.
+
+        Only the content of files with tracked digests is checked, other files
+        are always considered changed.
+
+        :param path: Absolute path to modified file.
+        """
+        if path not in self.file_digests:
+            return True
+
+        digest = file_digest(path)
+        if digest == self.file_digests[path]:
+            logger.debug(f'Ignoring modification of unchanged file "{path}".')
+            unchanged_modifications_total.inc()
+            return False
+
+        self.file_digests[path] = digest
+        return True
+
+    def index_compilations(self, modules: Iterable[Module]) -> None:
+        """
+        Keep track of templates compiled by the compile actions of modules.
+
+        :param modules: Modules which compilations should be indexed.
+        """
+        for module in modules:
+            for action_block in module.all_action_blocks():
+                for compile_action in action_block._compile_actions:
+                    self.compile_action_modules[compile_action] = module.name
+                    compile_action.compilation_listeners.append(
+                        partial(self.add_compilation, compile_action),
+                    )
+
+    def unindex_compilations(self, modules: Iterable[Module]) -> None:
+        """
+        Remove compile actions of modules from the template index.
+
+        :param modules: Modules which are no longer managed.
+        """
+        compile_actions = {
+            compile_action
+            for module in modules
+            for action_block in module.all_action_blocks()
+            for compile_action in action_block._compile_actions
+        }
+        for compile_action in compile_actions:
+            self.compile_action_modules.pop(compile_action, None)
+        for template, template_compile_actions \
+                in self.template_compile_actions.items():
+            template_compile_actions[:] = [
+                compile_action
+                for compile_action
+                in template_compile_actions
+                if compile_action not in compile_actions
+            ]
+
+    def add_compilation(
+        self,
+        compile_action: CompileAction,
+        template: Path,
+        target: Path,
+    ) -> None:
+        """
+        Insert template compiled by compile action into the template index.
+
+        :param compile_action: Compile action which performed compilation.
+        :param template: Compiled template path.
+        :param target: Compilation target path.
+        """
+        if compile_action not in self.template_compile_actions[template]:
+            self.template_compile_actions[template].append(compile_action)
+
+        if self.recompile_modified_templates \
+                and self.global_modules_config.ignore_unchanged_templates \
+                and template not in self.file_digests:
+            self.file_digests[template] = file_digest(template)
+
+    def modules_watching(
+        self,
+        path: Path,
+        content_changed: bool = True,
+    ) -> Tuple[Module, ...]:
+        """
+        Return managed modules with on_modified blocks for a specific path.
+
+        :param path: Absolute path to file.
+        :param content_changed: If False, leave out modules with on_modified
+            blocks ignoring unchanged file content.
+        """
+        return tuple(
+            module
+            for module, action_block
+            in self.on_modified_blocks.get(path, ())
+            if content_changed or not action_block.ignore_unchanged
+        )
+
+    def is_watched(self, path: Path) -> bool:
+        """
+        Return True if modifications of path might require any actions.
+
+        :param path: Absolute path to file.
+        """
+        if path in self.on_modified_blocks or path in self.config_files:
+            return True
+
+        return self.recompile_modified_templates \
+            and bool(self.template_compile_actions.get(path))
+
     def file_system_modified(self, modified: Path) -> None:
         """
         Perform actions for when files within the config directory are modified.
@@ -692,22 +1440,31 @@ class ModuleManager:
 
         Also, if hot_reload is True, we reinstantiate the ModuleManager object
         if the application configuration has been modified.
-        """
-        config_file = \
-            self.application_config['_runtime']['config_directory'] \
-            / 'astrality.yml'
 
-        if modified == config_file:
-            self.on_application_config_modified()
+        This method is invoked by the file modification worker thread, and
+        holds the lock of the module manager while executing actions.
+        """
+        if not self.is_watched(modified):
             return
-        else:
-            # Run any relevant on_modified blocks.
-            triggered = self.on_modified(modified)
 
-        if not triggered:
-            # Check if the modified path is a template which is supposed to
-            # be recompiled.
-            self.recompile_modified_template(modified=modified)
+        file_modifications_total.inc()
+        with self.lock:
+            profiler.start_wave()
+            if modified == self.config_directory / 'astrality.yml':
+                self.on_application_config_modified()
+            elif modified in self.config_files:
+                self.on_module_config_modified(modified)
+            else:
+                # Run any relevant on_modified blocks.
+                content_changed = self.content_changed(modified)
+                triggered = self.on_modified(modified, content_changed)
+
+                if not triggered:
+                    # Check if the modified path is a template which is
+                    # supposed to be recompiled.
+                    self.recompile_modified_template(modified, content_changed)
+
+            self.finish_wave()
 
     def on_application_config_modified(self):
         """
@@ -720,46 +1477,338 @@ class ModuleManager:
             # Hot reloading is not enabled, so we return early
             return
 
-        # Hot reloading is enabled, get the new configuration dict
+        # Paths of the old configuration are no longer expanded
+        clear_expand_path_cache()
+
+        try:
+            # Hot reloading is enabled, get the new configuration dict
+            new_application_config = user_configuration(
+                config_directory=self.config_directory,
+            )
+
+            # Instantiate a module manager in order to validate the new
+            # configuration
+            new_module_manager = ModuleManager(new_application_config)
+        except (Exception, AstralityConfigurationError):
+            # New configuration is invalid, just keep the old one
+            logger.error('New configuration detected, but it is invalid!')
+            return
+
+        self.reload(new_module_manager)
+
+    def on_module_config_modified(self, config_file: Path) -> None:
+        """
+        Reload modules defined in a modified module config file.
+
+        Only the module sources using `config_file` are parsed again, and only
+        modules defined by these sources are restarted, given that they have
+        changed. Reloading only occurs if the user has configured
+        `hot_reload_config`.
+
+        :param config_file: Path to modified module `config.yml` file.
+        """
+        if not self.application_config['config/astrality']['hot_reload_config']:
+            return
+
+        clear_expand_path_cache()
+        sources = tuple(
+            source
+            for source
+            in self.global_modules_config.external_module_sources
+            if source.config_file == config_file
+        )
+        prefixes = tuple(source.prefix + '::' for source in sources)
+        application_context = context(self.application_config)
+
+        try:
+            new_modules: Dict[str, Module] = {}
+            for source in sources:
+                new_modules.update(self.modules_from_config(
+                    module_configs=source.reload(context=application_context),
+                    directory=source.directory,
+                ))
+        except (Exception, AstralityConfigurationError):
+            logger.error(
+                f'Modified module configuration "{config_file}" is invalid!',
+            )
+            return
+
+        # Context sections from astrality.yml take precedence, just as when
+        # the module manager is initialized.
+        defined_context: compiler.Context = {}
+        for source in self.global_modules_config.external_module_sources:
+            defined_context.update(context(
+                source.config(context=application_context),
+            ))
+        defined_context.update(application_context)
+
+        self.swap_modules(
+            old_modules=(
+                name
+                for name
+                in self.modules
+                if name.startswith(prefixes)
+            ),
+            new_modules=new_modules,
+            defined_context=defined_context,
+        )
+
+    def reload(self, new_module_manager: 'ModuleManager') -> None:
+        """
+        Adopt the configuration of another module manager.
+
+        Only modules which have been added, removed, or changed are restarted,
+        and unchanged modules only recompile templates which use context
+        sections that have been changed.
+
+        :param new_module_manager: ModuleManager instantiated from the new
+            configuration. It should not have been started.
+        """
+        self.application_config = new_module_manager.application_config
+        self.global_modules_config = new_module_manager.global_modules_config
+        self.recompile_modified_templates = \
+            new_module_manager.recompile_modified_templates
+
+        self.swap_modules(
+            old_modules=tuple(self.modules.keys()),
+            new_modules=new_module_manager.modules,
+            defined_context=new_module_manager.defined_context,
+        )
+
+    def swap_modules(
+        self,
+        old_modules: Iterable[str],
+        new_modules: Dict[str, Module],
+        defined_context: compiler.Context,
+        restart: bool = False,
+    ) -> None:
+        """
+        Replace managed modules, only restarting modules that have changed.
+
+        Removed and changed modules execute their on_exit blocks, and added and
+        changed modules execute their on_startup blocks. Unchanged modules are
+        kept as-is, but recompile templates that reference changed context.
+
+        :param old_modules: Names of the managed modules to be replaced.
+        :param new_modules: Modules replacing `old_modules`, keyed by name.
+        :param defined_context: The context sections now defined by all
+            configuration files.
+        :param restart: If True, unchanged modules are restarted as well.
+        """
+        clear_expand_path_cache()
+        old_modules = tuple(old_modules)
+        unchanged_modules = tuple(
+            name
+            for name
+            in old_modules
+            if self.modules[name].has_same_configuration(
+                new_modules.get(name),
+            )
+        ) if not restart else ()
+        removed_modules = tuple(
+            self.modules.pop(name)
+            for name
+            in old_modules
+            if name not in unchanged_modules
+        )
+        added_modules = tuple(
+            Module(
+                module_config=module.module_config,
+                module_directory=module.directory,
+                replacer=self.interpolate_string,
+                context_store=self.application_context,
+                timings=self.timings,
+            )
+            for name, module
+            in new_modules.items()
+            if name not in unchanged_modules
+        )
+
+        # Exit removed modules while the old context is still in place
+        for module in removed_modules:
+            logger.info(f'[module/{module.name}] Stopping module.')
+            self.last_module_events.pop(module.name, None)
+            self.scheduler.unschedule(module.name)
+        self.execute(block_name='on_exit', modules=removed_modules)
+        self.unindex_compilations(removed_modules)
+        self.index_compilations(added_modules)
+
+        changed_sections = self.update_defined_context(defined_context)
+
+        for module in added_modules:
+            self.modules[module.name] = module
+            self.last_module_events[module.name] = module.event()
+            if self.startup_done:
+                self.schedule(module)
+        self.index_watched_paths()
+
+        # Start added modules, in the same way as in self.startup()
+        for module in added_modules:
+            logger.info(f'[module/{module.name}] Starting module.')
+        self.execute(block_name='on_startup', modules=added_modules)
+
+        if changed_sections:
+            self.recompile_templates_using(
+                sections=changed_sections,
+                modules=(self.modules[name] for name in unchanged_modules),
+            )
+
+        logger.info(
+            f'Reloaded modules. Kept: {", ".join(unchanged_modules)}. '
+            f'Stopped: {", ".join(m.name for m in removed_modules)}. '
+            f'Started: {", ".join(m.name for m in added_modules)}.',
+        )
+
+    def reload_module(self, name: str) -> None:
+        """
+        Restart module with its configuration reloaded from file.
+
+        The module executes its on_exit block, and the module defined by the
+        current configuration executes its on_startup block, even if the
+        configuration is unchanged. Modules which are not yet managed are
+        started.
+
+        :param name: Name of module, such as 'A' or 'github::name'.
+        """
+        clear_expand_path_cache()
         new_application_config = user_configuration(
             config_directory=self.config_directory,
         )
+        new_module_manager = ModuleManager(new_application_config)
+        if name not in new_module_manager.modules:
+            raise ControlCommandError(
+                f'Module "{name}" is not enabled by the configuration.',
+            )
 
-        try:
-            # Reinstantiate this object
-            new_module_manager = ModuleManager(new_application_config)
+        self.swap_modules(
+            old_modules=(name,) if name in self.modules else (),
+            new_modules={name: new_module_manager.modules[name]},
+            defined_context=self.defined_context,
+            restart=True,
+        )
 
-            # Run all old exit actions, since the new config is valid
-            self.exit()
+    def update_defined_context(
+        self,
+        defined_context: compiler.Context,
+    ) -> Set[str]:
+        """
+        Replace context sections defined by configuration files.
 
-            # Swap place with the new configuration
-            self = new_module_manager
+        Only context sections which have changed are inserted into the context
+        store, such that sections imported by import_context actions are left
+        alone.
 
-            # Run startup commands from the new configuration
-            self.finish_tasks()
-        except Exception:
-            # New configuration is invalid, just keep the old one
-            # TODO: Test this behaviour
-            logger.error('New configuration detected, but it is invalid!')
-            pass
+        :param defined_context: The new context sections defined by
+            configuration files.
+        :return: Names of added, removed, and changed context sections.
+        """
+        # Added and removed sections
+        changed_sections = set(self.defined_context) ^ set(defined_context)
+
+        # Sections with changed content
+        changed_sections.update(
+            section
+            for section
+            in set(self.defined_context) & set(defined_context)
+            if self.defined_context[section] != defined_context[section]
+        )
+        for section in changed_sections:
+            if section in defined_context:
+                self.application_context[section] = defined_context[section]
+            else:
+                self.application_context.pop(section, None)
 
-    def recompile_modified_template(self, modified: Path):
+        self.defined_context = dict(defined_context)
+        return changed_sections
+
+    def recompile_templates_using(
+        self,
+        sections: Set[str],
+        modules: Optional[Iterable[Module]] = None,
+    ) -> None:
+        """
+        Recompile compiled templates that reference specific context sections.
+
+        :param sections: Names of context sections.
+        :param modules: Modules to recompile templates for. Defaults to all
+            managed modules.
+        """
+        if modules is None:
+            modules = self.modules.values()
+
+        for module in modules:
+            for action_block in module.all_action_blocks():
+                for compile_action in action_block._compile_actions:
+                    for template in compile_action.performed_compilations():
+                        # None indicates that sections could not be determined
+                        used = compiler.context_sections(template)
+                        if used is None or used & sections:
+                            compile_action.execute()
+                            break
+
+    def recompile_template(self, template: Path) -> Set[Path]:
+        """
+        Recompile template to all its targets, regardless of modifications.
+
+        :param template: Absolute path to template compiled by a module.
+        :return: Set of target paths the template was compiled to.
+        """
+        compile_actions = self.template_compile_actions.get(template)
+        if not compile_actions:
+            raise ControlCommandError(
+                f'Template "{template}" has not been compiled by any module.',
+            )
+
+        targets: Set[Path] = set()
+        with self.context_lock:
+            for compile_action in compile_actions:
+                with self.timings.measure(
+                    self.compile_action_modules.get(compile_action, ''),
+                    'control',
+                    'recompile',
+                    template=template,
+                ):
+                    target = compile_action.recompile(template=template)
+                if target:
+                    targets.add(target)
+
+        return targets
+
+    def recompile_modified_template(
+        self,
+        modified: Path,
+        content_changed: bool = True,
+    ):
         """
         Recompile any modified template if configured.
 
         This requires setting the global setting:
         recompile_modified_templates: true
+
+        :param modified: Absolute path to modified template.
+        :param content_changed: False if the template content is known to be
+            unchanged, in which case it is not recompiled.
         """
         if not self.recompile_modified_templates:
             return
 
-        # Run any compile action a new if that compile action uses the modifed
-        # path as a template.
-        for module in self.modules.values():
-            for action_block in module.all_action_blocks():
-                for compile_action in action_block._compile_actions:
-                    if modified in compile_action:
-                        compile_action.execute()
+        # Only recompile the modified template, and only to its current
+        # target(s).
+        compile_actions = self.template_compile_actions.get(modified, ())
+        if not content_changed:
+            if compile_actions:
+                skipped_writes_total.inc(len(compile_actions))
+            return
+
+        with self.context_lock:
+            for compile_action in compile_actions:
+                with self.timings.measure(
+                    self.compile_action_modules.get(compile_action, ''),
+                    'on_modified',
+                    'recompile',
+                    template=modified,
+                ):
+                    compile_action.recompile(template=modified)
 
     def interpolate_string(self, string: str) -> str:
         """
@@ -0,0 +1,124 @@
+"""Module ensuring that only one Astrality instance runs at a time."""
+
+import fcntl
+import logging
+import os
+from pathlib import Path
+import signal
+import time
+from typing import Optional
+
+logger = logging.getLogger('astrality')
+
+
+class PidFile:
+    """
+    PID file locked with flock(2) by the running Astrality instance.
+
+    The lock is released by the kernel when the instance exits, also when it
+    crashes, so a stale PID file is never mistaken for a running instance.
+    The file is never removed, as removing a locked file would allow two
+    instances to hold locks on different files with the same path.
+
+    :param path: Path to PID file.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Initialize PID file which has not been acquired."""
+        self.path = path
+        self.locked = False
+        self._fd: Optional[int] = None
+
+    def read(self) -> Optional[int]:
+        """Return PID written to file, or None if it is empty or missing."""
+        try:
+            return int(self.path.read_text().strip())
+        except (OSError, ValueError):
+            return None
+
+    def try_lock(self) -> bool:
+        """
+        Try to lock the PID file without blocking.
+
+        :return: True if the lock was acquired.
+        """
+        if self._fd is None:
+            os.makedirs(self.path.parent, exist_ok=True)
+            self._fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o600)
+
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        os.ftruncate(self._fd, 0)
+        os.write(self._fd, f'{os.getpid()}\n'.encode())
+        self.locked = True
+        return True
+
+    def acquire(self, timeout: float = 10, interval: float = 0.05) -> None:
+        """
+        Lock the PID file, terminating any instance holding the lock.
+
+        The holding instance is sent SIGTERM, and is given `timeout` seconds
+        to exit before it is killed with SIGKILL.
+
+        :param timeout: Seconds to wait for the old instance to exit.
+        :param interval: Seconds between each attempt to lock the file.
+        """
+        if self.locked or self.try_lock():
+            return
+
+        pid = self.read()
+        if pid is None:
+            # The holder has not written its PID yet
+            time.sleep(interval)
+            pid = self.read()
+
+        self.terminate(pid=pid, sig=signal.SIGTERM)
+        if self.wait(timeout=timeout, interval=interval):
+            return
+
+        logger.error(
+            f'Old Astrality instance with pid {pid} did not exit within '
+            f'{timeout} seconds. Killing it.',
+        )
+        self.terminate(pid=pid, sig=signal.SIGKILL)
+        if not self.wait(timeout=timeout, interval=interval):
+            raise TimeoutError(f'Could not lock PID file "{self.path}".')
+
+    def terminate(self, pid: Optional[int], sig: int) -> None:
+        """Send signal to old instance, if its PID is known."""
+        if pid is None or pid == os.getpid():
+            return
+
+        logger.info(f'Killing old Astrality instance with pid {pid}.')
+        try:
+            os.kill(pid, sig)
+        except OSError as error:
+            logger.error(f'Could not kill old Astrality instance: {error}')
+
+    def wait(self, timeout: float, interval: float = 0.05) -> bool:
+        """
+        Wait for the lock to be released by the holding instance.
+
+        :return: True if the lock was acquired within `timeout` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.try_lock():
+                return True
+            time.sleep(interval)
+
+        return self.try_lock()
+
+    def release(self) -> None:
+        """Empty and unlock the PID file."""
+        if self._fd is None:
+            return
+
+        if self.locked:
+            os.ftruncate(self._fd, 0)
+        os.close(self._fd)
+        self._fd = None
+        self.locked = False
@@ -0,0 +1,455 @@
+"""
+Module managing the processes of shell commands run by Astrality.
+
+Shell commands of run actions, module requirements, and the `shell` template
+filter are all started by a single ProcessManager. One background thread
+starts queued processes, and reaps each process as soon as it exits. Exits
+are detected through a pidfd where the platform supports it, and by polling
+otherwise, as a SIGCHLD handler would interfere with the child watchers of
+asyncio.
+
+The output of each process is written to unlinked temporary files instead of
+pipes. Processes therefore never block on full pipes, and processes outliving
+Astrality, such as daemons started in the background, are never killed by
+SIGPIPE when Astrality exits.
+
+Callers only wait for a process until their timeout expires, after which the
+process is left running in the background. Such processes are still reaped
+when they eventually exit, instead of being left behind as zombies, and their
+output is discarded. At most `max_processes` processes are waited for at the
+same time, and further commands are queued until one of them exits or times
+out. Queued commands which their caller stops waiting for are started right
+away in the background, without counting towards `max_processes`, and their
+output is sent to /dev/null.
+
+The output of processes left running in the background is only discarded
+while Astrality is running. Processes outliving Astrality, or handed over to
+a new Astrality instance, keep writing to their unlinked temporary files
+until they exit.
+"""
+
+import asyncio
+from collections import deque
+import concurrent.futures
+import fcntl
+from functools import partial
+import logging
+import os
+from pathlib import Path
+import selectors
+import subprocess
+import tempfile
+import threading
+from typing import (
+    BinaryIO,
+    Deque,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+from astrality.metrics import shell_processes
+
+logger = logging.getLogger('astrality')
+
+
+class ProcessResult(NamedTuple):
+    """Exit code and decoded output of a shell command which has exited."""
+
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+def output_file() -> BinaryIO:
+    """
+    Return unlinked temporary file for the output of a process.
+
+    The file is opened in append mode, such that the process keeps writing
+    to the end of the file after it has been truncated.
+    """
+    file = tempfile.TemporaryFile()
+    flags = fcntl.fcntl(file.fileno(), fcntl.F_GETFL)
+    fcntl.fcntl(file.fileno(), fcntl.F_SETFL, flags | os.O_APPEND)
+    return file  # type: ignore
+
+
+class ManagedProcess:
+    """
+    Shell command submitted to the process manager.
+
+    :param command: Shell command to be run by /bin/sh.
+    :param working_directory: Working directory of the shell command.
+    """
+
+    def __init__(self, command: str, working_directory: Path) -> None:
+        """Initialize shell command which has not been started yet."""
+        self.command = command
+        self.working_directory = working_directory
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.popen: Optional[subprocess.Popen] = None
+        self.pidfd: Optional[int] = None
+        self.stdout: Optional[BinaryIO] = None
+        self.stderr: Optional[BinaryIO] = None
+
+        # If the process occupies one of the `max_processes` slots
+        self.slot = False
+
+        # If the caller has stopped waiting for the process
+        self.abandoned = False
+
+        # If the process was abandoned before being started
+        self.detached = False
+
+    def output_files(self) -> List[BinaryIO]:
+        """Return open output files of process."""
+        return [
+            file
+            for file
+            in (self.stdout, self.stderr)
+            if file is not None and not file.closed
+        ]
+
+    def discard_output(self) -> None:
+        """Truncate output files, keeping them open for the process."""
+        for file in self.output_files():
+            os.ftruncate(file.fileno(), 0)
+
+    def close(self) -> None:
+        """Close output files of process."""
+        for file in self.output_files():
+            file.close()
+
+    def result(self) -> ProcessResult:
+        """Return result of process which has exited, closing its files."""
+        output = []
+        for file in (self.stdout, self.stderr):
+            file.seek(0)  # type: ignore
+            output.append(file.read().decode(errors='replace'))  # type: ignore
+        self.close()
+
+        return ProcessResult(
+            returncode=self.popen.returncode,  # type: ignore
+            stdout=output[0],
+            stderr=output[1],
+        )
+
+
+class ProcessManager:
+    """
+    Manager running shell commands concurrently in the background.
+
+    :param max_processes: Maximum number of processes waited for at the same
+        time.
+    :param poll_interval: Seconds between each check for exited processes,
+        if pidfds are unavailable.
+    :param discard_interval: Seconds between each truncation of the output of
+        processes which are no longer waited for.
+    """
+
+    def __init__(
+        self,
+        max_processes: int = 16,
+        poll_interval: float = 0.05,
+        discard_interval: float = 5,
+    ) -> None:
+        """Initialize process manager without starting its thread."""
+        self.max_processes = max_processes
+        self.poll_interval = poll_interval
+        self.discard_interval = discard_interval
+        self.lock = threading.Lock()
+
+        self._queue: Deque[ManagedProcess] = deque()
+        self._detached: Deque[ManagedProcess] = deque()
+        self._running: List[ManagedProcess] = []
+        self._slots_taken = 0
+
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._wakeup_fd: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(self, max_processes: int) -> None:
+        """
+        Change the maximum number of processes waited for at the same time.
+
+        :param max_processes: New limit, at least 1.
+        """
+        with self.lock:
+            self.max_processes = max(1, max_processes)
+        self._wake()
+
+    def submit(
+        self,
+        command: str,
+        working_directory: Path,
+    ) -> ManagedProcess:
+        """
+        Queue shell command to be started without blocking.
+
+        :param command: Shell command to be run by /bin/sh.
+        :param working_directory: Working directory of the shell command.
+        :return: Submitted process, which future is resolved with a
+            ProcessResult when the process exits.
+        """
+        process = ManagedProcess(
+            command=command,
+            working_directory=working_directory,
+        )
+        with self.lock:
+            self._start_thread()
+            self._queue.append(process)
+            self._update_metrics()
+
+        self._wake()
+        return process
+
+    def abandon(self, process: ManagedProcess) -> None:
+        """
+        Stop waiting for process, leaving it running in the background.
+
+        The slot of the process is released, and its output is discarded.
+        Processes which have not been started yet are started right away,
+        without occupying a slot.
+        """
+        with self.lock:
+            if process.abandoned or process.future.done():
+                return
+
+            process.abandoned = True
+            if process in self._queue:
+                self._queue.remove(process)
+                process.detached = True
+                self._detached.append(process)
+                logger.info(
+                    f'Starting the command "{process.command}" in the '
+                    f'background, as {self.max_processes} other commands '
+                    'are running.',
+                )
+            if process.slot:
+                process.slot = False
+                self._slots_taken -= 1
+            self._update_metrics()
+
+        self._wake()
+
+    def run(
+        self,
+        command: str,
+        timeout: Union[int, float],
+        working_directory: Path,
+    ) -> Optional[ProcessResult]:
+        """
+        Run shell command, blocking until it exits or times out.
+
+        :param command: Shell command to be run by /bin/sh.
+        :param timeout: Seconds to wait for the command to exit, including
+            the time it is queued.
+        :param working_directory: Working directory of the shell command.
+        :return: ProcessResult, or None if the command timed out.
+        """
+        process = self.submit(
+            command=command,
+            working_directory=working_directory,
+        )
+        try:
+            return process.future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            self.abandon(process)
+            return None
+
+    async def run_async(
+        self,
+        command: str,
+        timeout: Union[int, float],
+        working_directory: Path,
+    ) -> Optional[ProcessResult]:
+        """
+        Coroutine equivalent of `run`, which never blocks the event loop.
+
+        :return: ProcessResult, or None if the command timed out.
+        """
+        process = self.submit(
+            command=command,
+            working_directory=working_directory,
+        )
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(process.future)),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            self.abandon(process)
+            return None
+
+    def _start_thread(self) -> None:
+        """Start background thread, must be called with the lock held."""
+        if self._thread is not None:
+            return
+
+        self._selector = selectors.DefaultSelector()
+        read_fd, self._wakeup_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+        os.set_blocking(self._wakeup_fd, False)
+        self._selector.register(
+            read_fd,
+            selectors.EVENT_READ,
+            partial(os.read, read_fd, 4096),
+        )
+
+        self._thread = threading.Thread(
+            target=self._loop,
+            name='astrality-processes',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _wake(self) -> None:
+        """Wake up background thread in order to start queued processes."""
+        if self._wakeup_fd is None:
+            return
+
+        try:
+            os.write(self._wakeup_fd, b'\0')
+        except BlockingIOError:
+            # The thread has not yet consumed earlier wake ups
+            pass
+
+    def _loop(self) -> None:
+        """Start queued processes, and reap exited processes."""
+        while True:
+            try:
+                self._start_queued()
+                events = self._selector.select(  # type: ignore
+                    timeout=self._select_timeout(),
+                )
+                for key, _ in events:
+                    key.data()
+                self._poll()
+            except Exception:
+                logger.exception('Unexpected error in process manager!')
+
+    def _select_timeout(self) -> Optional[float]:
+        """Return seconds to wait before polling and discarding output."""
+        if any(process.pidfd is None for process in self._running):
+            return self.poll_interval
+        elif any(process.abandoned for process in self._running):
+            return self.discard_interval
+        return None
+
+    def _start_queued(self) -> None:
+        """Start detached processes, and queued processes while slots last."""
+        while True:
+            with self.lock:
+                if not self._detached:
+                    break
+                process = self._detached.popleft()
+
+            self._start(process)
+
+        while True:
+            with self.lock:
+                if not self._queue \
+                        or self._slots_taken >= self.max_processes:
+                    return
+
+                process = self._queue.popleft()
+                process.slot = True
+                self._slots_taken += 1
+
+            self._start(process)
+
+    def _start(self, process: ManagedProcess) -> None:
+        """Start process, watching its exit through a pidfd if possible."""
+        try:
+            if not process.detached:
+                process.stdout = output_file()
+                process.stderr = output_file()
+            process.popen = subprocess.Popen(
+                process.command,
+                cwd=str(process.working_directory),
+                shell=True,
+                stdout=process.stdout or subprocess.DEVNULL,
+                stderr=process.stderr or subprocess.DEVNULL,
+            )
+        except (OSError, ValueError) as error:
+            self._finish(process, error=error)
+            return
+
+        with self.lock:
+            self._running.append(process)
+            self._update_metrics()
+
+        pidfd_open = getattr(os, 'pidfd_open', None)
+        if pidfd_open is None:
+            return
+
+        try:
+            process.pidfd = pidfd_open(process.popen.pid)
+        except OSError:
+            # Not supported by the kernel, fall back to polling
+            return
+
+        self._selector.register(  # type: ignore
+            process.pidfd,
+            selectors.EVENT_READ,
+            partial(self._exited, process),
+        )
+
+    def _exited(self, process: ManagedProcess) -> None:
+        """Reap process which pidfd has become readable."""
+        self._selector.unregister(process.pidfd)  # type: ignore
+        os.close(process.pidfd)  # type: ignore
+        process.pidfd = None
+        process.popen.wait()  # type: ignore
+        self._finish(process)
+
+    def _poll(self) -> None:
+        """Reap exited processes not watched by a pidfd, discarding output."""
+        for process in tuple(self._running):
+            if process.pidfd is None \
+                    and process.popen.poll() is not None:  # type: ignore
+                self._finish(process)
+            elif process.abandoned:
+                process.discard_output()
+
+    def _finish(
+        self,
+        process: ManagedProcess,
+        error: Optional[Exception] = None,
+    ) -> None:
+        """Resolve future of exited process, releasing its slot."""
+        with self.lock:
+            if process in self._running:
+                self._running.remove(process)
+            if process.slot:
+                process.slot = False
+                self._slots_taken -= 1
+            self._update_metrics()
+
+        if error is not None:
+            if process.abandoned:
+                logger.error(
+                    f'Could not start the command "{process.command}": '
+                    f'{error}',
+                )
+            process.close()
+            process.future.set_exception(error)
+        elif process.abandoned:
+            process.close()
+            process.future.set_result(None)
+        else:
+            process.future.set_result(process.result())
+
+    def _update_metrics(self) -> None:
+        """Update process gauges, must be called with the lock held."""
+        shell_processes.set(len(self._queue), state='queued')
+        shell_processes.set(self._slots_taken, state='running')
+        shell_processes.set(
+            sum(process.abandoned for process in self._running),
+            state='background',
+        )
+
+
+# Process manager used for all shell commands
+processes = ProcessManager()
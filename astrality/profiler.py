@@ -0,0 +1,188 @@
+"""Module for profiling the execution of Astrality."""
+
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime
+import io
+import logging
+import os
+from pathlib import Path
+import pstats
+import threading
+from typing import Any, Callable, Iterator, List, Optional, TypeVar
+
+logger = logging.getLogger('astrality')
+
+T = TypeVar('T')
+
+
+class Profiler:
+    """
+    Deterministic profiler of the phases of Astrality, using cProfile.
+
+    Profiling is a no-op until Profiler.enable() is invoked. The statistics of
+    each profiled phase are written to a separate pstats file, and the
+    functions with the largest cumulative time are logged.
+
+    Only the thread starting a phase is profiled, which is the event loop
+    thread when Astrality runs as a daemon. Work handed over to other threads
+    is included by calling it through Profiler.call().
+
+    :param top: Number of functions included in the logged summary.
+    """
+
+    def __init__(self, top: int = 20) -> None:
+        """Initialize disabled profiler."""
+        self.top = top
+        self.directory: Optional[Path] = None
+        self.waves = False
+        self.lock = threading.Lock()
+        self._profile: Optional[cProfile.Profile] = None
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._phase = ''
+        self._phases = 0
+
+    def enable(self, directory: Path, waves: bool = False) -> None:
+        """
+        Start profiling phases.
+
+        :param directory: Directory where pstats files are written.
+        :param waves: If True, each event wave is profiled in addition to
+            startup.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.waves = waves
+
+    def disable(self) -> None:
+        """Stop profiling, discarding any started phase."""
+        with self.lock:
+            if self._profile:
+                self._profile.disable()
+            self._profile = None
+            self._thread_profiles = []
+            self.directory = None
+
+    @property
+    def active(self) -> bool:
+        """Return True if a phase is currently being profiled."""
+        return self._profile is not None
+
+    @contextmanager
+    def profile(self, phase: str) -> Iterator[None]:
+        """
+        Profile the enclosed code as a phase.
+
+        :param phase: Name of phase, such as 'startup'.
+        """
+        started = self.start(phase)
+        try:
+            yield
+        finally:
+            if started:
+                self.stop()
+
+    def start(self, phase: str) -> bool:
+        """
+        Start profiling phase, unless another phase is already profiled.
+
+        :param phase: Name of phase, such as 'wave'.
+        :return: True if profiling was started.
+        """
+        with self.lock:
+            if self.directory is None or self._profile is not None:
+                return False
+
+            self._phase = phase
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+            return True
+
+    def start_wave(self) -> bool:
+        """Start profiling an event wave, if waves are profiled."""
+        if not self.waves:
+            return False
+
+        return self.start('wave')
+
+    def call(self, function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Call function, profiling it as part of the current phase, if any.
+
+        Intended for functions called in other threads than the thread which
+        started the phase.
+
+        :param function: Callable invoked with `args` and `kwargs`.
+        :return: Return value of function.
+        """
+        if self._profile is None:
+            return function(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Only one profiler can be active at a time on some platforms,
+            # in which case the phase profile observes all threads already.
+            return function(*args, **kwargs)
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            with self.lock:
+                if self._profile is not None:
+                    self._thread_profiles.append(profile)
+
+    def stop_wave(self) -> Optional[Path]:
+        """Stop profiling the current event wave, if any."""
+        if self._phase != 'wave':
+            return None
+
+        return self.stop()
+
+    def stop(self) -> Optional[Path]:
+        """
+        Stop profiling the current phase and write its statistics.
+
+        :return: Path to written pstats file, or None if no phase was
+            profiled.
+        """
+        with self.lock:
+            profile, self._profile = self._profile, None
+            if profile is None:
+                return None
+
+            profile.disable()
+            profiles = [profile] + self._thread_profiles
+            self._thread_profiles = []
+            self._phases += 1
+            phase = self._phase
+            number = self._phases
+
+        directory = self.directory
+        if directory is None:
+            return None
+
+        timestamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        stats_file = directory / f'{phase}-{timestamp}-{number}.pstats'
+        try:
+            pstats.Stats(*profiles).dump_stats(str(stats_file))
+        except OSError as error:
+            logger.error(f'Could not write profile "{stats_file}": {error}')
+            return None
+
+        summary = self.summary(profiles)
+        logger.info(f'Profile of {phase} written to "{stats_file}".\n{summary}')
+        return stats_file
+
+    def summary(self, profiles: List[cProfile.Profile]) -> str:
+        """Return table of the functions with largest cumulative time."""
+        output = io.StringIO()
+        statistics = pstats.Stats(*profiles, stream=output)
+        statistics.sort_stats('cumulative').print_stats(self.top)
+        return output.getvalue()
+
+
+# Profiler used throughout Astrality, disabled by default
+profiler = Profiler()
@@ -2,7 +2,9 @@
 
 import os
 import shutil
-from typing import Union
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union
 from pathlib import Path
 
 from mypy_extensions import TypedDict
@@ -10,6 +12,149 @@ from mypy_extensions import TypedDict
 from astrality import utils
 
 
+def modification_time(path: Path) -> Optional[float]:
+    """Return modification time of path, or None if it does not exist."""
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def executable(path: Path) -> bool:
+    """Return True if path is an executable file."""
+    return path.is_file() and os.access(str(path), os.X_OK)
+
+
+class ExecutableIndex:
+    """
+    Index of executable names available through the `$PATH` directories.
+
+    The index is built by listing each `$PATH` directory once, and rebuilt
+    when `$PATH` changes or any of the directories are modified. This
+    replaces one scan of `$PATH` for each program looked up.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty index, built on first lookup."""
+        self.lock = threading.Lock()
+        self._path: Optional[str] = None
+        self._mtimes: Tuple[Optional[float], ...] = ()
+        self._names: Dict[str, Tuple[Path, ...]] = {}
+
+    def __contains__(self, program: str) -> bool:
+        """Return True if program is an executable within `$PATH`."""
+        if os.sep in program:
+            return bool(shutil.which(program))
+
+        with self.lock:
+            self._update()
+            directories = self._names.get(program, ())
+
+        return any(
+            executable(directory / program)
+            for directory
+            in directories
+        )
+
+    def _update(self) -> None:
+        """Rebuild the index if `$PATH` or any of its directories changed."""
+        path = os.environ.get('PATH', os.defpath)
+        directories = tuple(
+            Path(directory)
+            for directory
+            in path.split(os.pathsep)
+            if directory
+        )
+        mtimes = tuple(
+            modification_time(directory)
+            for directory
+            in directories
+        )
+        if path == self._path and mtimes == self._mtimes:
+            return
+
+        names: Dict[str, Tuple[Path, ...]] = {}
+        for directory, mtime in zip(directories, mtimes):
+            if mtime is None:
+                continue
+            try:
+                entries = os.listdir(str(directory))
+            except OSError:
+                continue
+            for name in entries:
+                names[name] = names.get(name, ()) + (directory,)
+
+        self._path = path
+        self._mtimes = mtimes
+        self._names = names
+
+
+executables = ExecutableIndex()
+
+# Results of shell requirements, keyed by (command, directory, timeout), with
+# the time of evaluation, `$PATH`, and the modification time of directory.
+ShellRequirementKey = Tuple[str, Path, Union[int, float]]
+ShellRequirementResult = Tuple[bool, float, str, Optional[float]]
+_shell_results: Dict[ShellRequirementKey, ShellRequirementResult] = {}
+_shell_results_lock = threading.Lock()
+
+
+def clear_requirement_cache() -> None:
+    """Forget the cached results of all shell requirements."""
+    with _shell_results_lock:
+        _shell_results.clear()
+
+
+def shell_requirement(
+    command: str,
+    directory: Path,
+    timeout: Union[int, float],
+    cache_ttl: Union[int, float] = 0,
+) -> bool:
+    """
+    Return True if shell command exits successfully within timeout.
+
+    Cached results are invalidated after `cache_ttl` seconds, or earlier if
+    `$PATH` changes or the working directory is modified.
+
+    :param command: Shell command to be run.
+    :param directory: Working directory of the shell command.
+    :param timeout: Seconds to wait for the command to exit.
+    :param cache_ttl: Seconds a cached result is reused. 0 disables caching.
+    :return: Boolean indicating success.
+    """
+    key = (command, directory, timeout)
+    environment = (
+        os.environ.get('PATH', os.defpath),
+        modification_time(directory),
+    )
+    if cache_ttl:
+        with _shell_results_lock:
+            cached = _shell_results.get(key)
+        if cached \
+                and time.time() - cached[1] < cache_ttl \
+                and cached[2:] == environment:
+            return cached[0]
+
+    result = utils.run_shell(
+        command=command,
+        fallback=False,
+        timeout=timeout,
+        working_directory=directory,
+    )
+    successful = result is not False
+
+    if cache_ttl:
+        with _shell_results_lock:
+            _shell_results[key] = (
+                successful,
+                time.time(),
+                environment[0],
+                environment[1],
+            )
+    return successful
+
+
 class RequirementDict(TypedDict, total=False):
     """Available keys in requirement dictionary."""
 
@@ -28,6 +173,7 @@ class Requirement:
     :param requirements: Dictionary containing requirements.
     :param directory: Module directory.
     :param timeout: Default timeout for shell commands.
+    :param cache_ttl: Seconds the results of shell commands are cached.
     """
 
     successful: bool
@@ -37,6 +183,7 @@ class Requirement:
         requirements: RequirementDict,
         directory: Path,
         timeout: Union[int, float] = 1,
+        cache_ttl: Union[int, float] = 0,
     ) -> None:
         """Construct RequirementStatement object."""
         self.successful: bool = True
@@ -45,13 +192,12 @@ class Requirement:
         # Check shell requirements
         if 'shell' in requirements:
             command = requirements['shell']
-            result = utils.run_shell(
+            if not shell_requirement(
                 command=command,
-                fallback=False,
+                directory=directory,
                 timeout=requirements.get('timeout') or timeout,
-                working_directory=directory,
-            )
-            if result is False:
+                cache_ttl=cache_ttl,
+            ):
                 self.repr = f'Unsuccessful command: "{command}", '
                 self.successful = False
             else:
@@ -70,8 +216,7 @@ class Requirement:
         # Check installed requirements
         if 'installed' in requirements:
             program = requirements['installed']
-            in_path = bool(shutil.which(program))
-            if not in_path:
+            if program not in executables:
                 self.repr += f'Program not installed: "{program}", '
                 self.successful = False
             else:
@@ -0,0 +1,504 @@
+"""
+Module implementing the asynchronous runtime of Astrality.
+
+The runtime drives a ModuleManager from a single asyncio event loop, which
+waits for event transitions, file system modifications, and shell commands
+simultaneously. Context imports, compilations, and configuration reloads are
+executed in worker threads. This way a slow shell command or template in one
+module does not delay the actions of other modules.
+"""
+
+import asyncio
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+import logging
+from pathlib import Path
+import threading
+from typing import (
+    Any,
+    Callable,
+    DefaultDict,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from astrality.metrics import file_modifications_total
+from astrality.module import Module, ModuleManager
+from astrality.profiler import profiler
+from astrality.timing import tracer
+
+logger = logging.getLogger('astrality')
+
+T = TypeVar('T')
+
+
+class Runtime:
+    """
+    Event loop executing the tasks of a module manager.
+
+    Import context actions and compile actions are executed in worker
+    threads, while shell commands are awaited without blocking. Action blocks
+    triggered together are executed as one wave, where all modules compile
+    their templates before any shell commands are run. Action blocks of the
+    same module are executed one at a time, in the order they were triggered,
+    and configuration reloads are executed in a worker thread once all
+    running action blocks are finished.
+
+    File modifications are received from the bounded queue of the directory
+    watcher. At most `max_workers` modifications are handled at the same
+    time, and further modifications are left in the queue.
+
+    :ivar module_manager: The ModuleManager object driven by the runtime.
+    :ivar loop: The asyncio event loop used by the runtime.
+    """
+
+    def __init__(
+        self,
+        module_manager: ModuleManager,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        """
+        Initialize runtime for a module manager which has not been started.
+
+        :param module_manager: ModuleManager object to be driven.
+        :param loop: Event loop to be used. A new event loop is created if
+            none is provided.
+        """
+        self.module_manager = module_manager
+        self._owns_loop = loop is None
+        self.loop = loop or asyncio.new_event_loop()
+
+        self._stop = self.loop.create_future()
+        self._tasks: Set[asyncio.Future] = set()
+        self._modifications = threading.BoundedSemaphore(
+            module_manager.global_modules_config.max_workers,
+        )
+
+    def run(self) -> None:
+        """Run the runtime until Runtime.stop() is invoked."""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.main())
+        finally:
+            if self._owns_loop:
+                self.loop.close()
+
+    def stop(self) -> None:
+        """
+        Stop the runtime after any currently executing tasks are finished.
+
+        This method is thread safe.
+        """
+        def request_stop() -> None:
+            if not self._stop.done():
+                self._stop.set_result(None)
+
+        self.loop.call_soon_threadsafe(request_stop)
+
+    def reschedule(self) -> None:
+        """
+        Wake up the waiter of event transitions, after modules are replaced.
+
+        Must be invoked from within the event loop.
+        """
+        self._reschedule.set()
+
+    async def main(self) -> None:
+        """Start up the managed modules, and then handle events until stop."""
+        # These objects are bound to the running event loop
+        self._reschedule = asyncio.Event()
+        self._locks: DefaultDict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._reload_lock = asyncio.Lock()
+        self._workers = asyncio.Semaphore(
+            self.module_manager.global_modules_config.max_workers,
+        )
+
+        # File system events are received from the file modification queue
+        directory_watcher = self.module_manager.directory_watcher
+        directory_watcher.on_modified = self.file_system_modified
+
+        await self.startup()
+
+        watcher = asyncio.ensure_future(self.event_transitions())
+        await self._stop
+
+        watcher.cancel()
+        await asyncio.wait((watcher,))
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+
+    async def startup(self) -> None:
+        """Execute all startup actions specified by the managed modules."""
+        module_manager = self.module_manager
+
+        # Save the event configuration, such that on_event is only run when
+        # the event *changes*
+        module_manager.last_module_events = module_manager.module_events()
+
+        # Modules adopted from an old Astrality instance are already running
+        modules = module_manager.startup_modules()
+        with profiler.profile('startup'):
+            await self.prepare(block_name='on_startup', modules=modules)
+
+            # Shell commands of different modules are run concurrently
+            await asyncio.gather(*(
+                self.run_commands(module=module, block_name='on_startup')
+                for module
+                in modules
+            ))
+        module_manager.finish_startup()
+        module_manager.finish_wave()
+
+    async def event_transitions(self) -> None:
+        """Wait for event transitions, and execute on_event action blocks."""
+        while True:
+            async with self._reload_lock:
+                time_until_next_event = \
+                    self.module_manager.time_until_next_event()
+            logger.info(
+                f'Waiting {time_until_next_event} '
+                'until next event change and ensuing update.',
+            )
+
+            # Weird bug related to sleeping more than 10e7 seconds
+            # on MacOS, causing OSError: Invalid Argument
+            wait = min(time_until_next_event, timedelta(seconds=10e7))
+            try:
+                await asyncio.wait_for(
+                    self._reschedule.wait(),
+                    timeout=wait.total_seconds(),
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._reschedule.clear()
+
+            async with self._reload_lock:
+                modules = []
+                for module_name in self.module_manager.pop_new_events():
+                    logger.info(f'[module/{module_name}] New event detected.')
+                    modules.append(self.module_manager.modules[module_name])
+
+            if modules:
+                self.spawn(self.execute_wave(
+                    modules=modules,
+                    block_name='on_event',
+                ))
+
+    def file_system_modified(self, modified: Path) -> None:
+        """
+        Pass file system modification from the queue worker to the loop.
+
+        The worker thread of the file modification queue is blocked while
+        `max_workers` modifications are being handled, such that further
+        modifications are coalesced, or dropped when the queue is full.
+
+        :param modified: Absolute path to modified file.
+        """
+        self._modifications.acquire()
+        try:
+            self.loop.call_soon_threadsafe(self._handle_modification, modified)
+        except RuntimeError:
+            # The event loop has been closed
+            self._modifications.release()
+
+    def _handle_modification(self, modified: Path) -> None:
+        """Handle file system modification as a task within the loop."""
+        task = self.spawn(self.file_system_event(modified))
+        task.add_done_callback(lambda _: self._modifications.release())
+
+    async def file_system_event(self, modified: Path) -> None:
+        """
+        Perform actions for when files within the config directory are modified.
+
+        Modified configuration files are reloaded, and triggered on_modified
+        action blocks are executed as one wave.
+
+        :param modified: Absolute path to modified file.
+        """
+        module_manager = self.module_manager
+        if modified in module_manager.config_files:
+            file_modifications_total.inc()
+            await self.reload(modified)
+            return
+
+        async with self._reload_lock:
+            if not module_manager.is_watched(modified):
+                return
+
+            file_modifications_total.inc()
+            content_changed = await self.in_thread(
+                module_manager.content_changed,
+                modified,
+            )
+            modules = module_manager.modules_watching(
+                modified,
+                content_changed,
+            )
+            if not modules:
+                await self.in_thread(
+                    module_manager.recompile_modified_template,
+                    modified,
+                    content_changed,
+                )
+                return
+
+        for module in modules:
+            logger.info(
+                f'[module/{module.name}] on_modified:{modified} triggered.',
+            )
+        await self.execute_wave(
+            modules=modules,
+            block_name='on_modified',
+            path=modified,
+        )
+
+    async def reload(self, modified: Path) -> None:
+        """
+        Reload modified configuration file in a worker thread.
+
+        :param modified: Absolute path to modified configuration file.
+        """
+        module_manager = self.module_manager
+        if modified == module_manager.config_directory / 'astrality.yml':
+            await self.run_exclusively(
+                module_manager.on_application_config_modified,
+            )
+        else:
+            await self.run_exclusively(
+                module_manager.on_module_config_modified,
+                modified,
+            )
+
+        # Reloaded modules might have earlier event transitions
+        self.reschedule()
+
+    async def run_exclusively(
+        self,
+        function: Callable[..., T],
+        *args: Any,
+    ) -> T:
+        """
+        Call function in a worker thread while no action blocks are executed.
+
+        The function might replace the managed modules, so it waits for all
+        running action blocks to finish, and new action blocks wait for the
+        function to return. The lock of the module manager is held by the
+        worker thread while calling the function.
+
+        :param function: Callable invoked with `args`.
+        :return: Return value of function.
+        """
+        async with self._reload_lock:
+            locks = [
+                self._locks[name]
+                for name
+                in sorted(self.module_manager.modules)
+            ]
+            for lock in locks:
+                await lock.acquire()
+            try:
+                return await self.in_thread(
+                    self._call_locked,
+                    function,
+                    *args,
+                )
+            finally:
+                for lock in locks:
+                    lock.release()
+
+    def _call_locked(self, function: Callable[..., T], *args: Any) -> T:
+        """Call function while holding the lock of the module manager."""
+        with self.module_manager.lock:
+            return function(*args)
+
+    async def in_thread(self, function: Callable[..., T], *args: Any) -> T:
+        """
+        Call function in a worker thread, without blocking the event loop.
+
+        The call is profiled as part of the current profiling phase, if any.
+
+        :param function: Callable invoked with `args`.
+        :return: Return value of function.
+        """
+        return await self.loop.run_in_executor(
+            None,
+            partial(profiler.call, function, *args),
+        )
+
+    async def prepare(
+        self,
+        block_name: str,
+        modules: Sequence[Module],
+        path: Optional[Path] = None,
+    ) -> None:
+        """
+        Import context and compile templates of modules in a worker thread.
+
+        Compilations might wait for shell commands of the ``shell`` template
+        filter, so they are never executed within the event loop.
+
+        :param block_name: Name of block such as 'on_startup'.
+        :param modules: Modules which action block should be prepared.
+        :param path: Absolute path in case of block_name == 'on_modified'.
+        """
+        await self.in_thread(partial(
+            self.module_manager.prepare,
+            block_name=block_name,
+            modules=modules,
+            path=path,
+        ))
+
+    async def execute(
+        self,
+        module: Module,
+        block_name: str,
+        path: Optional[Path] = None,
+    ) -> Tuple[Tuple[str, str], ...]:
+        """
+        Execute all actions specified in block_name[:path] of module.
+
+        :param module: Module which action block should be executed.
+        :param block_name: Name of block such as 'on_event'.
+        :param path: Absolute path in case of block_name == 'on_modified'.
+        :return: Tuple of 2-tuples containing (shell_command, stdout,).
+        """
+        results = await self.execute_wave(
+            modules=(module,),
+            block_name=block_name,
+            path=path,
+        )
+        return results[0] if results else ()
+
+    async def execute_wave(
+        self,
+        modules: Sequence[Module],
+        block_name: str,
+        path: Optional[Path] = None,
+    ) -> Tuple[Tuple[Tuple[str, str], ...], ...]:
+        """
+        Execute all actions specified in block_name[:path] of several modules.
+
+        All modules import context and compile templates before any shell
+        commands are run, as commands might use files compiled by any of the
+        modules. The shell commands of different modules are run concurrently.
+
+        :param modules: Modules which action block should be executed.
+        :param block_name: Name of block such as 'on_event'.
+        :param path: Absolute path in case of block_name == 'on_modified'.
+        :return: Tuple containing the results of Runtime.run_commands() for
+            each executed module.
+        """
+        locks = [
+            self._locks[name]
+            for name
+            in sorted(set(module.name for module in modules))
+        ]
+        for lock in locks:
+            await lock.acquire()
+        try:
+            # Modules might have been replaced by a configuration reload
+            # while waiting for the locks.
+            modules = [
+                module
+                for module
+                in modules
+                if self.module_manager.modules.get(module.name) is module
+            ]
+            with tracer.span(
+                block_name,
+                'module',
+                modules=', '.join(module.name for module in modules),
+                path=path or '',
+            ):
+                await self.prepare(
+                    block_name=block_name,
+                    modules=modules,
+                    path=path,
+                )
+
+                # Shell commands of different modules are run concurrently
+                return tuple(await asyncio.gather(*(
+                    self.run_commands(
+                        module=module,
+                        block_name=block_name,
+                        path=path,
+                    )
+                    for module
+                    in modules
+                )))
+        finally:
+            for lock in locks:
+                lock.release()
+
+    async def run_commands(
+        self,
+        module: Module,
+        block_name: str,
+        path: Optional[Path] = None,
+    ) -> Tuple[Tuple[str, str], ...]:
+        """
+        Run all shell commands specified in block_name[:path] of module.
+
+        Commands are run in sequence, just as with Module.run(), and at most
+        `max_workers` modules run commands at the same time.
+
+        :param module: Module which shell commands should be run.
+        :param block_name: Name of block such as 'on_startup'.
+        :param path: Absolute path in case of block_name == 'on_modified'.
+        :return: Tuple of 2-tuples containing (shell_command, stdout,).
+        """
+        default_timeout = self.module_manager.global_modules_config.run_timeout
+        results: Tuple[Tuple[str, str], ...] = tuple()
+
+        async with self._workers:
+            for run_action in module.run_actions(
+                block_name=block_name,
+                path=path,
+            ):
+                with module.timings.measure(
+                    module.name,
+                    block_name,
+                    'run',
+                    command=partial(run_action.option, key='shell'),
+                ):
+                    result = await run_action.execute_async(
+                        default_timeout=default_timeout,
+                    )
+                if result:
+                    results += (result,)
+
+        return results
+
+    def spawn(self, coroutine) -> asyncio.Future:
+        """
+        Schedule coroutine as a task which is awaited before stopping.
+
+        :param coroutine: Coroutine object to be executed.
+        :return: The scheduled task.
+        """
+        profiler.start_wave()
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Future) -> None:
+        """
+        Log any exceptions raised by a finished task.
+
+        When the last running task is finished, a summary of the time spent
+        executing actions since the last summary is logged.
+        """
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(
+                'Module task failed!',
+                exc_info=task.exception(),
+            )
+
+        if not self._tasks:
+            self.module_manager.finish_wave()
@@ -0,0 +1,123 @@
+"""Module for scheduling the event transitions of modules."""
+
+import heapq
+from datetime import datetime
+from itertools import count
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from astrality.metrics import scheduler_lateness_seconds
+
+ScheduleEntry = Tuple[datetime, int, str]
+
+
+class EventScheduler:
+    """
+    Priority queue of the next event transition time of each module.
+
+    Each module has at most one scheduled transition. Rescheduling or
+    unscheduling a module leaves its old heap entry in place, and such stale
+    entries are skipped lazily. All operations are therefore O(log n) in the
+    number of modules, except for inspecting due modules which is O(k) in
+    the number of due modules.
+    """
+
+    def __init__(self) -> None:
+        """Construct empty event scheduler."""
+        self._heap: List[ScheduleEntry] = []
+        self._scheduled: Dict[str, int] = {}
+        self._counter = count()
+
+    def schedule(self, name: str, at: datetime) -> None:
+        """
+        Schedule the next event transition of a module.
+
+        Any earlier scheduled transition of the same module is discarded.
+
+        :param name: Name of module.
+        :param at: Time of next event transition.
+        """
+        identifier = next(self._counter)
+        self._scheduled[name] = identifier
+        heapq.heappush(self._heap, (at, identifier, name))
+
+        # Prevent stale entries from accumulating indefinitely
+        if len(self._heap) > 2 * len(self._scheduled) + 16:
+            self._heap = [entry for entry in self._heap if self._valid(entry)]
+            heapq.heapify(self._heap)
+
+    def unschedule(self, name: str) -> None:
+        """
+        Discard the scheduled event transition of a module.
+
+        :param name: Name of module.
+        """
+        self._scheduled.pop(name, None)
+
+    def next_transition(self) -> Optional[datetime]:
+        """Return the time of the earliest scheduled event transition."""
+        while self._heap and not self._valid(self._heap[0]):
+            heapq.heappop(self._heap)
+
+        if not self._heap:
+            return None
+
+        return self._heap[0][0]
+
+    def due(self, now: datetime) -> Iterator[str]:
+        """
+        Yield names of modules with transitions due, without removing them.
+
+        :param now: Current time.
+        """
+        # Only children of due entries can be due, by the heap invariant
+        stack = [0] if self._heap else []
+        while stack:
+            index = stack.pop()
+            entry = self._heap[index]
+            if entry[0] > now:
+                continue
+
+            if self._valid(entry):
+                yield entry[2]
+
+            stack.extend(
+                child
+                for child
+                in (2 * index + 1, 2 * index + 2)
+                if child < len(self._heap)
+            )
+
+    def pop_due(self, now: datetime) -> List[str]:
+        """
+        Remove and return names of modules with transitions due.
+
+        The modules must be rescheduled by the caller. The delay between the
+        scheduled transition times and `now` is observed as scheduler
+        lateness.
+
+        :param now: Current time.
+        :return: List of module names, ordered by transition time.
+        """
+        due_modules = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if self._valid(entry):
+                del self._scheduled[entry[2]]
+                due_modules.append(entry[2])
+                scheduler_lateness_seconds.observe(
+                    (now - entry[0]).total_seconds(),
+                )
+
+        return due_modules
+
+    def _valid(self, entry: ScheduleEntry) -> bool:
+        """Return True if heap entry has not been rescheduled or removed."""
+        return self._scheduled.get(entry[2]) == entry[1]
+
+    def __contains__(self, name: str) -> bool:
+        """Return True if module has a scheduled event transition."""
+        return name in self._scheduled
+
+    def __len__(self) -> int:
+        """Return the number of scheduled modules."""
+        return len(self._scheduled)
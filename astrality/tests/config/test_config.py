@@ -7,6 +7,7 @@ import pytest
 
 from astrality import compiler
 from astrality.config import (
+    clear_expand_path_cache,
     create_config_directory,
     dict_from_config_file,
     user_configuration,
@@ -15,6 +16,7 @@ from astrality.config import (
     insert_into,
     resolve_config_directory,
 )
+from astrality.metrics import path_cache_lookups_total
 from astrality.module import ModuleManager
 from astrality.utils import generate_expanded_env_dict
 
@@ -175,6 +177,53 @@ def test_expand_path_method(test_config_directory):
         config_directory=test_config_directory,
     ) == test_config_directory / 'test'
 
+def test_expand_path_cache_statistics(test_config_directory):
+    """Repeated path expansions should be served from the cache."""
+    clear_expand_path_cache()
+    hits = path_cache_lookups_total.value(result='hit')
+    misses = path_cache_lookups_total.value(result='miss')
+    for _ in range(3):
+        expand_path(
+            path=Path('templates'),
+            config_directory=test_config_directory,
+        )
+
+    assert path_cache_lookups_total.value(result='miss') == misses + 1
+    assert path_cache_lookups_total.value(result='hit') == hits + 2
+
+def test_clearing_expand_path_cache_picks_up_new_symlinks(tmpdir):
+    """Cleared caches should resolve symlinks created after expansion."""
+    config_directory = Path(tmpdir)
+    target = config_directory / 'target'
+    target.mkdir()
+    link = config_directory / 'link'
+
+    assert expand_path(
+        path=Path('link'),
+        config_directory=config_directory,
+    ) == link
+
+    link.symlink_to(target)
+    clear_expand_path_cache()
+    assert expand_path(
+        path=Path('link'),
+        config_directory=config_directory,
+    ) == target.resolve()
+
+def test_expand_path_respects_changed_home(tmpdir, monkeypatch):
+    """Tilde should be expanded to the current value of $HOME."""
+    monkeypatch.setenv('HOME', str(tmpdir / 'first'))
+    assert expand_path(
+        path=Path('~/dir'),
+        config_directory=Path('/what/ever'),
+    ) == Path(tmpdir, 'first', 'dir')
+
+    monkeypatch.setenv('HOME', str(tmpdir / 'second'))
+    assert expand_path(
+        path=Path('~/dir'),
+        config_directory=Path('/what/ever'),
+    ) == Path(tmpdir, 'second', 'dir')
+
 def test_expand_globbed_path(test_config_directory):
     """Globbed paths should allow one level of globbing."""
     templates = Path('test_modules', 'using_all_actions')
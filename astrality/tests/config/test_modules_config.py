@@ -543,3 +543,33 @@ class TestEnabledModules:
         assert 'south_america::brazil' not in enabled_modules
         assert 'south_america::argentina' not in enabled_modules
         assert 'github::jakobgm/color_schemes.astrality' not in enabled_modules
+
+    def test_enabled_detection_of_directory_modules(self, test_config_directory):
+        enabling_statements = [
+            {'name': 'global'},
+            {'name': 'south_america::brazil'},
+            {'name': 'north_america::*'},
+        ]
+        enabled_modules = EnabledModules(
+            enabling_statements=enabling_statements,
+            config_directory=test_config_directory,
+            modules_directory=test_config_directory / 'freezed_modules',
+        )
+        enabled_modules.compile_config_files({})
+
+        assert set(enabled_modules.external_sources.keys()) == {
+            'south_america',
+            'north_america',
+        }
+        assert enabled_modules.global_module_names == {'global'}
+
+        assert 'global' in enabled_modules
+        assert 'module/global' in enabled_modules
+        assert 'south_america::brazil' in enabled_modules
+        assert 'module/south_america::brazil' in enabled_modules
+        assert 'north_america::USA' in enabled_modules
+
+        assert 'whatever' not in enabled_modules
+        assert 'south_america::argentina' not in enabled_modules
+        assert 'south_america::USA' not in enabled_modules
+        assert 'europe::norway' not in enabled_modules
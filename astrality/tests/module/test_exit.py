@@ -1,4 +1,5 @@
 import os
+import time
 
 import pytest
 
@@ -60,3 +61,78 @@ def test_that_all_exit_actions_are_correctly_performed(
     module_manager.exit()
     with open(test_target) as file:
         assert file.read() == 'My car is a Tesla'
+
+
+def test_exit_actions_are_executed_concurrently_within_deadline(
+    default_global_options,
+    _runtime,
+    tmpdir,
+    caplog,
+):
+    """Slow exit commands should neither delay other modules nor exit."""
+    application_config = {
+        'module/A': {
+            'on_exit': {'run': {'shell': 'sleep 0.3 && touch A'}},
+        },
+        'module/B': {
+            'on_exit': {'run': {'shell': 'sleep 0.3 && touch B'}},
+        },
+        'module/slow': {
+            'on_exit': {
+                'run': [
+                    {'shell': 'sleep 5', 'timeout': 10},
+                    {'shell': 'touch skipped'},
+                ],
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['_runtime']['config_directory'] = tmpdir
+    application_config['config/modules'] = {
+        'run_timeout': 1,
+        'exit_timeout': 2,
+        'exit_module_timeout': 0.5,
+    }
+    module_manager = ModuleManager(application_config)
+
+    start = time.monotonic()
+    module_manager.exit()
+    assert time.monotonic() - start < 1
+
+    assert (tmpdir / 'A').check()
+    assert (tmpdir / 'B').check()
+    assert not (tmpdir / 'skipped').check()
+    assert any(
+        'exceeded its budget' in message
+        for _, _, message
+        in caplog.record_tuples
+    )
+
+
+def test_modules_failing_to_compile_still_run_exit_commands(
+    default_global_options,
+    _runtime,
+    tmpdir,
+    monkeypatch,
+):
+    """Exiting should never skip modules, even if compilation fails."""
+    application_config = {
+        f'module/{name}': {
+            'on_exit': {'run': {'shell': f'echo {name} >> log'}},
+        }
+        for name in ('A', 'B', 'C')
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['_runtime']['config_directory'] = tmpdir
+    application_config['config/modules'] = {'run_timeout': 1}
+    module_manager = ModuleManager(application_config)
+
+    def compile(*args, **kwargs):
+        raise RuntimeError('Could not compile template')
+
+    monkeypatch.setattr(module_manager.modules['B'], 'compile', compile)
+    assert module_manager.exit_modules(module_manager.modules.values()) \
+        == set()
+    assert sorted((tmpdir / 'log').read().splitlines()) == ['A', 'B', 'C']
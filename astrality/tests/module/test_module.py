@@ -10,6 +10,7 @@ import pytest
 
 from astrality import event_listener
 from astrality.config import dict_from_config_file
+from astrality.exceptions import MisconfiguredConfigurationFile
 from astrality.module import Module, ModuleManager
 from astrality.resolver import Resolver
 from astrality.tests.utils import RegexCompare
@@ -852,6 +853,52 @@ def test_trigger_event_module_action(
         'car': {'manufacturer': 'Mercedes'},
     }
 
+def test_execution_plan_of_triggered_action_blocks(conf_path):
+    """Triggered action blocks should be resolved once, in execution order."""
+    module = Module(
+        module_config={'module/A': {
+            'on_startup': {'trigger': [
+                {'block': 'on_event'},
+                {'block': 'on_modified', 'path': 'templateA'},
+            ]},
+            'on_event': {'trigger': {'block': 'on_exit'}},
+            'on_modified': {'templateA': {}},
+        }},
+        module_directory=conf_path,
+    )
+    on_modified_block = module.get_action_block(
+        name='on_modified',
+        path=conf_path / 'templateA',
+    )
+    assert module.triggered_action_blocks('on_startup') == (
+        module.get_action_block('on_startup'),
+        module.get_action_block('on_event'),
+        module.get_action_block('on_exit'),
+        on_modified_block,
+    )
+    assert module.triggered_action_blocks(
+        'on_modified',
+        conf_path / 'templateA',
+    ) == (on_modified_block,)
+
+
+def test_trigger_cycles_are_detected_on_initialization(conf_path):
+    """Modules with cyclic triggers should not be loaded."""
+    module_config = {'module/A': {
+        'on_startup': {'trigger': {'block': 'on_event'}},
+        'on_event': {'trigger': {'block': 'on_modified', 'path': 'file'}},
+        'on_modified': {'file': {'trigger': {'block': 'on_event'}}},
+    }}
+    with pytest.raises(MisconfiguredConfigurationFile) as error:
+        Module(module_config=module_config, module_directory=conf_path)
+    assert 'on_event -> on_modified:' in str(error.value)
+
+    # Triggering undefined on_modified blocks is also a configuration error
+    module_config['module/A']['on_modified'] = {}
+    with pytest.raises(MisconfiguredConfigurationFile):
+        Module(module_config=module_config, module_directory=conf_path)
+
+
 def test_not_using_list_when_specifiying_trigger_action(
     conf_path,
     default_global_options,
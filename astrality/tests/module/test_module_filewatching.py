@@ -1,4 +1,5 @@
 """Tests for module manager behaviour related to file system modifications."""
+import copy
 import os
 import shutil
 import time
@@ -7,6 +8,7 @@ from pathlib import Path
 import pytest
 
 from astrality.config import dict_from_config_file
+from astrality.metrics import skipped_writes_total
 from astrality.module import ModuleManager
 
 
@@ -105,6 +107,54 @@ def test_direct_invocation_of_modifed_method_of_module_manager(modules_config):
     time.sleep(0.5)
     assert touch_target.is_file()
 
+def test_index_of_watched_paths(modules_config, test_config_directory):
+    config, empty_template, *_ = modules_config
+    module_manager = ModuleManager(config)
+    module_a = module_manager.modules['A']
+
+    assert module_manager.modules_watching(empty_template) == (module_a,)
+    assert module_manager.modules_watching(Path('/not/watched')) == ()
+
+    assert module_manager.is_watched(empty_template)
+    assert module_manager.is_watched(test_config_directory / 'astrality.yml')
+    assert not module_manager.is_watched(Path('/not/watched'))
+
+    # The index is updated when modules are replaced
+    module_manager.swap_modules(
+        old_modules=('A',),
+        new_modules={},
+        defined_context=module_manager.defined_context,
+    )
+    assert module_manager.modules_watching(empty_template) == ()
+    assert not module_manager.is_watched(empty_template)
+
+
+def test_watched_paths(modules_config, test_config_directory, tmpdir):
+    """Only paths relevant to the modules should be watched."""
+    config, empty_template, _, _, secondary_template, _ = modules_config
+    context_file = Path(tmpdir) / 'context.yml'
+    config['module/B'] = {
+        'on_startup': {'import_context': {'from_path': str(context_file)}},
+    }
+
+    module_manager = ModuleManager(config)
+    assert module_manager.watched_paths() == {
+        empty_template,
+        test_config_directory / 'astrality.yml',
+        context_file,
+    }
+    assert module_manager.directory_watcher.specification == {
+        empty_template.parent: False,
+        test_config_directory: False,
+        Path(tmpdir): False,
+    }
+
+    # Template sources are watched when they are recompiled on modification
+    config['config/modules'] = {'recompile_modified_templates': True}
+    module_manager = ModuleManager(config)
+    assert secondary_template in module_manager.watched_paths()
+
+
 def test_on_modified_event_in_module(modules_config):
     (
         config,
@@ -213,6 +263,114 @@ def test_hot_reloading(
     if target_config.is_file():
         os.remove(target_config)
 
+def test_reloading_only_restarts_changed_modules(
+    tmpdir,
+    default_global_options,
+    _runtime,
+):
+    """Unchanged modules should be kept running when reloading."""
+    temp_dir = Path(tmpdir)
+    log = temp_dir / 'log'
+    template = temp_dir / 'colors.template'
+    template.write_text('{{ colors.primary }}')
+    target = temp_dir / 'colors'
+
+    def application_config(primary_color, b_greeting):
+        config = {
+            'config/modules': {'run_timeout': 1, 'max_workers': 1},
+            'context/colors': {'primary': primary_color},
+            'module/A': {
+                'on_startup': {
+                    'compile': {'source': str(template), 'target': str(target)},
+                    'run': {'shell': f'echo A-startup >> {log}'},
+                },
+                'on_exit': {'run': {'shell': f'echo A-exit >> {log}'}},
+            },
+            'module/B': {
+                'on_startup': {'run': {'shell': f'echo {b_greeting} >> {log}'}},
+                'on_exit': {'run': {'shell': f'echo B-exit >> {log}'}},
+            },
+        }
+        config.update(copy.deepcopy(default_global_options))
+        config.update(_runtime)
+        return config
+
+    module_manager = ModuleManager(application_config('red', 'hello'))
+    module_manager.finish_tasks()
+    module_a = module_manager.modules['A']
+    assert log.read_text() == 'A-startup\nhello\n'
+    assert target.read_text() == 'red'
+
+    # Only module B is changed, and should be restarted
+    module_manager.reload(ModuleManager(application_config('red', 'hi')))
+    assert log.read_text() == 'A-startup\nhello\nB-exit\nhi\n'
+    assert module_manager.modules['A'] is module_a
+
+    # Context changes cause recompilation without restarting modules
+    module_manager.reload(ModuleManager(application_config('blue', 'hi')))
+    assert log.read_text() == 'A-startup\nhello\nB-exit\nhi\n'
+    assert target.read_text() == 'blue'
+
+    module_manager.directory_watcher.stop()
+
+
+def test_reloading_modified_module_config_file(
+    tmpdir,
+    default_global_options,
+):
+    """Only changed modules in a modified config.yml should be restarted."""
+    config_directory = Path(tmpdir)
+    log = config_directory / 'log'
+    module_directory = config_directory / 'modules' / 'greetings'
+    module_directory.mkdir(parents=True)
+    module_config_file = module_directory / 'config.yml'
+
+    def write_module_config(greeting):
+        module_config_file.write_text(
+            'module/english:\n'
+            '    on_startup:\n'
+            f'        run:\n            - shell: echo {greeting} >> {log}\n'
+            '    on_exit:\n'
+            f'        run:\n            - shell: echo bye >> {log}\n'
+            'module/norwegian:\n'
+            '    on_startup:\n'
+            f'        run:\n            - shell: echo hei >> {log}\n'
+        )
+
+    write_module_config('hello')
+    application_config = {
+        'config/modules': {'run_timeout': 1},
+        'module/global': {
+            'on_startup': {'run': {'shell': f'echo global >> {log}'}},
+        },
+        '_runtime': {
+            'config_directory': config_directory,
+            'temp_directory': config_directory,
+        },
+    }
+    application_config.update(default_global_options)
+    application_config['config/astrality']['hot_reload_config'] = True
+
+    module_manager = ModuleManager(application_config)
+    module_manager.finish_tasks()
+    norwegian = module_manager.modules['greetings::norwegian']
+    assert sorted(log.read_text().split()) == ['global', 'hei', 'hello']
+
+    # Invoke the modification handler directly instead of the file watcher
+    module_manager.directory_watcher.stop()
+    log.write_text('')
+    write_module_config('hi')
+    module_manager.file_system_modified(module_config_file)
+
+    assert log.read_text() == 'bye\nhi\n'
+    assert module_manager.modules['greetings::norwegian'] is norwegian
+    assert set(module_manager.modules) == {
+        'global',
+        'greetings::english',
+        'greetings::norwegian',
+    }
+
+
 @pytest.yield_fixture
 def three_watchable_files(test_config_directory):
     file1 = test_config_directory / 'file1.tmp'
@@ -351,6 +509,125 @@ def test_recompile_templates_when_modified(
     module_manager.exit()
 
 
+def test_recompile_single_template_in_directory_source(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    templates = Path(tmpdir, 'templates')
+    templates.mkdir()
+    (templates / 'a').write_text('a')
+    (templates / 'b').write_text('b')
+    targets = Path(tmpdir, 'targets')
+
+    application_config = {
+        'module/module_name': {
+            'on_startup': {
+                'compile': {
+                    'source': str(templates),
+                    'target': str(targets),
+                },
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['config/modules'] = {
+        'recompile_modified_templates': True,
+    }
+
+    module_manager = ModuleManager(application_config)
+    module_manager.startup()
+    module_manager.directory_watcher.stop()
+    assert module_manager.is_watched(templates / 'a')
+    assert not module_manager.is_watched(templates)
+
+    # Only the modified template should be recompiled
+    (templates / 'a').write_text('new a')
+    (templates / 'b').write_text('new b')
+    module_manager.file_system_modified(templates / 'a')
+    assert (targets / 'a').read_text() == 'new a'
+    assert (targets / 'b').read_text() == 'b'
+
+    module_manager.exit()
+
+
+def test_ignoring_modifications_with_unchanged_content(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    temp_dir = Path(tmpdir)
+    watched = temp_dir / 'watched'
+    watched.write_text('content')
+    template = temp_dir / 'template'
+    template.write_text('template')
+    target = temp_dir / 'target'
+    log = temp_dir / 'log'
+
+    application_config = {
+        'module/A': {
+            'on_startup': {
+                'compile': {'source': str(template), 'target': str(target)},
+            },
+            'on_modified': {
+                str(watched): {
+                    'ignore_unchanged': True,
+                    'run': {'shell': f'echo A >> {log}'},
+                },
+            },
+        },
+        'module/B': {
+            'on_modified': {
+                str(watched): {'run': {'shell': f'echo B >> {log}'}},
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['config/modules'] = {
+        'recompile_modified_templates': True,
+        'ignore_unchanged_templates': True,
+        'run_timeout': 1,
+    }
+
+    module_manager = ModuleManager(application_config)
+    module_manager.finish_tasks()
+    module_manager.directory_watcher.stop()
+
+    # Touching the file only triggers modules which do not ignore it
+    watched.touch()
+    module_manager.file_system_modified(watched)
+    assert log.read_text() == 'B\n'
+
+    watched.write_text('new content')
+    module_manager.file_system_modified(watched)
+    assert sorted(log.read_text().split()) == ['A', 'B', 'B']
+
+    # Unchanged templates are not recompiled
+    skipped_writes = skipped_writes_total.value()
+    target.write_text('overwritten')
+    template.touch()
+    module_manager.file_system_modified(template)
+    assert target.read_text() == 'overwritten'
+    assert skipped_writes_total.value() == skipped_writes + 1
+
+    template.write_text('new template')
+    module_manager.file_system_modified(template)
+    assert target.read_text() == 'new template'
+
+    # Digests are forgotten when the modules tracking them are removed
+    assert set(module_manager.file_digests) == {watched, template}
+    module_manager.swap_modules(
+        old_modules=('A',),
+        new_modules={},
+        defined_context=module_manager.defined_context,
+    )
+    assert module_manager.file_digests == {}
+
+    module_manager.exit()
+
+
 def test_recompile_templates_when_modified_overridden(
     three_watchable_files,
     default_global_options,
@@ -2,8 +2,9 @@
 
 import logging
 from pathlib import Path
+import time
 
-from astrality.module import Module
+from astrality.module import Module, ModuleManager
 from astrality.tests.utils import RegexCompare
 
 def test_module_requires_option(caplog):
@@ -58,3 +59,22 @@ def test_module_requires_option(caplog):
             'Unsuccessful command: "command -v does_not_exist", !',
         )
     ) in caplog.record_tuples
+
+
+def test_requirements_of_modules_are_checked_concurrently(
+    default_global_options,
+    _runtime,
+):
+    """Slow requirements of different modules should be checked in parallel."""
+    application_config = {
+        'module/A': {'requires': {'shell': 'sleep 0.5', 'timeout': 2}},
+        'module/B': {'requires': {'shell': 'sleep 0.5 && exit 1'}},
+        'module/C': {'requires': {'shell': 'sleep 0.5', 'timeout': 2}},
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+
+    start = time.time()
+    module_manager = ModuleManager(application_config)
+    assert time.time() - start < 0.9
+    assert list(module_manager.modules) == ['A', 'C']
@@ -0,0 +1,92 @@
+"""Tests for parallel execution of independent modules."""
+
+import time
+
+import pytest
+
+from astrality.module import ModuleManager
+
+
+@pytest.fixture
+def application_config(default_global_options, _runtime, tmpdir):
+    """Return configuration where module B uses context imported by A."""
+    context_file = tmpdir / 'context.yml'
+    context_file.write('context/colors:\n    primary: blue\n')
+    template = tmpdir / 'template'
+    template.write('{{ colors.primary }}')
+
+    config = {
+        'config/modules': {'run_timeout': 2},
+        'module/A': {
+            'on_startup': {
+                'import_context': {
+                    'from_path': str(context_file),
+                    'from_section': 'colors',
+                },
+                'run': {'shell': 'sleep 0.5'},
+            },
+        },
+        'module/B': {
+            'on_startup': {
+                'compile': {
+                    'source': str(template),
+                    'target': str(tmpdir / 'compiled'),
+                },
+            },
+        },
+        'module/C': {
+            'on_startup': {'run': {'shell': 'sleep 0.5'}},
+        },
+        'module/D': {
+            'on_startup': {
+                'run': {'shell': 'cat {' + str(template) + '} > used'},
+            },
+        },
+    }
+    config.update(default_global_options)
+    config.update(_runtime)
+    config['_runtime']['config_directory'] = tmpdir
+    return config
+
+
+def test_independent_modules_run_in_parallel(application_config, tmpdir):
+    """Slow commands of one module should not delay other modules."""
+    module_manager = ModuleManager(application_config)
+
+    start = time.time()
+    module_manager.finish_tasks()
+    assert time.time() - start < 0.9
+    assert (tmpdir / 'compiled').read() == 'blue'
+
+    module_manager.exit()
+
+
+def test_sequential_execution_with_single_worker(application_config, tmpdir):
+    """Setting max_workers to 1 should execute modules one at a time."""
+    application_config['config/modules']['max_workers'] = 1
+    module_manager = ModuleManager(application_config)
+
+    start = time.time()
+    module_manager.finish_tasks()
+    assert time.time() - start > 0.9
+    assert (tmpdir / 'compiled').read() == 'blue'
+
+    module_manager.exit()
+
+
+def test_commands_run_after_all_compilations(application_config, tmpdir):
+    """Commands using compiled files by literal paths should see them."""
+    slow_template = tmpdir / 'slow_template'
+    slow_template.write(
+        '{% for i in range(200000) %}{{ colors.primary }}{% endfor %}',
+    )
+    application_config['module/B']['on_startup']['compile']['source'] = \
+        str(slow_template)
+    application_config['module/E'] = {
+        'on_startup': {'run': {'shell': 'test -s compiled && touch seen'}},
+    }
+    module_manager = ModuleManager(application_config)
+    module_manager.finish_tasks()
+    assert (tmpdir / 'seen').check()
+
+    module_manager.exit()
@@ -3,7 +3,7 @@
 from pathlib import Path
 import logging
 
-from astrality.module import ModuleManager
+from astrality.module import Module, ModuleManager
 
 def test_use_of_string_interpolations_of_module(
     default_global_options,
@@ -102,3 +102,34 @@ def test_use_of_string_interpolations_of_module(
         'String placeholder {/not/here} could not be replaced. '
         '"/not/here" has not been compiled.',
     )]
+
+
+def test_caching_of_string_interpolations(tmpdir):
+    """Interpolations should be recomputed when compilations change."""
+    temp_dir = Path(tmpdir)
+    template = temp_dir / 'template'
+    template.write_text('')
+    target = temp_dir / 'target'
+
+    module = Module(
+        module_config={'module/A': {
+            'event_listener': {'type': 'static'},
+            'on_startup': {
+                'compile': {'source': str(template), 'target': str(target)},
+            },
+        }},
+        module_directory=temp_dir,
+    )
+
+    placeholder = '{' + str(template) + '} {event}'
+    assert module.interpolate_string(placeholder) == placeholder[:-7] + 'static'
+    assert placeholder in module._interpolations
+
+    # New compilations invalidate the cache
+    module.compile('on_startup')
+    assert module.interpolate_string(placeholder) == str(target) + ' static'
+
+    # Repeated compilations do not
+    module.compile('on_startup')
+    module._interpolations[placeholder] = 'cached'
+    assert module.interpolate_string(placeholder) == 'cached'
@@ -11,6 +11,7 @@ from astrality.compiler import (
     cast_to_numeric,
     compile_template,
     compile_template_to_string,
+    context_sections,
     jinja_environment,
 )
 from astrality.resolver import Resolver
@@ -206,3 +207,26 @@ def test_writing_template_with_string_permissions(tmpdir):
         permissions=permissions,
     )
     assert (target.stat().st_mode & 0o777) == 0o100
+
+def test_context_sections_referenced_by_template(tmpdir):
+    tmpdir = Path(tmpdir)
+    template = tmpdir / 'template'
+    template.write_text(
+        '{{ colors.primary }} {% for font in fonts %}{{ font }}{% endfor %}',
+    )
+    assert context_sections(template) == {'colors', 'fonts'}
+
+    template.write_text('{% include "other" %}{{ colors.primary }}')
+    assert context_sections(template) is None
+
+    assert context_sections(tmpdir / 'does_not_exist') is None
+
+
+def test_context_sections_of_template_using_shell_filter(tmpdir):
+    """Filters added by Astrality should not break the analysis."""
+    template = Path(tmpdir) / 'template'
+    template.write_text('{{ "echo hi" | shell }} {{ colors.primary }}')
+    assert context_sections(template) == {'colors'}
+
+    template.write_text('{{ "echo hi" | undefined_filter }}')
+    assert context_sections(template) is None
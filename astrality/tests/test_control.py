@@ -0,0 +1,206 @@
+"""Tests for the control socket of a running Astrality daemon."""
+
+import copy
+from pathlib import Path
+import threading
+import time
+
+import pytest
+
+from astrality.config import user_configuration
+from astrality.control import (
+    ControlServer,
+    Controller,
+    send_command,
+    take_over,
+)
+from astrality.exceptions import ControlCommandError
+from astrality.module import ModuleManager
+from astrality.runtime import Runtime
+
+
+@pytest.fixture
+def application_config(default_global_options, _runtime, tmpdir):
+    """Return configuration of the controlled module manager."""
+    template = tmpdir / 'template'
+    template.write('{{ env.USER }}')
+    application_config = {
+        'module/A': {
+            'event_listener': {'type': 'weekday'},
+            'on_startup': {
+                'compile': {
+                    'source': str(template),
+                    'target': str(tmpdir / 'target'),
+                },
+            },
+            'on_event': {'run': {'shell': 'echo triggered'}},
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['_runtime']['config_directory'] = Path(tmpdir)
+    return application_config
+
+
+@pytest.yield_fixture
+def control_socket(application_config, tmpdir):
+    """Return path to control socket of a running runtime."""
+    module_manager = ModuleManager(copy.deepcopy(application_config))
+    runtime = Runtime(module_manager)
+    socket_path = Path(tmpdir) / 'control.sock'
+    control_server = ControlServer(
+        path=socket_path,
+        controller=Controller(runtime),
+    )
+    control_server.start()
+    thread = threading.Thread(target=runtime.run)
+    thread.start()
+
+    yield socket_path
+
+    control_server.stop()
+    runtime.stop()
+    thread.join()
+    module_manager.exit()
+
+
+def test_control_commands(control_socket, tmpdir):
+    """Commands should be executed by the running runtime."""
+    events = send_command('events', socket_path=control_socket, timeout=5)
+    assert set(events) == {'A'}
+
+    result = send_command(
+        'trigger',
+        socket_path=control_socket,
+        timeout=5,
+        module='A',
+        block='on_event',
+    )
+    assert result == [['echo triggered', 'triggered']]
+
+    target = tmpdir / 'target'
+    target.write('modified')
+    assert send_command(
+        'recompile',
+        socket_path=control_socket,
+        timeout=5,
+        template=str(tmpdir / 'template'),
+    ) == [str(target)]
+    assert target.read() != 'modified'
+
+    metrics = send_command('metrics', socket_path=control_socket, timeout=5)
+    assert '# TYPE astrality_action_duration_seconds histogram' in metrics
+
+
+def test_invalid_control_commands(control_socket, tmpdir):
+    """Invalid commands should be answered with errors."""
+    with pytest.raises(ControlCommandError, match='Unknown command'):
+        send_command('unknown', socket_path=control_socket, timeout=5)
+
+    with pytest.raises(ControlCommandError, match='is not running'):
+        send_command(
+            'trigger',
+            socket_path=control_socket,
+            timeout=5,
+            module='B',
+            block='on_event',
+        )
+
+    with pytest.raises(ControlCommandError, match='Invalid arguments'):
+        send_command('events', socket_path=control_socket, foo='bar')
+
+    with pytest.raises(ControlCommandError, match='not been compiled'):
+        send_command(
+            'recompile',
+            socket_path=control_socket,
+            timeout=5,
+            template=str(tmpdir / 'unknown'),
+        )
+
+
+def test_reloading_module(tmpdir):
+    """Reloaded modules should be restarted with the current configuration."""
+    config_directory = Path(tmpdir)
+    (config_directory / 'astrality.yml').write_text(
+        'module/A:\n'
+        '    on_startup:\n'
+        '        run:\n'
+        '            shell: touch started\n'
+        '    on_exit:\n'
+        '        run:\n'
+        '            shell: touch exited\n',
+    )
+    module_manager = ModuleManager(
+        user_configuration(config_directory=config_directory),
+    )
+    module_manager.finish_tasks()
+    assert (tmpdir / 'started').check()
+
+    (tmpdir / 'started').remove()
+    module_manager.reload_module('A')
+    assert (tmpdir / 'exited').check()
+    assert (tmpdir / 'started').check()
+
+    with pytest.raises(ControlCommandError):
+        module_manager.reload_module('B')
+    module_manager.exit()
+
+
+def test_take_over_from_running_instance(application_config, control_socket):
+    """Adopted modules should be acknowledged to the old instance."""
+    module_manager = ModuleManager(application_config)
+    assert take_over(module_manager, socket_path=control_socket, timeout=5)
+    assert module_manager.adopted_modules == {'A'}
+
+    # The old instance no longer offers modules which have been handed over
+    assert send_command(
+        'handover_commit',
+        socket_path=control_socket,
+        timeout=5,
+        modules=['A'],
+    ) == []
+
+
+def test_reloading_module_does_not_block_runtime(tmpdir):
+    """Control commands should be answered while a module is reloaded."""
+    config_directory = Path(tmpdir)
+    (config_directory / 'astrality.yml').write_text(
+        'module/A:\n'
+        '    on_exit:\n'
+        '        run:\n'
+        '            shell: sleep 0.5\n'
+        '            timeout: 1\n',
+    )
+    module_manager = ModuleManager(
+        user_configuration(config_directory=config_directory),
+    )
+    runtime = Runtime(module_manager)
+    socket_path = config_directory / 'control.sock'
+    control_server = ControlServer(
+        path=socket_path,
+        controller=Controller(runtime),
+    )
+    control_server.start()
+    thread = threading.Thread(target=runtime.run)
+    thread.start()
+
+    try:
+        reload = threading.Thread(
+            target=send_command,
+            args=('reload',),
+            kwargs={'socket_path': socket_path, 'timeout': 5, 'module': 'A'},
+        )
+        reload.start()
+        time.sleep(0.1)
+
+        start = time.monotonic()
+        send_command('metrics', socket_path=socket_path, timeout=5)
+        assert time.monotonic() - start < 0.3
+
+        reload.join()
+        assert time.monotonic() - start > 0.3
+    finally:
+        control_server.stop()
+        runtime.stop()
+        thread.join()
+        module_manager.exit()
@@ -5,7 +5,12 @@ from pathlib import Path
 
 import pytest
 
-from astrality.filewatcher import DirectoryWatcher
+from astrality.filewatcher import (
+    DirectoryWatcher,
+    EventQueue,
+    ignored,
+    watch_specification,
+)
 
 
 @pytest.yield_fixture
@@ -75,21 +80,19 @@ def test_filesystem_watcher(test_files, watch_dir):
     assert not hasattr(event_saver, 'argument')
     assert event_saver.called == 0
 
-    # Create an empty file
+    # Create an empty file, which is considered "modified"
     test_file1.touch()
-
-    # New files are not considered "modified"
     time.sleep(0.7)
-    assert not hasattr(event_saver, 'argument')
-    assert event_saver.called == 0
+    assert event_saver.argument == test_file1
+    assert event_saver.called >= 1
 
-    # But when we write to it, it is considered "modified"
+    # And so is writing to it
     with open(test_file1, 'w') as file:
         file.write('test_content')
 
     time.sleep(0.7)
     assert event_saver.argument == test_file1
-    assert event_saver.called >= 1
+    assert event_saver.called >= 2
 
     # Create a directory in the watched directory
     recursive_dir.mkdir(parents=True)
@@ -105,4 +108,183 @@ def test_filesystem_watcher(test_files, watch_dir):
     # Both the touch event and the write event are considered of interest
     time.sleep(0.7)
     assert event_saver.argument == test_file2
-    assert event_saver.called >= 2
+    assert event_saver.called >= 3
+
+
+@pytest.mark.slow
+def test_coalescing_of_file_system_events(tmpdir):
+    """Bursts of events, including move-over saves, should be coalesced."""
+    watched_directory = Path(tmpdir)
+    test_file1 = watched_directory / 'tmp_test_file1'
+    modified = []
+    dir_watcher = DirectoryWatcher(
+        directory=watched_directory,
+        on_modified=modified.append,
+        quiet_window=0.3,
+    )
+    dir_watcher.start()
+
+    try:
+        # Typical editor save, writing a temporary file and moving it over
+        temporary_file = watched_directory / 'tmp_test_file1.swp'
+        temporary_file.write_text('one')
+        temporary_file.write_text('two')
+        temporary_file.rename(test_file1)
+        test_file1.chmod(0o644)
+
+        time.sleep(1)
+        assert modified.count(test_file1) == 1
+    finally:
+        dir_watcher.stop()
+
+
+@pytest.mark.slow
+def test_targeted_watches(tmpdir):
+    """Only specified files, and files within directories, should be watched."""
+    config_directory = Path(tmpdir.mkdir('config'))
+    outside_directory = Path(tmpdir.mkdir('outside'))
+    watched_file = outside_directory / 'watched'
+    unwatched_file = config_directory / 'unwatched'
+
+    modified = []
+    dir_watcher = DirectoryWatcher(
+        directory=config_directory,
+        on_modified=modified.append,
+    )
+    dir_watcher.watch([watched_file])
+    dir_watcher.start()
+
+    try:
+        unwatched_file.write_text('unwatched')
+        watched_file.write_text('watched')
+        time.sleep(0.7)
+        assert unwatched_file not in modified
+        assert watched_file in modified
+
+        # Watches are replaced while the watcher is running
+        dir_watcher.watch([config_directory])
+        unwatched_file.write_text('now watched')
+        time.sleep(0.7)
+        assert unwatched_file in modified
+        assert list(dir_watcher.watches) == [config_directory]
+    finally:
+        dir_watcher.stop()
+
+
+@pytest.mark.slow
+def test_watches_of_directories_created_later(tmpdir):
+    """Files in directories created after startup should be watched."""
+    config_directory = Path(tmpdir.mkdir('config'))
+    watched_file = Path(tmpdir) / 'created' / 'later' / 'watched'
+
+    modified = []
+    dir_watcher = DirectoryWatcher(
+        directory=config_directory,
+        on_modified=modified.append,
+    )
+    dir_watcher.watch([watched_file])
+    dir_watcher.start()
+
+    try:
+        assert list(dir_watcher.watches) == [Path(tmpdir)]
+
+        # Nested directories and files might be created before the rearm
+        # caused by the creation of the outermost directory.
+        watched_file.parent.mkdir(parents=True)
+        watched_file.write_text('watched')
+        dir_watcher.rearm()
+        assert list(dir_watcher.watches) == [watched_file.parent]
+
+        for _ in range(50):
+            if watched_file in modified:
+                break
+            time.sleep(0.1)
+        assert watched_file in modified
+    finally:
+        dir_watcher.stop()
+
+
+def test_watch_specification(tmpdir):
+    """Files should be watched through their parent directory."""
+    directory = Path(tmpdir)
+    subdirectory = Path(tmpdir.mkdir('templates'))
+
+    assert watch_specification([
+        directory / 'file',
+        subdirectory,
+        subdirectory / 'template',
+        directory / 'non_existent' / 'file',
+    ]) == {directory: False, subdirectory: True}
+
+    # Directories covered by recursive watches are left out
+    assert watch_specification([directory, subdirectory / 'template']) \
+        == {directory: True}
+
+    # Paths in missing directories are watched through existing ancestors
+    assert watch_specification([subdirectory / 'a' / 'b' / 'template']) \
+        == {subdirectory: False}
+
+
+def test_ignored_paths():
+    """Version control directories and editor swap files are ignored."""
+    assert ignored(Path('/config/modules/repo/.git/index'))
+    assert ignored(Path('/config/.astrality.yml.swp'))
+    assert ignored(Path('/config/astrality.yml~'))
+    assert ignored(Path('/config/.#astrality.yml'))
+    assert ignored(Path('/config/4913'))
+    assert not ignored(Path('/config/astrality.yml'))
+    assert not ignored(Path('/config/modules/repo/config.yml'))
+
+
+def test_event_queue():
+    """Modifications should be passed on after the quiet window."""
+    modified = []
+    queue = EventQueue(callback=modified.append, quiet_window=0.1)
+
+    queue.put(Path('/a'))
+    queue.put(Path('/b'))
+    queue.put(Path('/a'))
+    assert modified == []
+    assert queue.metrics()['depth'] == 2
+
+    time.sleep(0.3)
+    assert modified == [Path('/b'), Path('/a')]
+    assert queue.metrics() == {
+        'depth': 0,
+        'max_depth': 2,
+        'coalesced': 1,
+        'delivered': 2,
+        'dropped': 0,
+    }
+
+    queue.stop()
+    assert not queue.put(Path('/a'))
+    time.sleep(0.2)
+    assert modified == [Path('/b'), Path('/a')]
+
+
+def test_event_queue_backpressure():
+    """Slow callbacks should block producers, and eventually drop events."""
+    def slow_callback(path):
+        time.sleep(0.3)
+
+    queue = EventQueue(
+        callback=slow_callback,
+        max_size=1,
+        put_timeout=0.05,
+    )
+    assert queue.put(Path('/a'))
+    time.sleep(0.1)
+
+    # The worker thread is busy, but the queue has room for one more path
+    assert queue.put(Path('/b'))
+    assert not queue.put(Path('/c'))
+
+    # Producers are unblocked as soon as the queue has room again
+    queue.put_timeout = 1
+    assert queue.put(Path('/c'))
+
+    metrics = queue.metrics()
+    assert metrics['dropped'] == 1
+    assert metrics['max_depth'] == 1
+    queue.stop()
@@ -0,0 +1,140 @@
+"""Tests for the handover of modules between Astrality instances."""
+
+import copy
+import json
+from pathlib import Path
+
+from astrality.control import take_over
+from astrality.handover import (
+    adopt,
+    commit_handover,
+    decode_context,
+    encode_context,
+    hand_over,
+    handover_request,
+)
+from astrality.module import ModuleManager
+from astrality.resolver import Resolver
+
+
+def test_context_encoding_preserves_integer_keys():
+    """Context sections should survive a JSON round trip."""
+    context = {'colors': Resolver({1: 'red', 'nested': {2: ['blue']}})}
+    encoded = json.loads(json.dumps(encode_context(context)))
+    decoded = decode_context(encoded)
+    assert decoded['colors'][1] == 'red'
+    assert decoded['colors']['nested'][2] == ['blue']
+    assert decoded['colors']['nested'][3] == ['blue']
+
+
+def test_handover_of_unchanged_modules(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    """Only changed modules should be exited and started."""
+    template = tmpdir / 'template'
+    template.write('{{ colors.primary }}')
+    target = tmpdir / 'target'
+    log = tmpdir / 'log'
+    application_config = {
+        'context/colors': {'primary': 'red'},
+        'module/A': {
+            'on_startup': {
+                'compile': {'source': str(template), 'target': str(target)},
+                'run': {'shell': f'echo startup A >> {log}'},
+            },
+            'on_exit': {'run': {'shell': f'echo exit A >> {log}'}},
+        },
+        'module/B': {
+            'on_startup': {'run': {'shell': f'echo startup B >> {log}'}},
+            'on_exit': {'run': {'shell': f'echo exit B >> {log}'}},
+        },
+        'module/C': {
+            'on_startup': {'compile': {'source': str(template)}},
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['config/modules'] = {'run_timeout': 2}
+
+    old_module_manager = ModuleManager(copy.deepcopy(application_config))
+    old_module_manager.finish_tasks()
+    assert target.read() == 'red'
+
+    application_config['context/colors'] = {'primary': 'blue'}
+    application_config['module/B']['on_startup']['run'] = {
+        'shell': f'echo startup B2 >> {log}',
+    }
+    new_module_manager = ModuleManager(application_config)
+
+    # The state is sent over a socket, and must be JSON serializable
+    request = json.loads(json.dumps(handover_request(new_module_manager)))
+    assert set(request) == {'A', 'B'}
+    state = json.loads(json.dumps(hand_over(old_module_manager, request)))
+    assert old_module_manager.offered_modules == {'A'}
+    assert old_module_manager.handed_over_modules == set()
+
+    log.write('')
+    adopt(new_module_manager, state)
+    assert new_module_manager.adopted_modules == {'A'}
+    assert target.read() == 'blue'
+
+    # Modules are only handed over when adoption is acknowledged
+    assert commit_handover(
+        old_module_manager,
+        sorted(new_module_manager.adopted_modules),
+    ) == ['A']
+    assert old_module_manager.handed_over_modules == {'A'}
+
+    old_module_manager.exit()
+    new_module_manager.finish_tasks()
+    assert log.read().splitlines() == ['exit B', 'startup B2']
+
+    # Adopted modules know about the compilations of the old instance
+    targets = new_module_manager.recompile_template(Path(template))
+    assert Path(target) in targets
+    new_module_manager.exit()
+
+
+def test_take_over_without_old_instance(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    """Nothing should be adopted when no old instance is running."""
+    application_config = {'module/A': {}}
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    module_manager = ModuleManager(application_config)
+
+    assert not take_over(
+        module_manager,
+        socket_path=Path(tmpdir) / 'missing.sock',
+    )
+    assert module_manager.adopted_modules == set()
+
+
+def test_unacknowledged_handover_is_not_committed(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    """Offered modules should still be exited if the new instance fails."""
+    log = tmpdir / 'log'
+    application_config = {
+        'module/A': {'on_exit': {'run': {'shell': f'echo exit A >> {log}'}}},
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['config/modules'] = {'run_timeout': 2}
+
+    old_module_manager = ModuleManager(copy.deepcopy(application_config))
+    old_module_manager.finish_tasks()
+    new_module_manager = ModuleManager(application_config)
+
+    hand_over(old_module_manager, handover_request(new_module_manager))
+    assert old_module_manager.offered_modules == {'A'}
+
+    old_module_manager.exit()
+    assert log.read() == 'exit A\n'
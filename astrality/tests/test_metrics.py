@@ -0,0 +1,131 @@
+"""Tests for exporting metrics in the Prometheus text format."""
+
+from datetime import datetime, timedelta
+import http.client
+from pathlib import Path
+import socket
+
+from astrality.metrics import (
+    MetricsExporter,
+    MetricsRegistry,
+    compiled_bytes_total,
+    metrics,
+    scheduler_lateness_seconds,
+    shell_command_timeouts_total,
+)
+from astrality.module import ModuleManager
+from astrality.scheduler import EventScheduler
+from astrality.utils import run_shell
+
+
+def test_exposition_format():
+    """Metrics should be formatted according to the text format."""
+    registry = MetricsRegistry()
+    events = registry.counter('events_total', 'Events.', ('module',))
+    depth = registry.gauge('queue_depth', 'Depth.')
+    durations = registry.histogram('duration_seconds', 'Took.', buckets=(1,))
+
+    events.inc(module='A')
+    events.inc(2, module='B "quoted"')
+    depth.set(3)
+    durations.observe(0.5)
+    durations.observe(2)
+
+    assert registry.exposition() == (
+        '# HELP events_total Events.\n'
+        '# TYPE events_total counter\n'
+        'events_total{module="A"} 1\n'
+        'events_total{module="B \\"quoted\\""} 2\n'
+        '# HELP queue_depth Depth.\n'
+        '# TYPE queue_depth gauge\n'
+        'queue_depth 3\n'
+        '# HELP duration_seconds Took.\n'
+        '# TYPE duration_seconds histogram\n'
+        'duration_seconds_bucket{le="1"} 1\n'
+        'duration_seconds_bucket{le="+Inf"} 2\n'
+        'duration_seconds_sum 2.5\n'
+        'duration_seconds_count 2\n'
+    )
+    assert events.value(module='B "quoted"') == 2
+    assert durations.count() == 2
+
+
+def test_collectors_are_invoked_before_exposition():
+    """Collectors should update metrics which are read on demand."""
+    registry = MetricsRegistry()
+    depth = registry.gauge('queue_depth', 'Depth.')
+    registry.collectors.append(lambda: depth.set(7))
+    assert 'queue_depth 7\n' in registry.exposition()
+
+
+def test_module_manager_metrics(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    """Compilations, shell timeouts, and event lateness should be counted."""
+    template = tmpdir / 'template'
+    template.write('four')
+    application_config = {
+        'module/A': {
+            'on_startup': {
+                'compile': {
+                    'source': str(template),
+                    'target': str(tmpdir / 'target'),
+                },
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+
+    compiled_bytes = compiled_bytes_total.value()
+    module_manager = ModuleManager(application_config)
+    module_manager.finish_tasks()
+    assert compiled_bytes_total.value() == compiled_bytes + 4
+    assert 'astrality_watcher_queue_depth 0\n' in metrics.exposition()
+    assert '# TYPE astrality_watcher_events_total counter\n' \
+        in metrics.exposition()
+    module_manager.exit()
+
+    timeouts = shell_command_timeouts_total.value()
+    run_shell('sleep 0.2', timeout=0.05)
+    assert shell_command_timeouts_total.value() == timeouts + 1
+
+    lateness = scheduler_lateness_seconds.count()
+    scheduler = EventScheduler()
+    now = datetime.now()
+    scheduler.schedule('A', at=now - timedelta(seconds=1))
+    scheduler.pop_due(now=now)
+    assert scheduler_lateness_seconds.count() == lateness + 1
+
+
+def test_metrics_exporter(tmpdir):
+    """Metrics should be written to a file and served on a Unix socket."""
+    registry = MetricsRegistry()
+    registry.counter('events_total', 'Events.').inc()
+    metrics_file = Path(tmpdir) / 'metrics' / 'astrality.prom'
+    socket_path = Path(tmpdir) / 'metrics.sock'
+
+    exporter = MetricsExporter(
+        registry=registry,
+        metrics_file=metrics_file,
+        interval=60,
+        socket_path=socket_path,
+    )
+    exporter.start()
+
+    connection = http.client.HTTPConnection('localhost')
+    connection.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.sock.connect(str(socket_path))
+    connection.request('GET', '/metrics')
+    response = connection.getresponse()
+    assert response.status == 200
+    assert b'events_total 1\n' in response.read()
+    connection.close()
+
+    registry.metrics['events_total'].inc()
+    exporter.stop()
+    assert 'events_total 2\n' in metrics_file.read_text()
+    assert not socket_path.exists()
+    assert list(metrics_file.parent.iterdir()) == [metrics_file]
@@ -0,0 +1,74 @@
+"""Tests for single instance enforcement with a locked PID file."""
+
+import os
+from pathlib import Path
+import subprocess
+import sys
+import time
+
+import pytest
+
+from astrality.pidfile import PidFile
+
+HOLDER = '''
+import signal, sys, time
+from pathlib import Path
+from astrality.pidfile import PidFile
+
+if sys.argv[2] == 'stubborn':
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+PidFile(Path(sys.argv[1])).acquire()
+print('locked', flush=True)
+time.sleep(30)
+'''
+
+
+@pytest.yield_fixture
+def pid_file(tmpdir):
+    """Return PID file in tmpdir, released after the test."""
+    pid_file = PidFile(Path(tmpdir) / 'astrality.pid')
+    yield pid_file
+    pid_file.release()
+
+
+def hold_lock(pid_file: PidFile, mode: str = 'graceful') -> subprocess.Popen:
+    """Return process holding lock of PID file."""
+    process = subprocess.Popen(
+        [sys.executable, '-c', HOLDER, str(pid_file.path), mode],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        cwd=str(Path(__file__).parents[2]),
+    )
+    assert process.stdout.readline() == 'locked\n'
+    return process
+
+
+def test_acquiring_unlocked_pid_file(pid_file):
+    """The PID of the current process should be written to the file."""
+    pid_file.acquire()
+    assert pid_file.locked
+    assert pid_file.read() == os.getpid()
+
+    pid_file.release()
+    assert pid_file.read() is None
+
+
+def test_old_instance_is_terminated(pid_file):
+    """Instances holding the lock should be terminated and waited for."""
+    process = hold_lock(pid_file)
+    assert pid_file.read() == process.pid
+    assert not pid_file.try_lock()
+
+    start = time.monotonic()
+    pid_file.acquire()
+    assert time.monotonic() - start < 2
+    assert process.wait(timeout=1) == -15
+    assert pid_file.read() == os.getpid()
+
+
+def test_stubborn_instance_is_killed(pid_file):
+    """Instances ignoring SIGTERM should be killed after the timeout."""
+    process = hold_lock(pid_file, mode='stubborn')
+    pid_file.acquire(timeout=0.2)
+    assert process.wait(timeout=1) == -9
+    assert pid_file.locked
@@ -0,0 +1,114 @@
+"""Tests for the process manager running shell commands."""
+
+import os
+from pathlib import Path
+import subprocess
+import sys
+import time
+
+import pytest
+
+from astrality.processes import ProcessManager
+
+
+@pytest.fixture
+def manager():
+    """Return process manager waiting for at most two processes."""
+    return ProcessManager(max_processes=2)
+
+
+def test_running_shell_commands(manager, tmpdir):
+    """Output should be read while the command runs, avoiding deadlocks."""
+    result = manager.run(
+        command='echo error >&2; head -c 200000 /dev/zero | tr "\\0" a',
+        timeout=2,
+        working_directory=Path(tmpdir),
+    )
+    assert result.returncode == 0
+    assert result.stdout == 'a' * 200000
+    assert result.stderr == 'error\n'
+
+    result = manager.run('pwd; exit 3', timeout=2, working_directory=tmpdir)
+    assert result.returncode == 3
+    assert result.stdout == str(tmpdir) + '\n'
+
+
+def test_timed_out_processes_are_reaped(manager, tmpdir):
+    """Timed out processes should release their slot, and be reaped."""
+    process = manager.submit('sleep 0.3', working_directory=Path(tmpdir))
+    time.sleep(0.1)
+    manager.abandon(process)
+    assert process.popen.returncode is None
+
+    # The slot of the abandoned process is available right away
+    start = time.monotonic()
+    assert manager.run('sleep 0.1', 1, Path(tmpdir)).returncode == 0
+    assert manager.run('sleep 0.1', 1, Path(tmpdir)).returncode == 0
+    assert time.monotonic() - start < 0.3
+
+    # Abandoned processes are reaped without their output
+    assert process.future.result(timeout=1) is None
+    with pytest.raises(ChildProcessError):
+        os.waitpid(process.popen.pid, os.WNOHANG)
+
+
+def test_concurrency_is_limited(manager, tmpdir):
+    """At most max_processes processes should be waited for at once."""
+    submitted = [
+        manager.submit('sleep 0.2', working_directory=Path(tmpdir))
+        for _ in range(4)
+    ]
+    time.sleep(0.1)
+    assert [process.popen is not None for process in submitted] \
+        == [True, True, False, False]
+
+    for process in submitted:
+        assert process.future.result(timeout=1).returncode == 0
+
+
+def test_abandoned_queued_processes_are_started(tmpdir):
+    """Commands should be started even if their caller stopped waiting."""
+    manager = ProcessManager(max_processes=1)
+    running = manager.submit('sleep 0.5', working_directory=Path(tmpdir))
+    assert manager.run('touch started', 0.1, Path(tmpdir)) is None
+
+    # The queued command is started without waiting for the busy slot
+    time.sleep(0.2)
+    assert (tmpdir / 'started').check()
+    assert running.popen.returncode is None
+    assert running.future.result(timeout=1).returncode == 0
+
+
+def test_background_processes_outlive_astrality(tmpdir):
+    """Output of background processes should not depend on Astrality."""
+    script = (
+        'from pathlib import Path\n'
+        'from astrality.utils import run_shell\n'
+        'run_shell("(sleep 0.3; echo output; touch alive) &", timeout=0.1, '
+        f'working_directory=Path("{tmpdir}"))\n'
+    )
+    subprocess.run(
+        [sys.executable, '-c', script],
+        cwd=str(Path(__file__).parents[2]),
+        check=True,
+        timeout=5,
+    )
+
+    time.sleep(0.6)
+    assert (tmpdir / 'alive').check()
+
+
+def test_output_of_background_processes_is_discarded(tmpdir):
+    """Output of processes nobody waits for should not accumulate."""
+    manager = ProcessManager(discard_interval=0.05)
+    process = manager.submit(
+        'echo before; sleep 0.2; echo after; sleep 0.2',
+        working_directory=Path(tmpdir),
+    )
+    time.sleep(0.1)
+    manager.abandon(process)
+
+    time.sleep(0.2)
+    assert os.fstat(process.stdout.fileno()).st_size == 0
+    assert process.future.result(timeout=1) is None
+    assert process.stdout.closed
@@ -0,0 +1,97 @@
+"""Tests for the profiler of Astrality phases."""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from pathlib import Path
+import pstats
+
+import pytest
+
+from astrality.module import ModuleManager
+from astrality.profiler import Profiler, profiler
+
+
+def test_profiling_phases(tmpdir, caplog):
+    """Each phase should be written as a pstats file and summarized."""
+    phase_profiler = Profiler(top=5)
+    with phase_profiler.profile('startup'):
+        pass
+    assert not list(Path(tmpdir).iterdir())
+
+    phase_profiler.enable(directory=Path(tmpdir))
+    caplog.set_level(logging.INFO)
+    with phase_profiler.profile('startup'):
+        sorted(range(1000))
+
+        # Nested phases are part of the outer phase
+        assert not phase_profiler.start('nested')
+
+    stats_file, = Path(tmpdir).glob('startup-*.pstats')
+    assert pstats.Stats(str(stats_file)).total_calls > 0
+    assert any(
+        message.startswith(f'Profile of startup written to "{stats_file}"')
+        for _, _, message
+        in caplog.record_tuples
+    )
+
+
+def test_profiling_of_waves(tmpdir):
+    """Event waves should only be profiled if enabled."""
+    wave_profiler = Profiler()
+    wave_profiler.enable(directory=Path(tmpdir))
+    assert not wave_profiler.start_wave()
+
+    wave_profiler.enable(directory=Path(tmpdir), waves=True)
+    assert wave_profiler.start_wave()
+    assert wave_profiler.stop_wave().name.startswith('wave-')
+    assert wave_profiler.stop_wave() is None
+
+
+def test_profiling_of_calls_in_other_threads(tmpdir):
+    """Functions called in other threads should be part of the phase."""
+    def threaded_function():
+        return sorted(range(1000))
+
+    phase_profiler = Profiler()
+    assert phase_profiler.call(threaded_function) == list(range(1000))
+
+    phase_profiler.enable(directory=Path(tmpdir))
+    with phase_profiler.profile('startup'):
+        with ThreadPoolExecutor() as executor:
+            executor.submit(phase_profiler.call, threaded_function).result()
+
+    stats_file, = Path(tmpdir).glob('startup-*.pstats')
+    assert any(
+        function == 'threaded_function'
+        for _, _, function
+        in pstats.Stats(str(stats_file)).stats
+    )
+
+
+@pytest.yield_fixture
+def enabled_profiler(tmpdir):
+    """Enable the global profiler, writing to tmpdir."""
+    profiler.enable(directory=Path(tmpdir) / 'profiles', waves=True)
+    yield Path(tmpdir) / 'profiles'
+    profiler.disable()
+
+
+def test_profiling_of_module_manager(
+    default_global_options,
+    _runtime,
+    enabled_profiler,
+):
+    """Startup and event waves of the module manager should be profiled."""
+    application_config = {
+        'module/A': {'on_startup': {'run': {'shell': 'echo startup'}}},
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+
+    module_manager = ModuleManager(application_config)
+    module_manager.finish_tasks()
+    module_manager.finish_tasks()
+    module_manager.exit()
+
+    assert len(list(enabled_profiler.glob('startup-*.pstats'))) == 1
+    assert len(list(enabled_profiler.glob('wave-*.pstats'))) == 1
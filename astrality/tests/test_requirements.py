@@ -1,8 +1,13 @@
 """Tests for requirements module."""
 
 from pathlib import Path
+import time
 
-from astrality.requirements import Requirement
+from astrality.requirements import (
+    ExecutableIndex,
+    Requirement,
+    clear_requirement_cache,
+)
 
 def test_null_object_pattern():
     """Empty requirements should be considered satisfied."""
@@ -97,3 +102,43 @@ def test_installed_requirement():
         directory=Path('/'),
     )
     assert not unsuccessful_installed_requirement
+
+
+def test_executable_index(tmpdir, monkeypatch):
+    """The index should be rebuilt when $PATH or its directories change."""
+    monkeypatch.setenv('PATH', str(tmpdir))
+    executables = ExecutableIndex()
+    assert 'program' not in executables
+
+    program = tmpdir / 'program'
+    program.write('#!/bin/sh')
+    program.chmod(0o755)
+    assert 'program' in executables
+
+    # Files which are not executable are not considered installed
+    (tmpdir / 'data').write('')
+    assert 'data' not in executables
+
+    monkeypatch.setenv('PATH', '/does/not/exist')
+    assert 'program' not in executables
+
+
+def test_cached_shell_requirement(tmpdir, monkeypatch):
+    """Results of shell requirements should be cached for cache_ttl seconds."""
+    clear_requirement_cache()
+    directory = Path(tmpdir)
+    requirements = {'shell': 'test -n "$REQUIREMENT_FLAG"'}
+    monkeypatch.delenv('REQUIREMENT_FLAG', raising=False)
+    assert not Requirement(requirements, directory=directory, cache_ttl=0.5)
+
+    # The cached result is used until the time to live has passed
+    monkeypatch.setenv('REQUIREMENT_FLAG', 'set')
+    assert not Requirement(requirements, directory=directory, cache_ttl=0.5)
+    assert Requirement(requirements, directory=directory, cache_ttl=0)
+    time.sleep(0.5)
+    assert Requirement(requirements, directory=directory, cache_ttl=0.5)
+
+    # Modifications of the working directory invalidate the cached result
+    monkeypatch.delenv('REQUIREMENT_FLAG')
+    (tmpdir / 'new_file').write('')
+    assert not Requirement(requirements, directory=directory, cache_ttl=0.5)
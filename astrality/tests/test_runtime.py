@@ -0,0 +1,223 @@
+"""Tests for the asynchronous runtime."""
+
+import asyncio
+from pathlib import Path
+import threading
+import time
+
+import pytest
+
+from astrality.module import ModuleManager
+from astrality.runtime import Runtime
+from astrality.utils import run_shell_async
+
+
+@pytest.fixture
+def concurrent_modules(default_global_options, _runtime, tmpdir):
+    """Return configuration with two modules running slow startup commands."""
+    application_config = {
+        'module/A': {
+            'on_startup': {'run': {'shell': 'sleep 0.5 && touch A'}},
+        },
+        'module/B': {
+            'on_startup': {'run': {'shell': 'sleep 0.5 && touch B'}},
+            'on_event': {'run': {'shell': 'touch event'}},
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['config/modules'] = {'run_timeout': 2}
+    application_config['_runtime']['config_directory'] = tmpdir
+    return application_config
+
+
+def test_run_shell_async():
+    """Coroutine version of run_shell should behave the same."""
+    loop = asyncio.new_event_loop()
+    try:
+        assert loop.run_until_complete(run_shell_async(
+            command='echo hello',
+        )) == 'hello'
+        assert loop.run_until_complete(run_shell_async(
+            command='exit 1',
+            fallback='fallback',
+        )) == 'fallback'
+        assert loop.run_until_complete(run_shell_async(
+            command='sleep 0.5',
+            timeout=0.1,
+            fallback='timed out',
+        )) == 'timed out'
+
+        # The timed out process is reaped in the background
+        loop.run_until_complete(asyncio.sleep(0.5))
+    finally:
+        loop.close()
+
+
+@pytest.mark.slow
+def test_startup_commands_run_concurrently(concurrent_modules, tmpdir):
+    """Slow shell commands in one module should not delay other modules."""
+    module_manager = ModuleManager(concurrent_modules)
+    runtime = Runtime(module_manager)
+    runtime.loop.call_later(1, runtime.stop)
+
+    start = time.time()
+    runtime.run()
+    module_manager.exit()
+
+    assert module_manager.startup_done
+    assert (tmpdir / 'A').check()
+    assert (tmpdir / 'B').check()
+
+    # The event change is never reached, so the runtime stops after ~1 second
+    assert time.time() - start < 1.5
+    assert not (tmpdir / 'event').check()
+
+
+@pytest.mark.slow
+def test_file_system_modifications_trigger_on_modified(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    """Modifications from the watchdog thread should be handled by the loop."""
+    application_config = {
+        'module/watcher': {
+            'on_modified': {
+                'watched.txt': {'run': {'shell': 'touch modified'}},
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['_runtime']['config_directory'] = tmpdir
+
+    watched_file = tmpdir / 'watched.txt'
+    watched_file.write('')
+
+    module_manager = ModuleManager(application_config)
+    runtime = Runtime(module_manager)
+    runtime.loop.call_later(0.5, watched_file.write, 'modified')
+    runtime.loop.call_later(1.5, runtime.stop)
+    runtime.run()
+    module_manager.exit()
+
+    assert (tmpdir / 'modified').check()
+
+
+def test_commands_of_wave_run_after_all_compilations(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    """Commands should see files compiled by other modules in the wave."""
+    template = tmpdir / 'template'
+    template.write('{% for i in range(200000) %}compiled{% endfor %}')
+    application_config = {
+        'module/A': {
+            'on_event': {'run': {'shell': 'test -s compiled && touch seen'}},
+        },
+        'module/B': {
+            'on_event': {
+                'compile': {
+                    'source': str(template),
+                    'target': str(tmpdir / 'compiled'),
+                },
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['config/modules'] = {'run_timeout': 2}
+    application_config['_runtime']['config_directory'] = tmpdir
+
+    module_manager = ModuleManager(application_config)
+    runtime = Runtime(module_manager)
+    runtime.loop.call_later(0.1, lambda: runtime.spawn(runtime.execute_wave(
+        modules=tuple(module_manager.modules.values()),
+        block_name='on_event',
+    )))
+    runtime.loop.call_later(0.2, runtime.stop)
+    runtime.run()
+    module_manager.exit()
+
+    assert (tmpdir / 'seen').check()
+
+
+def test_compilations_do_not_block_the_event_loop(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    """Templates using the shell filter should be compiled in a thread."""
+    template = tmpdir / 'template'
+    template.write('{{ "sleep 0.5 && echo slow" | shell(1) }}')
+    application_config = {
+        'module/A': {
+            'on_startup': {
+                'compile': {
+                    'source': str(template),
+                    'target': str(tmpdir / 'compiled'),
+                },
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['_runtime']['config_directory'] = tmpdir
+
+    module_manager = ModuleManager(application_config)
+    runtime = Runtime(module_manager)
+    start = time.monotonic()
+    called = []
+    runtime.loop.call_later(0.1, lambda: called.append(time.monotonic()))
+    runtime.loop.call_later(0.2, runtime.stop)
+    runtime.run()
+    module_manager.exit()
+
+    assert called[0] - start < 0.3
+    assert (tmpdir / 'compiled').read() == 'slow'
+
+
+def test_file_system_modifications_are_handed_over_with_backpressure(
+    default_global_options,
+    _runtime,
+    tmpdir,
+):
+    """The file modification queue should wait for busy workers."""
+    watched_file = tmpdir / 'watched.txt'
+    watched_file.write('')
+    application_config = {
+        'module/watcher': {
+            'on_modified': {
+                'watched.txt': {'run': {'shell': 'sleep 0.5'}},
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+    application_config['_runtime']['config_directory'] = tmpdir
+    application_config['config/modules'] = {
+        'max_workers': 1,
+        'run_timeout': 1,
+    }
+
+    module_manager = ModuleManager(application_config)
+    runtime = Runtime(module_manager)
+    thread = threading.Thread(target=runtime.run)
+    thread.start()
+    try:
+        while not module_manager.startup_done:
+            time.sleep(0.01)
+
+        start = time.monotonic()
+        runtime.file_system_modified(Path(watched_file))
+        assert time.monotonic() - start < 0.1
+
+        # The second modification is only handed over when the first is done
+        runtime.file_system_modified(Path(watched_file))
+        assert time.monotonic() - start > 0.4
+    finally:
+        runtime.stop()
+        thread.join()
+        module_manager.exit()
@@ -0,0 +1,49 @@
+"""Tests for the event scheduler."""
+
+from datetime import datetime, timedelta
+
+from astrality.scheduler import EventScheduler
+
+
+def test_next_transition_of_empty_scheduler():
+    scheduler = EventScheduler()
+    assert scheduler.next_transition() is None
+    assert scheduler.pop_due(now=datetime.now()) == []
+    assert len(scheduler) == 0
+
+
+def test_popping_due_modules_in_order_of_transition_time():
+    now = datetime(year=2018, month=2, day=15, hour=12)
+    minute = timedelta(minutes=1)
+
+    scheduler = EventScheduler()
+    scheduler.schedule(name='C', at=now + 3 * minute)
+    scheduler.schedule(name='B', at=now + 2 * minute)
+    scheduler.schedule(name='A', at=now + minute)
+    assert scheduler.next_transition() == now + minute
+
+    assert set(scheduler.due(now=now + 2 * minute)) == {'A', 'B'}
+    assert scheduler.pop_due(now=now) == []
+    assert scheduler.pop_due(now=now + 2 * minute) == ['A', 'B']
+    assert 'A' not in scheduler
+    assert 'C' in scheduler
+    assert scheduler.next_transition() == now + 3 * minute
+
+
+def test_rescheduling_and_unscheduling_modules():
+    now = datetime(year=2018, month=2, day=15, hour=12)
+    minute = timedelta(minutes=1)
+
+    scheduler = EventScheduler()
+    scheduler.schedule(name='A', at=now + minute)
+    scheduler.schedule(name='B', at=now + 2 * minute)
+
+    # Only the latest scheduled transition of a module is kept
+    scheduler.schedule(name='A', at=now + 3 * minute)
+    assert scheduler.next_transition() == now + 2 * minute
+    assert list(scheduler.due(now=now + minute)) == []
+
+    scheduler.unschedule('B')
+    assert scheduler.next_transition() == now + 3 * minute
+    assert scheduler.pop_due(now=now + 10 * minute) == ['A']
+    assert len(scheduler) == 0
@@ -0,0 +1,161 @@
+"""Tests for timing instrumentation of module actions."""
+
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from astrality.module import ModuleManager
+from astrality.timing import Timings, Tracer, percentile, tracer
+
+
+def test_percentile():
+    """Percentiles should use the nearest-rank method."""
+    samples = [float(number) for number in range(1, 101)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile(samples, 0) == 1.0
+    assert percentile([], 50) == 0.0
+
+
+def test_aggregation_of_timings():
+    """Durations should be aggregated per module, block, and action."""
+    timings = Timings(max_samples=2)
+    for duration in (3.0, 1.0, 2.0):
+        timings.record(key=('A', 'on_startup', 'run'), duration=duration)
+    with timings.measure('B', 'on_event', 'compile'):
+        pass
+
+    summary = timings.summary()
+    assert summary[('A', 'on_startup', 'run')] == {
+        'count': 3,
+        'total': 6.0,
+        'mean': 2.0,
+        'p50': 1.0,
+        'p90': 2.0,
+        'p99': 2.0,
+        'max': 3.0,
+    }
+    assert summary[('B', 'on_event', 'compile')]['count'] == 1
+
+    # Waves only contain measurements since the last wave
+    assert set(timings.pop_wave()) == set(summary)
+    assert timings.pop_wave() == {}
+    assert timings.summary() == summary
+
+
+def test_module_actions_are_timed(
+    default_global_options,
+    _runtime,
+    tmpdir,
+    caplog,
+):
+    """The module manager should time all executed actions."""
+    template = tmpdir / 'template'
+    template.write('')
+    application_config = {
+        'module/A': {
+            'on_startup': {
+                'compile': {'source': str(template)},
+                'run': [{'shell': 'echo one'}, {'shell': 'echo two'}],
+                'trigger': {'block': 'on_exit'},
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+
+    module_manager = ModuleManager(application_config)
+    caplog.set_level(logging.DEBUG)
+    module_manager.finish_tasks()
+
+    summary = module_manager.timings.summary()
+    assert summary[('A', 'on_startup', 'run')]['count'] == 2
+    assert summary[('A', 'on_startup', 'compile')]['count'] == 1
+    assert summary[('A', 'on_startup', 'trigger')]['count'] == 1
+    assert summary[('A', 'event_listener', 'event')]['count'] >= 1
+    assert any(
+        message.startswith('[module/A] on_startup run: 2x')
+        for _, _, message
+        in caplog.record_tuples
+    )
+
+    module_manager.exit()
+
+
+def test_tracer_records_nested_spans(tmpdir):
+    """Spans should be written as Chrome trace events for each wave."""
+    wave_tracer = Tracer(max_files=2)
+
+    # Callable arguments are only evaluated by enabled tracers
+    def unused_argument():
+        raise AssertionError('Argument evaluated by disabled tracer')
+
+    with wave_tracer.span('ignored', command=unused_argument):
+        pass
+    assert wave_tracer.write() is None
+
+    wave_tracer.enable(directory=Path(tmpdir))
+    with wave_tracer.span('outer', category='module', module=lambda: 'A'):
+        with wave_tracer.span('inner'):
+            pass
+    wave_tracer.instant('event detected', module='A', event='night')
+
+    trace_file = wave_tracer.write()
+    events = json.loads(trace_file.read_text())['traceEvents']
+    inner, outer, instant = events
+    assert (outer['name'], outer['ph'], outer['args']) \
+        == ('outer', 'X', {'module': 'A'})
+    assert outer['ts'] <= inner['ts']
+    assert inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+    assert instant['args'] == {'module': 'A', 'event': 'night'}
+
+    # Empty waves are not written, and old trace files are removed
+    assert wave_tracer.write() is None
+    for _ in range(3):
+        with wave_tracer.span('span'):
+            pass
+        wave_tracer.write()
+    assert len(list(Path(tmpdir).glob('trace-*.json'))) == 2
+
+
+@pytest.yield_fixture
+def enabled_tracer(tmpdir):
+    """Enable the global tracer, writing to tmpdir."""
+    tracer.enable(directory=Path(tmpdir) / 'traces')
+    yield Path(tmpdir) / 'traces'
+    tracer.disable()
+
+
+def test_tracing_of_module_actions(
+    default_global_options,
+    _runtime,
+    tmpdir,
+    enabled_tracer,
+):
+    """Templates, shell filters, and run actions should be traced."""
+    template = tmpdir / 'template'
+    template.write('{{ "echo filtered" | shell }}')
+    application_config = {
+        'module/A': {
+            'on_startup': {
+                'compile': {
+                    'source': str(template),
+                    'target': str(tmpdir / 'target'),
+                },
+                'run': {'shell': 'echo run'},
+            },
+        },
+    }
+    application_config.update(default_global_options)
+    application_config.update(_runtime)
+
+    module_manager = ModuleManager(application_config)
+    module_manager.finish_tasks()
+    module_manager.exit()
+
+    trace_file, *_ = sorted(enabled_tracer.glob('trace-*.json'))
+    events = json.loads(trace_file.read_text())['traceEvents']
+    names = {event['name'] for event in events}
+    assert {'compile', 'render', 'shell filter', 'run'} <= names
@@ -0,0 +1,384 @@
+"""Module for measuring the time spent executing module actions."""
+
+import asyncio
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import logging
+import math
+import os
+from pathlib import Path
+import threading
+import time
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from mypy_extensions import TypedDict
+
+from astrality.metrics import action_duration_seconds
+
+logger = logging.getLogger('astrality')
+
+# Timings are aggregated by (module name, block name, action type)
+TimingKey = Tuple[str, str, str]
+
+
+class TimingSummary(TypedDict):
+    """Summary statistics of measured durations, given in seconds."""
+
+    count: int
+    total: float
+    mean: float
+    p50: float
+    p90: float
+    p99: float
+    max: float
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """
+    Return the q-th percentile of samples by the nearest-rank method.
+
+    :param samples: Sorted list of samples.
+    :param q: Percentile between 0 and 100.
+    """
+    if not samples:
+        return 0.0
+
+    rank = max(math.ceil(q / 100 * len(samples)), 1)
+    return samples[rank - 1]
+
+
+class TimingStatistics:
+    """
+    Running statistics of measured durations.
+
+    Counts and totals include all measurements, while percentiles are
+    computed from the `max_samples` most recent measurements.
+
+    :param max_samples: Number of recent durations kept for percentiles.
+    """
+
+    def __init__(self, max_samples: int = 1024) -> None:
+        """Initialize statistics without any measurements."""
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+
+    def add(self, duration: float) -> None:
+        """Add measured duration, given in seconds."""
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        self.samples.append(duration)
+
+    def summary(self) -> TimingSummary:
+        """Return summary statistics of the measured durations."""
+        samples = sorted(self.samples)
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': percentile(samples, 50),
+            'p90': percentile(samples, 90),
+            'p99': percentile(samples, 99),
+            'max': self.max,
+        }
+
+
+class Timings:
+    """
+    Thread safe registry of timings of module actions.
+
+    Durations are measured with a monotonic clock, and aggregated per module,
+    action block, and action type. Besides the statistics of all measurements,
+    the registry keeps statistics of the current *wave*, i.e. the
+    measurements since the last time the wave summary was logged.
+
+    :param max_samples: Number of recent durations kept for percentiles.
+    """
+
+    def __init__(self, max_samples: int = 1024) -> None:
+        """Initialize empty registry."""
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self._statistics: Dict[TimingKey, TimingStatistics] = {}
+        self._wave: Dict[TimingKey, TimingStatistics] = {}
+
+    @contextmanager
+    def measure(
+        self,
+        module: str,
+        block: str,
+        action: str,
+        **args: Any,
+    ) -> Iterator[None]:
+        """
+        Measure the duration of the enclosed code.
+
+        The enclosed code is also recorded as a span by the tracer, if it is
+        enabled.
+
+        :param module: Name of module executing the action.
+        :param block: Name of action block, such as 'on_startup'.
+        :param action: Type of action, such as 'compile'.
+        :param args: Additional details of the action included in the span.
+            Callable values are only called if the tracer is enabled.
+        """
+        start = time.monotonic()
+        try:
+            with tracer.span(action, module=module, block=block, **args):
+                yield
+        finally:
+            self.record(
+                key=(module, block, action),
+                duration=time.monotonic() - start,
+            )
+
+    def record(self, key: TimingKey, duration: float) -> None:
+        """
+        Record measured duration.
+
+        The duration is also observed by the exported action duration metric.
+
+        :param key: Tuple of module name, block name, and action type.
+        :param duration: Duration in seconds.
+        """
+        with self.lock:
+            for statistics in (self._statistics, self._wave):
+                if key not in statistics:
+                    statistics[key] = TimingStatistics(self.max_samples)
+                statistics[key].add(duration)
+
+        module, block, action = key
+        action_duration_seconds.observe(
+            duration,
+            module=module,
+            block=block,
+            action=action,
+        )
+
+    def summary(self) -> Dict[TimingKey, TimingSummary]:
+        """
+        Return summary statistics of all measurements.
+
+        :return: Dictionary with (module, block, action) keys and summary
+            statistics values.
+        """
+        with self.lock:
+            return {
+                key: statistics.summary()
+                for key, statistics
+                in self._statistics.items()
+            }
+
+    def pop_wave(self) -> Dict[TimingKey, TimingSummary]:
+        """Return summary statistics of the current wave, and start a new."""
+        with self.lock:
+            wave, self._wave = self._wave, {}
+
+        return {
+            key: statistics.summary()
+            for key, statistics
+            in wave.items()
+        }
+
+    def log_wave(self) -> None:
+        """Log summary of the current wave, slowest actions first."""
+        wave = self.pop_wave()
+        if not wave:
+            return
+
+        total = sum(summary['total'] for summary in wave.values())
+        logger.debug(
+            f'Executed {sum(s["count"] for s in wave.values())} actions '
+            f'in {total:.3f} seconds.',
+        )
+        for (module, block, action), summary in sorted(
+            wave.items(),
+            key=lambda item: item[1]['total'],
+            reverse=True,
+        ):
+            logger.debug(
+                f'[module/{module}] {block} {action}: '
+                f'{summary["count"]}x, {summary["total"]:.3f}s total, '
+                f'{summary["p50"]:.3f}s p50, {summary["max"]:.3f}s max.',
+            )
+
+    def clear(self) -> None:
+        """Forget all measurements."""
+        with self.lock:
+            self._statistics.clear()
+            self._wave.clear()
+
+
+def microseconds() -> int:
+    """Return monotonic clock in whole microseconds, used by trace events."""
+    return int(time.monotonic() * 1e6)
+
+
+def current_track() -> int:
+    """
+    Return identifier of the current asyncio task or thread.
+
+    Spans recorded within the same asyncio task are properly nested, while
+    concurrent tasks running on the same thread are not.
+    """
+    try:
+        current_task = getattr(asyncio, 'current_task', None) \
+            or asyncio.Task.current_task  # type: ignore
+        task = current_task()
+    except RuntimeError:
+        task = None
+
+    return id(task) if task else threading.get_ident()
+
+
+class Tracer:
+    """
+    Recorder of nested spans in the Chrome trace event format.
+
+    Recording spans is a no-op until Tracer.enable() is invoked. Recorded
+    spans are written to a new JSON file for each wave, which can be opened
+    in a trace viewer such as Perfetto or chrome://tracing.
+
+    :param max_files: Number of trace files kept, oldest files are deleted.
+    """
+
+    def __init__(self, max_files: int = 100) -> None:
+        """Initialize disabled tracer."""
+        self.max_files = max_files
+        self.directory: Optional[Path] = None
+        self.lock = threading.Lock()
+        self._events: List[Dict[str, Any]] = []
+        self._waves = 0
+
+    def enable(self, directory: Path) -> None:
+        """
+        Start recording spans.
+
+        :param directory: Directory where trace files are written.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def disable(self) -> None:
+        """Stop recording spans, discarding unwritten spans."""
+        self.directory = None
+        with self.lock:
+            self._events = []
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        category: str = 'action',
+        **args: Any,
+    ) -> Iterator[None]:
+        """
+        Record the enclosed code as a span.
+
+        :param name: Name of span, such as 'compile'.
+        :param category: Category of span, used for filtering in viewers.
+        :param args: Details of span shown in viewers. Callable values are
+            only called if the tracer is enabled.
+        """
+        if self.directory is None:
+            yield
+            return
+
+        start = microseconds()
+        try:
+            yield
+        finally:
+            self.record({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': start,
+                'dur': microseconds() - start,
+                'pid': os.getpid(),
+                'tid': current_track(),
+                'args': {
+                    key: str(value() if callable(value) else value)
+                    for key, value
+                    in args.items()
+                },
+            })
+
+    def instant(self, name: str, category: str = 'event', **args) -> None:
+        """
+        Record an instant event without any duration.
+
+        :param name: Name of event, such as 'event detected'.
+        :param category: Category of event, used for filtering in viewers.
+        :param args: Details of event shown in viewers.
+        """
+        if self.directory is None:
+            return
+
+        self.record({
+            'name': name,
+            'cat': category,
+            'ph': 'i',
+            's': 'p',
+            'ts': microseconds(),
+            'pid': os.getpid(),
+            'tid': current_track(),
+            'args': {key: str(value) for key, value in args.items()},
+        })
+
+    def record(self, event: Dict[str, Any]) -> None:
+        """Record trace event dictionary."""
+        with self.lock:
+            self._events.append(event)
+
+    def write(self) -> Optional[Path]:
+        """
+        Write spans recorded since the last write to a new trace file.
+
+        :return: Path to written trace file, or None if nothing was recorded.
+        """
+        with self.lock:
+            events, self._events = self._events, []
+            self._waves += 1
+            wave = self._waves
+
+        directory = self.directory
+        if directory is None or not events:
+            return None
+
+        timestamp = datetime.now().strftime('%Y%m%dT%H%M%S')
+        trace_file = directory / f'trace-{timestamp}-{os.getpid()}-{wave}.json'
+        temporary_file = trace_file.with_suffix('.tmp')
+        try:
+            with open(temporary_file, 'w') as file:
+                json.dump(
+                    {'traceEvents': events, 'displayTimeUnit': 'ms'},
+                    file,
+                )
+            os.replace(temporary_file, trace_file)
+        except OSError as error:
+            logger.error(f'Could not write trace file "{trace_file}": {error}')
+            return None
+
+        logger.debug(f'Wrote trace of {len(events)} spans to "{trace_file}".')
+        self._remove_old_files(directory)
+        return trace_file
+
+    def _remove_old_files(self, directory: Path) -> None:
+        """Remove the oldest trace files beyond the `max_files` newest."""
+        trace_files = sorted(
+            directory.glob('trace-*.json'),
+            key=lambda path: path.stat().st_mtime,
+        )
+        for trace_file in trace_files[:-self.max_files]:
+            try:
+                trace_file.unlink()
+            except OSError:
+                pass
+
+
+# Tracer used throughout Astrality, disabled by default
+tracer = Tracer()
@@ -1,10 +1,17 @@
 """General utility functions which are used across the application."""
 
+import hashlib
 import logging
 import os
-import subprocess
+import time
 from pathlib import Path
-from typing import Any, Dict, List, TypeVar, Union
+from typing import Any, Dict, List, Optional, TypeVar, Union
+
+from astrality.metrics import (
+    shell_command_duration_seconds,
+    shell_command_timeouts_total,
+)
+from astrality.processes import ProcessResult, processes
 
 logger = logging.getLogger('astrality')
 
@@ -20,39 +27,75 @@ def run_shell(
     Return the standard output of a shell command.
 
     If the shell command has a non-zero exit code or times out, the function
-    returns the `fallback` argument instead of the standard output.
+    returns the `fallback` argument instead of the standard output. Commands
+    which time out are left running in the background, and are reaped by the
+    process manager when they eventually exit.
     """
-    process = subprocess.Popen(
-        command,
-        cwd=working_directory,
-        shell=True,
-        universal_newlines=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
+    start = time.monotonic()
     try:
         # We add just a small extra wait in case users specify 0 seconds,
         # in order to not print an error when a command is really quick.
-        if timeout == 0:
-            process.wait(timeout=timeout + 0.1)
-        else:
-            process.wait(timeout=timeout)
-
-        for error_line in process.stderr:
-            logger.error(str(error_line))
-
-        if process.returncode != 0 and not allow_error_codes:
-            logger.error(
-                f'Command "{command}" exited with non-zero return code: ' +
-                str(process.returncode),
-            )
-            return fallback
-        else:
-            stdout = process.communicate()[0]
-            logger.info(stdout)
-            return stdout.replace('\n', '')
-
-    except subprocess.TimeoutExpired:
+        result = processes.run(
+            command=command,
+            timeout=timeout or 0.1,
+            working_directory=working_directory,
+        )
+    finally:
+        shell_command_duration_seconds.observe(time.monotonic() - start)
+
+    return _shell_output(
+        command=command,
+        result=result,
+        timeout=timeout,
+        fallback=fallback,
+        allow_error_codes=allow_error_codes,
+    )
+
+
+async def run_shell_async(
+    command: str,
+    timeout: Union[int, float] = 2,
+    fallback: Any = '',
+    working_directory: Path = Path.home(),
+    allow_error_codes: bool = False,
+) -> str:
+    """
+    Return the standard output of a shell command without blocking.
+
+    Coroutine equivalent of `run_shell`, which must be awaited from within a
+    running event loop. Other coroutines are free to run while the shell
+    command is executed.
+    """
+    start = time.monotonic()
+    try:
+        # Same extra wait as in run_shell for commands with 0 timeout
+        result = await processes.run_async(
+            command=command,
+            timeout=timeout or 0.1,
+            working_directory=working_directory,
+        )
+    finally:
+        shell_command_duration_seconds.observe(time.monotonic() - start)
+
+    return _shell_output(
+        command=command,
+        result=result,
+        timeout=timeout,
+        fallback=fallback,
+        allow_error_codes=allow_error_codes,
+    )
+
+
+def _shell_output(
+    command: str,
+    result: Optional[ProcessResult],
+    timeout: Union[int, float],
+    fallback: Any,
+    allow_error_codes: bool,
+) -> Any:
+    """Log result of shell command, returning its stdout or fallback."""
+    if result is None:
+        shell_command_timeouts_total.inc()
         logger.warning(
             f'The command "{command}" used more than {timeout} seconds in '
             'order to finish. The exit code can not be verified. This might be '
@@ -60,6 +103,37 @@ def run_shell(
         )
         return fallback
 
+    for error_line in result.stderr.splitlines(keepends=True):
+        logger.error(error_line)
+
+    if result.returncode != 0 and not allow_error_codes:
+        logger.error(
+            f'Command "{command}" exited with non-zero return code: '
+            f'{result.returncode}',
+        )
+        return fallback
+
+    logger.info(result.stdout)
+    return result.stdout.replace('\n', '')
+
+
+def file_digest(path: Path) -> Optional[str]:
+    """
+    Return digest of file content.
+
+    :param path: Path to file.
+    :return: Hexadecimal SHA-256 digest, or None if the file can not be read.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(65536), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+
+    return digest.hexdigest()
+
 
 def generate_expanded_env_dict() -> Dict[str, str]:
     """Return os.environ dict with all env variables expanded."""